@@ -0,0 +1,234 @@
+"""Adaptive concurrency limits for upstream hosts (AIMD).
+
+Each upstream host gets an in-flight limit that grows by about one request per round trip while
+latency stays near its baseline, and is cut multiplicatively when the host answers 429/503, a
+request times out, or smoothed latency rises well above the baseline. Requests over the limit
+wait for a slot. The limit applies across tenants, since they share the upstream's capacity.
+
+Latency baselines are kept per route (method and path, with ids masked), since one host serves
+both fast reads and slow searches; comparing a search against a get's baseline would read as
+congestion.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from dotenv import load_dotenv
+
+import metrics
+from tenants import QuotaExceeded
+
+load_dotenv()
+
+# Off unless ADAPTIVE_CONCURRENCY is set
+ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "0").lower() in ("1", "true", "yes")
+ADAPTIVE_INITIAL_LIMIT = int(os.getenv("ADAPTIVE_INITIAL_LIMIT", "16"))
+ADAPTIVE_MIN_LIMIT = int(os.getenv("ADAPTIVE_MIN_LIMIT", "1"))
+ADAPTIVE_MAX_LIMIT = int(os.getenv("ADAPTIVE_MAX_LIMIT", "128"))
+# Multiplier applied to the limit on a backoff
+ADAPTIVE_BACKOFF = float(os.getenv("ADAPTIVE_BACKOFF", "0.5"))
+# Smoothed latency above this multiple of the baseline counts as congestion
+ADAPTIVE_LATENCY_TOLERANCE = float(os.getenv("ADAPTIVE_LATENCY_TOLERANCE", "2.0"))
+# How long a request waits for a slot under the current limit before failing
+ADAPTIVE_QUEUE_TIMEOUT = float(os.getenv("ADAPTIVE_QUEUE_TIMEOUT", "10"))
+
+# Upstream statuses that mean "slow down"
+_THROTTLE_STATUSES = {429, 503}
+# Smoothing for recent latency, and how fast the baseline drifts up towards it
+_LATENCY_WEIGHT = 0.2
+_BASELINE_DRIFT = 0.01
+# Latency samples before inflation is judged, so the baseline has settled
+_WARMUP_SAMPLES = 10
+# Routes tracked per host; latencies of routes beyond this aren't judged
+_MAX_ROUTES = 256
+
+
+def route(method: str, url: str) -> str:
+    """A URL's method and path with id-like segments (any containing a digit) masked."""
+    segments = urlsplit(url).path.split("/")
+    masked = "/".join("*" if any(c.isdigit() for c in segment) else segment for segment in segments)
+    return f"{method.upper()} {masked}"
+
+
+class _RouteLatency:
+    """Smoothed latency of one route, and its no-load baseline."""
+
+    __slots__ = ("baseline", "latency", "samples")
+
+    def __init__(self):
+        self.baseline = None
+        self.latency = None
+        self.samples = 0
+
+    def observe(self, latency: float):
+        self.samples += 1
+        if self.baseline is None:
+            self.baseline = self.latency = latency
+            return
+        self.latency += _LATENCY_WEIGHT * (latency - self.latency)
+        # Follow improvements at once and deteriorations slowly, so the baseline tracks the no-load latency
+        if latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += _BASELINE_DRIFT * (latency - self.baseline)
+
+    def inflated(self, tolerance: float) -> bool:
+        return self.samples >= _WARMUP_SAMPLES and self.latency > tolerance * self.baseline
+
+
+class AIMDLimiter:
+    """In-flight limit for one host, adjusted from the outcome of each request."""
+
+    def __init__(self, host: str, initial: int | None = None, minimum: int | None = None,
+                 maximum: int | None = None, backoff: float | None = None, tolerance: float | None = None):
+        self.host = host
+        self.minimum = ADAPTIVE_MIN_LIMIT if minimum is None else minimum
+        self.maximum = ADAPTIVE_MAX_LIMIT if maximum is None else maximum
+        self.backoff = ADAPTIVE_BACKOFF if backoff is None else backoff
+        self.tolerance = ADAPTIVE_LATENCY_TOLERANCE if tolerance is None else tolerance
+        initial = ADAPTIVE_INITIAL_LIMIT if initial is None else initial
+        self._limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.in_flight = 0
+        self._routes: dict[str, _RouteLatency] = {}
+        # Bumped on every backoff; requests sent before it can't trigger another one
+        self._epoch = 0
+        self._condition = threading.Condition()
+        metrics.UPSTREAM_CONCURRENCY_LIMIT.set(self.limit, host=host)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self, timeout: float) -> int:
+        """Wait for a slot under the limit; returns the epoch to pass to `release`."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= self.limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.UPSTREAM_LIMIT_EVENTS.inc(host=self.host, event="queue_timeout")
+                    raise QuotaExceeded(f"{self.host}: no upstream slot within {timeout}s "
+                                        f"(adaptive limit {self.limit})")
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return self._epoch
+
+    def release(self, epoch: int, latency: float, outcome: str, route: str = ""):
+        """Return a slot and adjust the limit: `outcome` is "ok", "throttled", "timeout" or "error".
+
+        `latency` is judged against the baseline of the request's `route`.
+        """
+        with self._condition:
+            busy = self.in_flight * 2 >= self.limit
+            self.in_flight -= 1
+            if outcome == "ok":
+                stats = self._route(route)
+                if stats is not None:
+                    stats.observe(latency)
+                if stats is not None and stats.inflated(self.tolerance):
+                    self._decrease(epoch, "latency")
+                elif busy:
+                    # +1 per limit's worth of successes, i.e. about one per round trip; an idle
+                    # host doesn't grow its limit, since that says nothing about its capacity
+                    self._set_limit(self._limit + 1 / self._limit)
+            elif outcome in ("throttled", "timeout"):
+                self._decrease(epoch, outcome)
+            self._condition.notify_all()
+
+    def _route(self, route: str) -> _RouteLatency | None:
+        stats = self._routes.get(route)
+        if stats is None and len(self._routes) < _MAX_ROUTES:
+            stats = self._routes[route] = _RouteLatency()
+        return stats
+
+    def _decrease(self, epoch: int, reason: str):
+        if epoch != self._epoch:
+            return
+        self._epoch += 1
+        self._set_limit(self._limit * self.backoff)
+        # Start the smoothed latencies afresh so one slow spell causes one backoff
+        for stats in self._routes.values():
+            stats.latency = stats.baseline
+        metrics.UPSTREAM_LIMIT_EVENTS.inc(host=self.host, event=reason)
+
+    def _set_limit(self, value: float):
+        self._limit = min(float(self.maximum), max(float(self.minimum), value))
+        metrics.UPSTREAM_CONCURRENCY_LIMIT.set(self.limit, host=self.host)
+
+    @contextmanager
+    def slot(self, timeout: float | None = None, route: str = ""):
+        """Hold a slot for one request; pass the response status to `record` on the yielded object."""
+        outcome = _Outcome()
+        epoch = self.acquire(ADAPTIVE_QUEUE_TIMEOUT if timeout is None else timeout)
+        start = time.monotonic()
+        try:
+            yield outcome
+        except requests.Timeout:
+            outcome.result = "timeout"
+            raise
+        except Exception:
+            outcome.result = "error"
+            raise
+        finally:
+            self.release(epoch, time.monotonic() - start, outcome.result, route)
+
+    def snapshot(self) -> dict:
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "routes": {
+                    name: {"baseline_ms": round(stats.baseline * 1000, 1), "latency_ms": round(stats.latency * 1000, 1)}
+                    for name, stats in self._routes.items() if stats.baseline is not None
+                },
+            }
+
+
+class _Outcome:
+    __slots__ = ("result",)
+
+    def __init__(self):
+        self.result = "error"
+
+    def record(self, status_code: int):
+        if not isinstance(status_code, int):
+            return
+        if status_code in _THROTTLE_STATUSES:
+            self.result = "throttled"
+        else:
+            # Other server errors say little about load; they neither grow nor shrink the limit
+            self.result = "error" if status_code >= 500 else "ok"
+
+
+_limiters: dict[str, AIMDLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def for_url(url: str) -> AIMDLimiter | None:
+    """The limiter for a URL's host, or None when adaptive limits are off."""
+    if not ADAPTIVE_CONCURRENCY:
+        return None
+    host = urlsplit(url).netloc.lower()
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = AIMDLimiter(host)
+        return limiter
+
+
+def snapshot() -> dict:
+    """Current limit, in-flight count and latencies per upstream host."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.host: limiter.snapshot() for limiter in limiters}
+
+
+def reset():
+    with _limiters_lock:
+        _limiters.clear()
+
+
+os.register_at_fork(after_in_child=reset)
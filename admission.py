@@ -0,0 +1,99 @@
+"""Admission control for the JSON runner, so overload sheds requests instead of timing them all out.
+
+At most GATEWAY_MAX_IN_FLIGHT requests are admitted at once; up to GATEWAY_MAX_QUEUE more wait
+for a slot, first come first served. A request is turned away with 503 when the queue is full,
+or when it has waited as long as its client will wait (`X-MCP-Timeout` seconds, capped by
+GATEWAY_QUEUE_TIMEOUT) without starting. The deadline also covers the scheduler's lanes: a call
+still queued there when it passes is dropped rather than run for a client that has gone.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+# Requests handled at once, counting those queued in the scheduler; 0 admits everything
+GATEWAY_MAX_IN_FLIGHT = int(os.getenv("GATEWAY_MAX_IN_FLIGHT", "64"))
+# Requests allowed to wait for admission; beyond this they are rejected at once
+GATEWAY_MAX_QUEUE = int(os.getenv("GATEWAY_MAX_QUEUE", "256"))
+# Longest a request may wait before its tool starts, in seconds
+GATEWAY_QUEUE_TIMEOUT = float(os.getenv("GATEWAY_QUEUE_TIMEOUT", "10"))
+# Retry-After sent with 503s, in seconds
+GATEWAY_RETRY_AFTER = int(os.getenv("GATEWAY_RETRY_AFTER", "1"))
+
+
+def deadline(timeout_header: str | None, now: float | None = None) -> float:
+    """The time.monotonic() by which a request's tool must start: the client's timeout, capped."""
+    now = time.monotonic() if now is None else now
+    timeout = GATEWAY_QUEUE_TIMEOUT
+    try:
+        if timeout_header is not None and float(timeout_header) > 0:
+            timeout = min(timeout, float(timeout_header))
+    except ValueError:
+        pass
+    return now + timeout
+
+
+class AdmissionController:
+    """Counts requests in and out; used from the event loop only, so it needs no locks."""
+
+    def __init__(self, max_in_flight: int | None = None, max_queue: int | None = None):
+        self.max_in_flight = GATEWAY_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+        self.max_queue = GATEWAY_MAX_QUEUE if max_queue is None else max_queue
+        self.in_flight = 0
+        self._waiters: deque = deque()
+
+    async def acquire(self, deadline: float) -> str | None:
+        """Wait for a slot until `deadline`; returns None once admitted, or why the request is shed."""
+        if self.max_in_flight <= 0 or (self.in_flight < self.max_in_flight and not self._waiters):
+            self._admit()
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return self._shed("queue_full")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return self._shed("deadline")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        metrics.GATEWAY_WAITING.inc()
+        try:
+            await asyncio.wait_for(waiter, remaining)
+            return None  # release() handed its slot over
+        except asyncio.TimeoutError:
+            return self._shed("deadline")
+        except asyncio.CancelledError:
+            # The client went away; pass on a slot handed over at the same moment
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            metrics.GATEWAY_WAITING.dec()
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+    def release(self):
+        # Hand the slot straight to the longest waiter, so in_flight never drops below the limit
+        # while requests are waiting
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        metrics.GATEWAY_IN_FLIGHT.dec()
+
+    def _admit(self):
+        self.in_flight += 1
+        metrics.GATEWAY_IN_FLIGHT.inc()
+
+    def _shed(self, reason: str) -> str:
+        metrics.GATEWAY_SHED.inc(reason=reason)
+        return reason
@@ -0,0 +1,95 @@
+"""Measure MCP stdio session start-up: time from spawning the server to its `initialize` response.
+
+Compares starting each connector directly (`python jira_mcp.py`) with the warm launcher
+(`python launcher.py jira`), and records module import time for reference.
+
+    python benchmarks/cold_start.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+INITIALIZE = {
+    "jsonrpc": "2.0", "id": 1, "method": "initialize",
+    "params": {"protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "cold-start", "version": "1"}},
+}
+
+
+def time_session(command: list[str], timeout: float = 60) -> float:
+    """Spawn `command`, send initialize, and return milliseconds until the response line arrives."""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    try:
+        process.stdin.write((json.dumps(INITIALIZE) + "\n").encode())
+        process.stdin.flush()
+        line = process.stdout.readline()
+        elapsed = (time.perf_counter() - start) * 1000
+        if b'"result"' not in line:
+            raise RuntimeError(f"unexpected initialize response from {command}: {line[:200]!r}")
+        return elapsed
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def import_ms(module: str) -> float:
+    """Milliseconds to import a connector module in a fresh interpreter."""
+    code = f"import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples: list[float]) -> dict:
+    return {"median_ms": round(statistics.median(samples), 1), "min_ms": round(min(samples), 1),
+            "max_ms": round(max(samples), 1), "samples_ms": [round(s, 1) for s in samples]}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connectors", default="jira,confluence,cal,resend")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/cold-start-<timestamp>.json)")
+    args = parser.parse_args(argv)
+    connectors = [c.strip() for c in args.connectors.split(",")]
+
+    results = {}
+    for connector in connectors:
+        direct = [time_session([sys.executable, f"{connector}_mcp.py"]) for _ in range(args.runs)]
+        # The first launcher session also starts the fork server; report it separately
+        first = time_session([sys.executable, "launcher.py", connector])
+        warm = [time_session([sys.executable, "launcher.py", connector]) for _ in range(args.runs)]
+        results[connector] = {
+            "import_ms": round(import_ms(f"{connector}_mcp"), 1),
+            "direct": summarize(direct),
+            "launcher_first_ms": round(first, 1),
+            "launcher_warm": summarize(warm),
+        }
+        print(f"{connector:<11} direct {results[connector]['direct']['median_ms']} ms  "
+              f"warm launcher {results[connector]['launcher_warm']['median_ms']} ms", file=sys.stderr)
+    subprocess.run([sys.executable, "launcher.py", "--stop"], cwd=ROOT, check=False)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now(timezone.utc).strftime("cold-start-%Y%m%dT%H%M%SZ.json"))
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump({"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                   "python": sys.version.split()[0], "runs": args.runs, "results": results}, handle, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""Local stand-ins for the Jira, Confluence, Cal.com and Resend APIs used by the benchmarks.
+
+One threaded HTTP server answers the endpoints the connectors call, with configurable latency,
+error and rate-limit behaviour and paginated search results. Responses are shaped like the real
+APIs closely enough for the tools to decode and page through them.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+_ID_SEGMENT = re.compile(r"^(\d{2,}|[A-Z][A-Z0-9]*-\d+)$")
+
+
+class UpstreamBehavior:
+    """How the mock upstream responds; every field can be changed while the server runs."""
+
+    def __init__(self, latency_ms: float = 20.0, jitter_ms: float = 5.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: int = 1, page_size: int = 50,
+                 total_issues: int = 200, total_pages: int = 200, body_chars: int = 4000, seed: int | None = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # Fraction of requests answered with a 500
+        self.error_rate = error_rate
+        # Fraction of requests answered with a 429 and a Retry-After header
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        # Results per search page, and how many issues/pages the searches match in total
+        self.page_size = page_size
+        self.total_issues = total_issues
+        self.total_pages = total_pages
+        # Size of generated Confluence page bodies and Jira descriptions
+        self.body_chars = body_chars
+        self.random = random.Random(seed)
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in vars(self).items() if k != "random"}
+
+
+def _issue(index: int, body_chars: int) -> dict:
+    key = f"BENCH-{index}"
+    return {
+        "id": str(10000 + index),
+        "key": key,
+        "fields": {
+            "summary": f"Benchmark issue {index}",
+            "status": {"name": ("To Do", "In Progress", "Done")[index % 3]},
+            "assignee": {"displayName": f"User {index % 7}"},
+            "description": ("Lorem ipsum dolor sit amet. " * (body_chars // 28 + 1))[:body_chars],
+            "updated": "2026-01-01T00:00:00.000+0000",
+            "created": "2025-12-01T00:00:00.000+0000",
+        },
+    }
+
+
+def _storage_body(page_id: str, body_chars: int) -> str:
+    section = "<h2>Section</h2><p>" + "Lorem ipsum dolor sit amet. " * 10 + "</p><ul><li>one</li><li>two</li></ul>"
+    repeats = body_chars // len(section) + 1
+    return f"<h1>Page {page_id}</h1>" + section * repeats
+
+
+def _page(page_id: str, body_chars: int, v2: bool) -> dict:
+    body = {"storage": {"value": _storage_body(page_id, body_chars), "representation": "storage"}}
+    if v2:
+        return {"id": page_id, "title": f"Benchmark page {page_id}", "spaceId": "1",
+                "version": {"number": 3, "createdAt": "2026-01-01T00:00:00.000Z"}, "body": body}
+    return {"id": page_id, "type": "page", "title": f"Benchmark page {page_id}",
+            "space": {"key": "BENCH"}, "version": {"number": 3, "when": "2026-01-01T00:00:00.000Z"}, "body": body,
+            "_links": {"webui": f"/spaces/BENCH/pages/{page_id}"}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockUpstreamServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _send(self, status: int, payload, headers: dict | None = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str):
+        behavior = self.server.behavior
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        self.server.count(method, parts.path)
+
+        delay = behavior.latency_ms + behavior.random.uniform(-behavior.jitter_ms, behavior.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        roll = behavior.random.random()
+        if roll < behavior.rate_limit_rate:
+            self._send(429, {"message": "Rate limit exceeded"}, {"Retry-After": str(behavior.retry_after)})
+            return
+        if roll < behavior.rate_limit_rate + behavior.error_rate:
+            self._send(500, {"message": "Injected upstream error"})
+            return
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            self._send(400, {"message": "Invalid JSON"})
+            return
+        status, payload = self.server.route(method, parts.path, query, body)
+        self._send(status, payload)
+
+
+class MockUpstreamServer(ThreadingHTTPServer):
+    """Serve all four mock APIs from one port; see `url` for the base URL to configure."""
+
+    daemon_threads = True
+
+    def __init__(self, behavior: UpstreamBehavior | None = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.behavior = behavior or UpstreamBehavior()
+        self.requests: dict = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, method: str, path: str):
+        # Group page ids and issue keys out of the path so counts stay per endpoint
+        route = "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+        with self._lock:
+            self.requests[f"{method} {route}"] = self.requests.get(f"{method} {route}", 0) + 1
+
+    def start(self) -> "MockUpstreamServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-upstream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def route(self, method: str, path: str, query: dict, body: dict):
+        b = self.behavior
+        segments = [s for s in path.split("/") if s]
+
+        # Authenticated no-op reads used by health checks
+        if method == "GET" and path in ("/rest/api/3/myself", "/wiki/rest/api/space", "/v2/me", "/domains"):
+            return 200, {"ok": True}
+
+        # Jira
+        if path == "/rest/api/3/search/jql" and method == "POST":
+            start = int(body.get("nextPageToken") or 0)
+            size = min(int(body.get("maxResults") or b.page_size), b.page_size)
+            end = min(start + size, b.total_issues)
+            page = {"issues": [_issue(i, b.body_chars) for i in range(start, end)], "isLast": end >= b.total_issues}
+            if end < b.total_issues:
+                page["nextPageToken"] = str(end)
+            return 200, page
+        if path == "/rest/api/3/search" and method == "GET":
+            size = min(int(query.get("maxResults") or b.page_size), b.page_size)
+            return 200, {"startAt": 0, "maxResults": size, "total": b.total_issues,
+                         "issues": [_issue(i, b.body_chars) for i in range(min(size, b.total_issues))]}
+        if path == "/rest/api/3/issue" and method == "POST":
+            return 201, {"id": "20000", "key": "BENCH-NEW", "self": f"{self.url}/rest/api/3/issue/20000"}
+        if segments[:4] == ["rest", "api", "3", "issue"] and len(segments) == 5 and method == "GET":
+            suffix = segments[4].rpartition("-")[2]
+            return 200, _issue(int(suffix) if suffix.isdigit() else 0, b.body_chars)
+
+        # Confluence
+        if path == "/wiki/rest/api/content/search" and method == "GET":
+            start = int(query.get("cursor") or 0)
+            size = min(int(query.get("limit") or b.page_size), b.page_size)
+            end = min(start + size, b.total_pages)
+            results = [_page(str(1000 + i), 200, v2=False) for i in range(start, end)]
+            page = {"results": results, "start": start, "limit": size, "size": len(results), "_links": {}}
+            if end < b.total_pages:
+                next_query = urlencode({"cql": query.get("cql", ""), "cursor": end, "limit": size})
+                page["_links"]["next"] = f"/rest/api/content/search?{next_query}"
+            return 200, page
+        if segments[:4] == ["wiki", "api", "v2", "pages"] and len(segments) == 5 and method == "GET":
+            return 200, _page(segments[4], b.body_chars, v2=True)
+        if segments[:4] == ["wiki", "api", "v2", "pages"] and len(segments) == 4 and method == "POST":
+            return 200, {"id": "9999", "title": body.get("title"), "version": {"number": 1}}
+        if segments[:4] == ["wiki", "api", "v2", "spaces"] and method == "GET":
+            return 200, {"results": [{"id": "1", "key": query.get("keys", "BENCH")}]}
+        if segments[:4] == ["wiki", "rest", "api", "content"] and len(segments) == 5 and method == "GET":
+            return 200, _page(segments[4], b.body_chars, v2=False)
+        if path == "/wiki/rest/api/content" and method == "POST":
+            return 200, {"id": "9999", "title": body.get("title"), "version": {"number": 1}}
+
+        # Cal.com
+        if path == "/v2/event-types" and method == "GET":
+            return 200, {"status": "success", "data": [{"id": i, "slug": f"meeting-{i}", "lengthInMinutes": 30}
+                                                        for i in range(1, 6)]}
+        if segments[:2] == ["v2", "event-types"] and segments[-1:] == ["availability"] and method == "GET":
+            slots = {f"2026-01-{day:02d}": [{"time": f"2026-01-{day:02d}T{hour:02d}:00:00Z"} for hour in range(9, 17)]
+                     for day in range(1, 8)}
+            return 200, {"status": "success", "data": {"slots": slots}}
+        if path == "/v2/bookings" and method == "POST":
+            return 201, {"status": "success", "data": {"id": 1, "uid": "bench-booking", "start": body.get("start")}}
+
+        # Resend
+        if path == "/emails" and method == "POST":
+            return 200, {"id": "bench-email"}
+
+        return 404, {"message": f"No mock route for {method} {path}"}
@@ -0,0 +1,322 @@
+"""Replay a recorded call mix against the JSON runner and report throughput and latency.
+
+The workload comes from the Postman collection's `/mcp-json` requests (with its environment's
+variables filled in) or from a trace file: JSON lines with `tool` and `args`, and optionally `ts`
+(seconds), `site` and `priority`. `tool_call` lines from the connectors' JSON logs are accepted
+too; they carry no arguments, so those are taken from the collection's request for that tool.
+
+Only calls to tools the JSON runner serves (the Jira connector's) are replayed; others, such as
+the collection's deliberate invalid-tool request, are skipped and counted. Against a real
+gateway (`--url`), tools that change data are skipped too unless `--allow-writes` is given.
+
+Calls are sent open-loop: each is due at a fixed time whether or not earlier calls have
+finished, and its latency counts from that time, so a slow gateway can't hide its queueing.
+Latency percentiles cover successful calls only. By default the JSON runner runs in-process
+against the local mock upstreams.
+
+    python benchmarks/replay.py --rate 50 --duration 30
+    python benchmarks/replay.py --trace traces.jsonl --speed 2
+    python benchmarks/replay.py --url http://127.0.0.1:8001 --rate 20 --duration 60
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from mock_upstreams import MockUpstreamServer, UpstreamBehavior  # noqa: E402
+import run_benchmarks  # noqa: E402
+
+POSTMAN_DIR = os.path.join(os.path.dirname(__file__), "..", "postman")
+DEFAULT_COLLECTION = os.path.join(POSTMAN_DIR, "mcp_connectors.postman_collection.json")
+DEFAULT_ENVIRONMENT = os.path.join(POSTMAN_DIR, "mcp_connectors.postman_environment.json")
+REPLAY_FORMAT_VERSION = 1
+
+_VARIABLE = re.compile(r"\{\{\s*([\w.-]+)\s*\}\}")
+# Tools that change upstream data
+WRITE_TOOLS = frozenset({"create_issue", "create_page", "create_pages", "update_pages", "create_booking",
+                         "send_email"})
+
+
+def _substitute(text: str, variables: dict) -> str:
+    return _VARIABLE.sub(lambda match: str(variables.get(match.group(1), match.group(0))), text)
+
+
+def _variables(collection: dict, environment_path: str | None) -> dict:
+    variables = {item["key"]: item.get("value") for item in collection.get("variable") or []}
+    if environment_path and os.path.exists(environment_path):
+        with open(environment_path, encoding="utf-8") as handle:
+            environment = json.load(handle)
+        variables.update({item["key"]: item.get("value") for item in environment.get("values") or []
+                          if item.get("enabled", True)})
+    return variables
+
+
+def _requests(items: list):
+    for item in items:
+        if "item" in item:
+            yield from _requests(item["item"])
+        elif "request" in item:
+            yield item
+
+
+def load_collection(path: str = DEFAULT_COLLECTION, environment_path: str | None = DEFAULT_ENVIRONMENT) -> list[dict]:
+    """The collection's JSON runner calls as {"name", "tool", "args"}, variables filled in."""
+    with open(path, encoding="utf-8") as handle:
+        collection = json.load(handle)
+    variables = _variables(collection, environment_path)
+    calls = []
+    for item in _requests(collection.get("item") or []):
+        request = item["request"]
+        url = request.get("url")
+        url = url if isinstance(url, str) else (url or {}).get("raw", "")
+        raw = ((request.get("body") or {}).get("raw") or "").strip()
+        # Only the JSON runner speaks {"tool", "args"}; the streamable HTTP server needs JSON-RPC
+        if request.get("method") != "POST" or not url.rstrip("/").endswith("/mcp-json") or not raw:
+            continue
+        body = json.loads(_substitute(raw, variables))
+        calls.append({"name": item.get("name"), "tool": body.get("tool"), "args": body.get("args") or {}})
+    return calls
+
+
+def load_trace(path: str, templates: list[dict] | None = None) -> list[dict]:
+    """Calls recorded in a JSON lines trace, in time order, with `offset` seconds from the first."""
+    examples = {call["tool"]: call["args"] for call in templates or []}
+    calls = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            tool = record.get("tool")
+            if not tool or (record.get("msg") not in (None, "tool_call")):
+                continue
+            args = record["args"] if "args" in record else examples.get(tool, {})
+            calls.append({"tool": tool, "args": args, "ts": record.get("ts"),
+                          "site": record.get("site"), "priority": record.get("priority")})
+    stamped = [call["ts"] for call in calls if call["ts"] is not None]
+    first = min(stamped) if stamped else 0
+    for call in calls:
+        stamp = call.pop("ts")
+        call["offset"] = stamp - first if stamp is not None else None
+    calls.sort(key=lambda call: call["offset"] if call["offset"] is not None else float("inf"))
+    return calls
+
+
+def served_tools() -> set[str]:
+    """Tools the JSON runner serves: those of the Jira connector it mounts."""
+    import asyncio
+    from jira_mcp import mcp
+    return set(asyncio.run(mcp.get_tools()))
+
+
+def select(calls: list[dict], served: set[str], tools: set[str] | None = None,
+           allow_writes: bool = True) -> tuple[list[dict], dict]:
+    """The calls worth replaying, and the number skipped per tool.
+
+    Calls to tools the target doesn't serve, outside `tools` when given, or that write while
+    `allow_writes` is off are skipped.
+    """
+    kept, skipped = [], {}
+    for call in calls:
+        tool = call["tool"]
+        if tool not in served or (tools and tool not in tools) or (not allow_writes and tool in WRITE_TOOLS):
+            skipped[str(tool)] = skipped.get(str(tool), 0) + 1
+        else:
+            kept.append(call)
+    return kept, dict(sorted(skipped.items()))
+
+
+def schedule(calls: list[dict], rate: float | None = None, duration: float | None = None,
+             speed: float = 1.0, arrivals: str = "poisson", seed: int | None = 1) -> list[tuple[float, dict]]:
+    """(due offset in seconds, call) pairs to send.
+
+    With `rate` the calls are cycled through at that many per second for `duration` seconds
+    (default: one pass over the calls), spaced evenly or as a Poisson process. Without it, each
+    call keeps its recorded offset divided by `speed`.
+    """
+    if not calls:
+        return []
+    if rate is None:
+        if any(call.get("offset") is None for call in calls):
+            raise ValueError("The calls have no timestamps; pass a rate")
+        return [(call["offset"] / speed, call) for call in calls]
+    generator = random.Random(seed)
+    total = int(rate * duration) if duration else len(calls)
+    due, plan = 0.0, []
+    for call in itertools.islice(itertools.cycle(calls), total):
+        plan.append((due, call))
+        due += generator.expovariate(rate) if arrivals == "poisson" else 1 / rate
+    return plan
+
+
+def _summarise(samples: list[dict], wall: float) -> dict:
+    # Failures such as 404s and 503s return quickly and would drag the percentiles down
+    latencies = sorted(sample["latency"] for sample in samples if sample["status"] == 200)
+    statuses = {}
+    for sample in samples:
+        statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+    ok = statuses.get("200", 0)
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "requests": len(samples),
+        "ok": ok,
+        "failed": len(samples) - ok,
+        "statuses": dict(sorted(statuses.items())),
+        "throughput_rps": round(ok / wall, 2) if wall else None,
+        "latency_ms": {
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": ms(run_benchmarks.percentile(latencies, 0.5)),
+            "p95": ms(run_benchmarks.percentile(latencies, 0.95)),
+            "p99": ms(run_benchmarks.percentile(latencies, 0.99)),
+            "max": ms(latencies[-1] if latencies else None),
+        },
+    }
+
+
+def replay(plan: list[tuple[float, dict]], gateway_url: str, max_workers: int = 64, timeout: float = 30) -> dict:
+    """Send the planned calls to the JSON runner on time and summarise them overall and per tool."""
+    import requests
+
+    local = threading.local()
+    samples = []
+    lock = threading.Lock()
+
+    def send(due_at: float, call: dict):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        headers = {}
+        if call.get("site"):
+            headers["X-MCP-Site"] = call["site"]
+        if call.get("priority"):
+            headers["X-MCP-Priority"] = call["priority"]
+        try:
+            response = local.session.post(f"{gateway_url}/mcp-json", json={"tool": call["tool"], "args": call["args"]},
+                                          headers=headers, timeout=timeout)
+            status = response.status_code
+        except requests.RequestException:
+            status = "exception"
+        with lock:
+            samples.append({"tool": call["tool"], "status": status, "latency": time.perf_counter() - due_at})
+
+    start = time.perf_counter()
+    late = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for offset, call in plan:
+            due_at = start + offset
+            delay = due_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -0.01:
+                late += 1
+            pool.submit(send, due_at, call)
+    wall = time.perf_counter() - start
+
+    tools = sorted({sample["tool"] for sample in samples}, key=str)
+    offered = plan[-1][0] if plan else 0
+    return {
+        "overall": {**_summarise(samples, wall),
+                    "offered_rps": round(len(plan) / offered, 2) if offered else None,
+                    "sent_late": late, "wall_seconds": round(wall, 4)},
+        "tools": {str(tool): _summarise([s for s in samples if s["tool"] == tool], wall) for tool in tools},
+    }
+
+
+def run_replay(plan: list[tuple[float, dict]], behavior: UpstreamBehavior | None = None, url: str | None = None,
+               max_workers: int = 64) -> dict:
+    """Replay against `url`, or against an in-process JSON runner and mock upstreams; returns the report."""
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": run_benchmarks._git_commit(),
+        "calls": len(plan),
+        "target": url or "in-process JSON runner with mock upstreams",
+    }
+    if url:
+        return {"format_version": REPLAY_FORMAT_VERSION, "meta": meta, **replay(plan, url, max_workers)}
+    behavior = behavior or UpstreamBehavior()
+    with MockUpstreamServer(behavior) as upstream_server:
+        run_benchmarks.point_connectors_at(upstream_server.url)
+        with run_benchmarks.GatewayServer() as gateway:
+            report = replay(plan, gateway.url, max_workers)
+        meta["upstream"] = behavior.to_dict()
+        report["upstream_requests"] = dict(sorted(upstream_server.requests.items()))
+    return {"format_version": REPLAY_FORMAT_VERSION, "meta": meta, **report}
+
+
+def _print_report(report: dict):
+    rows = [("all", report["overall"])] + list(report["tools"].items())
+    for name, summary in rows:
+        latency = summary["latency_ms"]
+        print(f"{name:<20} n={summary['requests']:<6} ok={summary['ok']:<6} {summary['throughput_rps']:>9} req/s  "
+              f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms statuses={summary['statuses']}",
+              file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION, help="Postman collection to take calls from")
+    parser.add_argument("--environment", default=DEFAULT_ENVIRONMENT, help="Postman environment for its variables")
+    parser.add_argument("--trace", help="JSON lines trace to replay instead of the collection")
+    parser.add_argument("--tools", help="Comma-separated tools to keep (default: all)")
+    parser.add_argument("--rate", type=float, help="Calls per second (default for traces: recorded timing)")
+    parser.add_argument("--duration", type=float, help="Seconds to run at --rate (default: one pass)")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up of recorded trace timing")
+    parser.add_argument("--workers", type=int, default=64, help="Most calls in flight at once")
+    parser.add_argument("--url", help="Existing JSON runner to target instead of the in-process one")
+    parser.add_argument("--allow-writes", action="store_true",
+                        help="Replay tools that change data (create_issue, ...) against --url too")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Mock upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls answered 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of upstream calls answered 429")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Report file (default: benchmarks/results/replay-<timestamp>.json)")
+    args = parser.parse_args(argv)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    templates = load_collection(args.collection, args.environment)
+    calls = load_trace(args.trace, templates) if args.trace else templates
+    wanted = {name.strip() for name in args.tools.split(",")} if args.tools else None
+    # The mock upstreams make writes harmless in-process; a real gateway needs the opt-in
+    calls, skipped = select(calls, served_tools(), wanted, allow_writes=args.allow_writes or not args.url)
+    if skipped:
+        print(f"Skipped calls: {skipped}", file=sys.stderr)
+    if not calls:
+        print("No calls to replay", file=sys.stderr)
+        return 1
+    rate = args.rate if args.rate or args.trace else 10.0
+    plan = schedule(calls, rate=rate, duration=args.duration, speed=args.speed, arrivals=args.arrivals, seed=args.seed)
+
+    behavior = UpstreamBehavior(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                                rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    report = run_replay(plan, behavior, url=args.url, max_workers=args.workers)
+    report["meta"]["skipped"] = skipped
+    _print_report(report)
+
+    output = args.output
+    if not output:
+        os.makedirs(run_benchmarks.RESULTS_DIR, exist_ok=True)
+        output = os.path.join(run_benchmarks.RESULTS_DIR,
+                              "replay-" + datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json")
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Report written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
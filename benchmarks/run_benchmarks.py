@@ -0,0 +1,334 @@
+"""Drive the connector tools and the JSON runner against local mock upstreams and record the results.
+
+Each scenario runs a fixed number of calls at every concurrency level and reports throughput,
+latency percentiles, error counts and memory. Results are written as JSON so runs can be
+compared; `--compare` exits non-zero when a scenario regressed beyond the tolerance.
+
+    python benchmarks/run_benchmarks.py --concurrency 1,4,16 --requests 200
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import fastjson  # noqa: E402
+from mock_upstreams import MockUpstreamServer, UpstreamBehavior  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_CONCURRENCY = (1, 4, 16, 64)
+FORMAT_VERSION = 1
+
+
+def point_connectors_at(base_url: str):
+    """Point every connector's module configuration at the mock upstream."""
+    import cal_mcp
+    import confluence_mcp
+    import jira_mcp
+    import resend_mcp
+
+    jira_mcp.JIRA_BASE_URL = base_url
+    jira_mcp.JIRA_USERNAME = "bench@example.com"
+    jira_mcp.JIRA_API_TOKEN = "bench-token"
+    confluence_mcp.CONFLUENCE_BASE_URL = base_url
+    confluence_mcp.CONFLUENCE_USERNAME = "bench@example.com"
+    confluence_mcp.CONFLUENCE_API_TOKEN = "bench-token"
+    confluence_mcp._API_VERSIONS.clear()
+    cal_mcp.CAL_API_KEY = "cal_bench_key"
+    cal_mcp.CAL_API_BASE_URL = base_url
+    resend_mcp.RESEND_API_KEY = "re_bench_key"
+    resend_mcp.RESEND_API_BASE_URL = base_url
+
+
+def _tool(module, name):
+    tool = getattr(module, name)
+    return getattr(tool, "fn", tool)
+
+
+class GatewayServer:
+    """Run the JSON runner's Starlette app under uvicorn in a background thread."""
+
+    def __init__(self, host: str = "127.0.0.1"):
+        import socket
+
+        import uvicorn
+        import run_jira_json
+
+        with socket.socket() as probe:
+            probe.bind((host, 0))
+            self.port = probe.getsockname()[1]
+        self.url = f"http://{host}:{self.port}"
+        self.server = uvicorn.Server(uvicorn.Config(run_jira_json.app, host=host, port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self.server.run, name="bench-gateway", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("JSON runner did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def build_scenarios(gateway_url: str | None = None) -> dict:
+    """Map scenario names to callables taking the call index; each returns a result to check."""
+    import cal_mcp
+    import confluence_mcp
+    import jira_mcp
+    import resend_mcp
+
+    scenarios = {
+        "jira.get_issue": lambda i: _tool(jira_mcp, "get_issue")(f"BENCH-{i % 100}"),
+        "jira.search_issues": lambda i: _tool(jira_mcp, "search_issues")("project = BENCH"),
+        "jira.iter_search": lambda i: list(jira_mcp.iter_search("project = BENCH")),
+        "confluence.search_pages": lambda i: _tool(confluence_mcp, "search_pages")("benchmark", max_results=100),
+        "confluence.get_page": lambda i: _tool(confluence_mcp, "get_page")(str(1000 + i % 100)),
+        "confluence.get_page_chunk": lambda i: _tool(confluence_mcp, "get_page_chunk")(str(1000 + i % 100)),
+        "cal.get_event_types": lambda i: _tool(cal_mcp, "get_event_types")(),
+        "cal.get_availability": lambda i: _tool(cal_mcp, "get_availability")(1, "2026-01-01", "2026-01-07"),
+        "resend.send_email": lambda i: _tool(resend_mcp, "send_email")("bench@example.com", "Benchmark", "<p>hi</p>"),
+    }
+    if gateway_url:
+        import requests
+
+        local = threading.local()
+
+        def gateway_get_issue(i):
+            # One keep-alive session per worker, like a real client
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            response = local.session.post(f"{gateway_url}/mcp-json", timeout=30,
+                                          json={"tool": "get_issue", "args": {"issue_key": f"BENCH-{i % 100}"}})
+            return response.json() if response.status_code == 200 else f"Error: {response.status_code}"
+
+        scenarios["gateway.get_issue"] = gateway_get_issue
+    return scenarios
+
+
+def _is_error(result) -> bool:
+    import metrics
+
+    return metrics.is_error_result(result) or (isinstance(result, dict) and "error" in result)
+
+
+def percentile(sorted_values: list, q: float) -> float | None:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _max_rss_kb() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_level(call, concurrency: int, total: int, trace_memory: bool = False) -> dict:
+    """Make `total` calls with `concurrency` workers and summarise them."""
+    latencies = []
+    errors = 0
+    exceptions = 0
+    lock = threading.Lock()
+
+    def one(index):
+        nonlocal errors, exceptions
+        start = time.perf_counter()
+        try:
+            failed = _is_error(call(index))
+            raised = False
+        except Exception:
+            failed = raised = True
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += failed
+            exceptions += raised
+
+    if trace_memory:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - wall_start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+
+    latencies.sort()
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "exceptions": exceptions,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(total / wall, 2) if wall else None,
+        "latency_ms": {
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": ms(percentile(latencies, 0.5)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "max": ms(latencies[-1] if latencies else None),
+        },
+        "memory": {"peak_traced_kb": peak, "max_rss_kb": _max_rss_kb()},
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(behavior: UpstreamBehavior, scenario_names: list[str] | None = None,
+                   concurrency_levels=DEFAULT_CONCURRENCY, requests_per_level: int = 200,
+                   warmup: int = 5, trace_memory: bool = False, gateway: bool = True, progress=None) -> dict:
+    """Run the selected scenarios against a fresh mock upstream and return the results document."""
+    import contextlib
+
+    results = []
+    with MockUpstreamServer(behavior) as upstream_server:
+        point_connectors_at(upstream_server.url)
+        wants_gateway = gateway and (not scenario_names or "gateway.get_issue" in scenario_names)
+        with (GatewayServer() if wants_gateway else contextlib.nullcontext()) as gateway_server:
+            scenarios = build_scenarios(gateway_server.url if gateway_server else None)
+            selected = scenario_names or list(scenarios)
+            unknown = [name for name in selected if name not in scenarios]
+            if unknown:
+                raise ValueError(f"Unknown scenario(s): {unknown}; choose from {sorted(scenarios)}")
+            for name in selected:
+                for index in range(warmup):
+                    scenarios[name](index)
+                for concurrency in concurrency_levels:
+                    level = run_level(scenarios[name], concurrency, requests_per_level, trace_memory)
+                    level["scenario"] = name
+                    results.append(level)
+                    if progress:
+                        progress(level)
+        upstream_requests = dict(sorted(upstream_server.requests.items()))
+
+    return {
+        "format_version": FORMAT_VERSION,
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "json_backend": fastjson.BACKEND,
+            "requests_per_level": requests_per_level,
+            "concurrency_levels": list(concurrency_levels),
+            "upstream": behavior.to_dict(),
+        },
+        "results": results,
+        "upstream_requests": upstream_requests,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.2) -> list[str]:
+    """List scenario/concurrency pairs whose throughput fell or p95 latency rose by more than `tolerance`."""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in current.get("results", []):
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        label = f"{result['scenario']} @ {result['concurrency']}"
+        if before["throughput_rps"] and result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s")
+        old_p95, new_p95 = before["latency_ms"]["p95"], result["latency_ms"]["p95"]
+        if old_p95 and new_p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"{label}: p95 {old_p95} -> {new_p95} ms")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{label}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def _print_level(level: dict):
+    latency = level["latency_ms"]
+    print(f"{level['scenario']:<28} c={level['concurrency']:<4} {level['throughput_rps']:>9} req/s  "
+          f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms errors={level['errors']}",
+          file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", help="Comma-separated scenario names (default: all)")
+    parser.add_argument("--concurrency", default=",".join(map(str, DEFAULT_CONCURRENCY)),
+                        help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Calls per scenario and concurrency level")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Mock upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls answered 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of upstream calls answered 429")
+    parser.add_argument("--page-size", type=int, default=50, help="Results per mock search page")
+    parser.add_argument("--total-results", type=int, default=200, help="Issues and pages matched by mock searches")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tracemalloc", action="store_true", help="Record peak traced memory (slows calls down)")
+    parser.add_argument("--no-gateway", action="store_true", help="Skip the JSON runner scenario")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+    # Per-call log lines would flood the terminal; keep them unless the caller asked for a level
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    behavior = UpstreamBehavior(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, page_size=args.page_size,
+        total_issues=args.total_results, total_pages=args.total_results, seed=args.seed,
+    )
+    document = run_benchmarks(
+        behavior,
+        scenario_names=[s.strip() for s in args.scenarios.split(",")] if args.scenarios else None,
+        concurrency_levels=[int(c) for c in args.concurrency.split(",")],
+        requests_per_level=args.requests,
+        trace_memory=args.tracemalloc,
+        gateway=not args.no_gateway,
+        progress=_print_level,
+    )
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json")
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions = compare(json.load(handle), document, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import request_log
+import tracing
+
+# Every live cache, so metrics and snapshots can find them without a central config
+_caches: "weakref.WeakSet[TTLCache]" = weakref.WeakSet()
+# Discovered facts that never expire (API versions, ids), by name, so snapshots can save them too
+_states: dict[str, dict] = {}
+# Called with a cache's name on its first use; returns (key, value, expires_at) entries saved by an
+# earlier process, with expires_at in epoch seconds (see snapshots.py)
+_restorer = None
+
+
+def all_caches() -> list:
+    """Return the live caches ordered by name."""
+    return sorted(list(_caches), key=lambda cache: cache.name)
+
+
+def register_state(name: str, mapping: dict) -> dict:
+    """Include a plain dict in cache snapshots; returns it, for use at module level."""
+    _states[name] = mapping
+    return mapping
+
+
+def all_states() -> dict[str, dict]:
+    return dict(_states)
+
+
+def set_restorer(restorer):
+    """Install the function caches load saved entries from, or None to start cold."""
+    global _restorer
+    _restorer = restorer
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after being set.
+
+    A ttl of 0 disables the cache: `get` always misses and `set` stores nothing.
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._restored = False
+        _caches.add(self)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @property
+    def restored(self) -> bool:
+        """Whether saved entries have been loaded; until then a snapshot must keep them as they are."""
+        return self._restored
+
+    def get(self, key, default=None):
+        if not self.enabled:
+            self.misses += 1
+            return default
+        if not self._restored:
+            self._restore()
+        with tracing.span("cache.get", cache=self.name) as current, self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                current.set_attribute("cache.hit", False)
+                request_log.record_cache(False)
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            current.set_attribute("cache.hit", True)
+            request_log.record_cache(True)
+            return entry[1]
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _restore(self):
+        """Load entries saved by an earlier process, once, keeping any set since start-up."""
+        with self._lock:
+            if self._restored:
+                return
+            self._restored = True
+            if _restorer is None:
+                return
+            saved = _restorer(self.name)
+            now, wall = time.monotonic(), time.time()
+            # Restored entries go to the least recently used end, in their saved order
+            for key, value, expires_at in reversed(saved):
+                remaining = min(expires_at - wall, self.ttl)
+                if remaining > 0 and key not in self._entries:
+                    self._entries[key] = (now + remaining, value)
+                    self._entries.move_to_end(key, last=False)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def entries(self) -> list[tuple]:
+        """Live entries as (key, value, expires_at) with expires_at in epoch seconds, least recent first."""
+        with self._lock:
+            now, wall = time.monotonic(), time.time()
+            return [(key, value, wall + expiry - now) for key, (expiry, value) in self._entries.items()
+                    if expiry > now]
+
+    def invalidate(self, key) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def invalidate_matching(self, predicate) -> int:
+        """Drop every entry whose key satisfies `predicate`; returns how many were dropped."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -2,49 +2,85 @@ from fastmcp import FastMCP
 import requests
 import os
 from dotenv import load_dotenv
+import credentials
+import hedging
+import metrics
+import snapshots
+import upstream
+from cache import TTLCache
 
 load_dotenv()
 
 # Placeholder for API key - replace with your actual Cal.com API key
 CAL_API_KEY = os.getenv("CAL_API_KEY")
+# Overridable so benchmarks and tests can point the connector at a local stand-in
+CAL_API_BASE_URL = os.getenv("CAL_API_BASE_URL", "https://api.cal.com").rstrip("/")
+
+# Read caches, disabled unless CAL_CACHE_TTL is set; booking webhooks invalidate availability
+# only in the process that receives them (see webhooks.py)
+CAL_CACHE_TTL = float(os.getenv("CAL_CACHE_TTL", "0"))
+EVENT_TYPES_CACHE = TTLCache("cal_event_types", CAL_CACHE_TTL)
+AVAILABILITY_CACHE = TTLCache("cal_availability", CAL_CACHE_TTL)
+
+def _reload_env_credentials():
+    global CAL_API_KEY
+    CAL_API_KEY = os.getenv("CAL_API_KEY")
+
+credentials.register_env_reload("cal", _reload_env_credentials)
+
+def _api_key() -> str:
+    """Return the API key for this call's site: a named site's key, else CAL_API_KEY."""
+    site = credentials.for_service("cal")
+    if site is not None:
+        return site.auth_header
+    if not CAL_API_KEY:
+        raise ValueError('CAL_API_KEY is not set')
+    return CAL_API_KEY
 
 mcp = FastMCP("Cal.com MCP Server")
 
 @mcp.tool
+@metrics.instrument_tool("cal")
 def get_event_types() -> str:
     """Get list of event types from Cal.com."""
-    if not CAL_API_KEY:
-        raise ValueError('CAL_API_KEY is not set')
+    api_key = _api_key()
+
+    cache_key = ("event-types", credentials.current_site())
+    cached = EVENT_TYPES_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
 
-    url = "https://api.cal.com/v2/event-types"
+    url = f"{CAL_API_BASE_URL}/v2/event-types"
     # Cal.com API v2 requires cal-api-version header
     headers = {
-        "Authorization": CAL_API_KEY,
+        "Authorization": api_key,
         "cal-api-version": "2024-08-06",
         "Content-Type": "application/json"
     }
     try:
-        response = requests.get(url, headers=headers, timeout=20)
+        response = upstream.request("cal", "GET", url, headers=headers, timeout=20)
     except requests.RequestException as exc:
         return f"Request exception when calling Cal.com event-types: {exc}"
 
     if response.status_code == 200:
         try:
-            return response.json()
+            data = upstream.decode_json(response)
         except ValueError:
             return f"OK ({response.status_code}) but failed to decode JSON: {response.text}"
+        EVENT_TYPES_CACHE.set(cache_key, data)
+        return data
     else:
         return f"Error: {response.status_code} - {response.text}"
 
 @mcp.tool
+@metrics.instrument_tool("cal")
 def create_booking(event_type_id: int, start_time: str, attendee_email: str, attendee_name: str) -> str:
     """Create a booking on Cal.com."""
-    if not CAL_API_KEY:
-        raise ValueError('CAL_API_KEY is not set')
+    api_key = _api_key()
 
-    url = "https://api.cal.com/v2/bookings"
+    url = f"{CAL_API_BASE_URL}/v2/bookings"
     headers = {
-        "Authorization": CAL_API_KEY,
+        "Authorization": api_key,
         "cal-api-version": "2024-08-06",
         "Content-Type": "application/json"
     }
@@ -57,43 +93,54 @@ def create_booking(event_type_id: int, start_time: str, attendee_email: str, att
         }
     }
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=20)
+        response = upstream.request("cal", "POST", url, headers=headers, json=payload, timeout=20)
     except requests.RequestException as exc:
         return f"Request exception when creating Cal.com booking: {exc}"
 
     if response.status_code == 201:
         try:
-            return response.json()
+            return upstream.decode_json(response)
         except ValueError:
             return f"OK ({response.status_code}) but failed to decode JSON: {response.text}"
     else:
         return f"Error: {response.status_code} - {response.text}"
 
 @mcp.tool
+@metrics.instrument_tool("cal")
 def get_availability(event_type_id: int, date_from: str, date_to: str) -> str:
     """Get availability for an event type."""
-    if not CAL_API_KEY:
-        raise ValueError('CAL_API_KEY is not set')
+    api_key = _api_key()
+
+    # Event type ids come first so booking webhooks can invalidate by id
+    cache_key = (int(event_type_id), date_from, date_to, credentials.current_site())
+    cached = AVAILABILITY_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
 
-    url = f"https://api.cal.com/v2/event-types/{event_type_id}/availability"
+    url = f"{CAL_API_BASE_URL}/v2/event-types/{event_type_id}/availability"
     headers = {
-        "Authorization": CAL_API_KEY,
+        "Authorization": api_key,
         "cal-api-version": "2024-08-06",
         "Content-Type": "application/json"
     }
     params = {"dateFrom": date_from, "dateTo": date_to}
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=20)
+        response = hedging.request("get_availability", "cal", url, headers=headers, params=params, timeout=20)
     except requests.RequestException as exc:
         return f"Request exception when fetching Cal.com availability: {exc}"
 
     if response.status_code == 200:
         try:
-            return response.json()
+            data = upstream.decode_json(response)
         except ValueError:
             return f"OK ({response.status_code}) but failed to decode JSON: {response.text}"
+        AVAILABILITY_CACHE.set(cache_key, data)
+        return data
     else:
         return f"Error: {response.status_code} - {response.text}"
 
 if __name__ == "__main__":
+    metrics.start_http_server_from_env()
+    credentials.install_reload_handler()
+    snapshots.start()
     mcp.run()
\ No newline at end of file
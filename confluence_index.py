@@ -0,0 +1,247 @@
+import re
+import sqlite3
+import threading
+import time
+
+from storage_format import convert_storage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id TEXT PRIMARY KEY,
+    space_key TEXT NOT NULL,
+    title TEXT,
+    version INTEGER,
+    last_modified TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    id UNINDEXED, title, body, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS spaces (
+    space_key TEXT PRIMARY KEY,
+    watermark TEXT,
+    synced_at REAL
+);
+"""
+
+# Title matches count for more than body matches when ranking
+_TITLE_WEIGHT = 10.0
+_BODY_WEIGHT = 1.0
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts5_available() -> bool:
+    """Return True if the bundled SQLite was built with FTS5."""
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+        conn.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def to_match_query(query: str) -> str | None:
+    """Turn free text into an FTS5 query that ANDs every word, or None if there are no words.
+
+    Each token is quoted so user input can never be parsed as FTS5 operators.
+    """
+    tokens = _TOKEN_PATTERN.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"' for token in tokens)
+
+
+def _last_modified(page: dict) -> str:
+    """Return when a page was last modified (ISO 8601, so it sorts as a string).
+
+    v2 pages carry it as version.createdAt, v1 content as version.when.
+    """
+    version = page.get("version") or {}
+    return version.get("createdAt") or version.get("when") or ""
+
+
+class ConfluenceIndex:
+    """SQLite FTS5 index of page titles and bodies for a set of spaces."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def synced_at(self, space_key: str) -> float | None:
+        """When the space last finished a sync (epoch seconds), or None if it never has."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM spaces WHERE space_key = ?", (space_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_synced(self, space_key: str) -> bool:
+        """Return True once a space has completed at least one sync."""
+        return bool(self.synced_at(space_key))
+
+    def watermark(self, space_key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT watermark FROM spaces WHERE space_key = ?", (space_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def upsert_page(self, space_key: str, page: dict):
+        """Index (or re-index) one page from a v2 page object with a storage body."""
+        page_id = str(page["id"])
+        storage = ((page.get("body") or {}).get("storage") or {}).get("value", "")
+        lines, _ = convert_storage(storage, markdown=False)
+        version = (page.get("version") or {}).get("number")
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pages (id, space_key, title, version, last_modified) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET space_key = excluded.space_key, title = excluded.title, "
+                "version = excluded.version, last_modified = excluded.last_modified",
+                (page_id, space_key, page.get("title"), version, _last_modified(page))
+            )
+            self._conn.execute("DELETE FROM pages_fts WHERE id = ?", (page_id,))
+            self._conn.execute(
+                "INSERT INTO pages_fts (id, title, body) VALUES (?, ?, ?)",
+                (page_id, page.get("title") or "", "\n".join(lines))
+            )
+            self._conn.commit()
+
+    def delete_page(self, page_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE id = ?", (str(page_id),))
+            self._conn.execute("DELETE FROM pages_fts WHERE id = ?", (str(page_id),))
+            self._conn.commit()
+
+    def _versions(self, space_key: str) -> dict[str, int | None]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT id, version FROM pages WHERE space_key = ?", (space_key,)))
+
+    def sync_space(self, space_key: str, list_pages, fetch_page=None, full: bool = False) -> int:
+        """Index pages modified since the space's watermark; returns how many were (re)indexed.
+
+        `list_pages(space_key)` must yield v2 page objects, most recently modified first, so an
+        incremental sync stops at the first page older than the watermark. Pages listed without a
+        storage body are fetched with `fetch_page(page_id)`, and only when their version differs
+        from the indexed one, so a metadata listing costs one body fetch per changed page.
+        A full sync walks the whole listing and drops pages that no longer exist.
+
+        The incremental stop is strictly older than the watermark: pages stamped exactly at it may
+        have changed after the last sync read the listing, and the version check skips them if not.
+        """
+        watermark = None if full else self.watermark(space_key)
+        indexed = self._versions(space_key)
+        newest = watermark
+        seen = set()
+        count = 0
+        for page in list_pages(space_key):
+            modified = _last_modified(page)
+            if watermark and modified and modified < watermark:
+                break
+            page_id = str(page["id"])
+            seen.add(page_id)
+            if modified and (newest is None or modified > newest):
+                newest = modified
+            version = (page.get("version") or {}).get("number")
+            if version is not None and indexed.get(page_id) == version:
+                continue
+            if not (page.get("body") or {}).get("storage") and fetch_page is not None:
+                page = fetch_page(page_id)
+            self.upsert_page(space_key, page)
+            count += 1
+        with self._lock:
+            if full:
+                for page_id in indexed.keys() - seen:
+                    self._conn.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+                    self._conn.execute("DELETE FROM pages_fts WHERE id = ?", (page_id,))
+            self._conn.execute(
+                "INSERT INTO spaces (space_key, watermark, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(space_key) DO UPDATE SET watermark = excluded.watermark, synced_at = excluded.synced_at",
+                (space_key, newest, time.time())
+            )
+            self._conn.commit()
+        return count
+
+    def search(self, query: str, space_key: str | None = None, limit: int = 100) -> list[dict]:
+        """Return pages matching every word of `query`, best BM25 score first."""
+        match = to_match_query(query)
+        if match is None:
+            return []
+        sql = (
+            "SELECT p.id, p.title, p.space_key, p.version, "
+            f"bm25(pages_fts, 0.0, {_TITLE_WEIGHT}, {_BODY_WEIGHT}) AS score "
+            "FROM pages_fts JOIN pages p ON p.id = pages_fts.id "
+            "WHERE pages_fts MATCH ?"
+        )
+        params: list = [match]
+        if space_key:
+            sql += " AND p.space_key = ?"
+            params.append(space_key)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        # SQLite's bm25() is lower-is-better; flip the sign so higher scores rank higher
+        return [
+            {"id": row[0], "title": row[1], "space": row[2], "version": row[3], "score": -row[4]}
+            for row in rows
+        ]
+
+
+class IndexCrawler:
+    """Background thread that keeps a ConfluenceIndex in sync for a list of spaces.
+
+    The first pass over a space is a full crawl through `crawl_pages`, a listing that carries the
+    bodies. Later passes list metadata with `list_pages` and fetch only changed pages with
+    `fetch_page`. Every `reconcile_interval` seconds a pass walks the whole listing instead, so
+    pages deleted upstream are dropped from the index.
+    """
+
+    def __init__(self, index: ConfluenceIndex, spaces: list[str], list_pages, fetch_page=None,
+                 interval: float = 300, reconcile_interval: float = 3600, crawl_pages=None):
+        self.index = index
+        self.spaces = spaces
+        self.list_pages = list_pages
+        self.fetch_page = fetch_page
+        self.crawl_pages = crawl_pages or list_pages
+        self.interval = interval
+        self.reconcile_interval = reconcile_interval
+        self.last_error: str | None = None
+        self._reconciled_at = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="confluence-index-crawler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def sync_once(self):
+        reconcile = self.reconcile_interval > 0 and time.monotonic() - self._reconciled_at >= self.reconcile_interval
+        for space_key in self.spaces:
+            try:
+                if not self.index.is_synced(space_key):
+                    self.index.sync_space(space_key, self.crawl_pages, self.fetch_page, full=True)
+                else:
+                    self.index.sync_space(space_key, self.list_pages, self.fetch_page, full=reconcile)
+            except Exception as exc:
+                self.last_error = f"{space_key}: {exc}"
+                # Try the reconcile again on the next pass
+                reconcile = False
+        if reconcile:
+            self._reconciled_at = time.monotonic()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync_once()
+            self._stop.wait(self.interval)
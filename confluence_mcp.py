@@ -1,8 +1,20 @@
 from fastmcp import FastMCP
 import requests
 import os
-import base64
+import re
+import threading
+import time
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import credentials
+import hedging
+import metrics
+import snapshots
+import upstream
+from cache import TTLCache, register_state
+from storage_format import DEFAULT_CHUNK_CHARS, chunk_storage, validate_storage
 
 load_dotenv()
 
@@ -12,61 +24,346 @@ CONFLUENCE_USERNAME = os.getenv("CONFLUENCE_USERNAME", "your-email@example.com")
 CONFLUENCE_API_TOKEN = os.getenv("CONFLUENCE_API_TOKEN", "your-api-token")
 
 def get_basic_auth_header(username: str | None, token: str | None) -> str:
-    """Generate Basic Auth header value."""
-    if not username or not token:
-        raise ValueError("Username and token are required for authentication")
-    credentials = f"{username}:{token}"
-    encoded = base64.b64encode(credentials.encode()).decode()
-    return f"Basic {encoded}"
+    """Generate Basic Auth header value (computed once per credential pair)."""
+    return credentials.basic_auth_header(username, token)
 
-mcp = FastMCP("Confluence MCP Server")
+def _reload_env_credentials():
+    global CONFLUENCE_BASE_URL, CONFLUENCE_USERNAME, CONFLUENCE_API_TOKEN
+    CONFLUENCE_BASE_URL = os.getenv("CONFLUENCE_BASE_URL", "https://your-domain.atlassian.net")
+    CONFLUENCE_USERNAME = os.getenv("CONFLUENCE_USERNAME", "your-email@example.com")
+    CONFLUENCE_API_TOKEN = os.getenv("CONFLUENCE_API_TOKEN", "your-api-token")
 
-@mcp.tool
-def search_pages(query: str, space_key: str | None = None) -> str:
-    """Search for Confluence pages."""
+credentials.register_env_reload("confluence", _reload_env_credentials)
+
+def _site() -> tuple[str, str]:
+    """Return the base URL and Authorization header for this call's site.
+
+    A named site selected with credentials.use_site (the gateway's X-MCP-Site header) wins;
+    otherwise the CONFLUENCE_* settings apply, and must not be the placeholders.
+    """
+    site = credentials.for_service("confluence")
+    if site is not None:
+        return site.base_url, site.auth_header
     if not CONFLUENCE_BASE_URL or CONFLUENCE_BASE_URL == "https://your-domain.atlassian.net":
         raise ValueError('CONFLUENCE_BASE_URL is not set or using placeholder')
     if not CONFLUENCE_USERNAME or CONFLUENCE_USERNAME == "your-email@example.com":
         raise ValueError('CONFLUENCE_USERNAME is not set or using placeholder')
     if not CONFLUENCE_API_TOKEN or CONFLUENCE_API_TOKEN == "your-api-token":
         raise ValueError('CONFLUENCE_API_TOKEN is not set or using placeholder')
+    return CONFLUENCE_BASE_URL.rstrip('/'), get_basic_auth_header(CONFLUENCE_USERNAME, CONFLUENCE_API_TOKEN)
+
+mcp = FastMCP("Confluence MCP Server")
+
+# Page size for search requests; lean results are small enough to fetch more per page
+SEARCH_PAGE_SIZE = 25
+LEAN_SEARCH_PAGE_SIZE = 100
+
+# "auto" prefers the v2 API and falls back to v1 on sites that don't serve it
+CONFLUENCE_API_VERSION = os.getenv("CONFLUENCE_API_VERSION", "auto").lower()
+V2_PAGE_SIZE = 250
+V2_BODY_FORMAT = "storage"
+
+# get_page results keyed by (base URL, page id); disabled unless CONFLUENCE_CACHE_TTL is set
+PAGE_CACHE = TTLCache("confluence_pages", float(os.getenv("CONFLUENCE_CACHE_TTL", "0")))
+
+# Converted page chunks keyed by (base URL, page id, version, format, chunk size), least recent first
+CHUNK_CHARS = int(os.getenv("CONFLUENCE_CHUNK_CHARS", str(DEFAULT_CHUNK_CHARS)))
+CHUNK_CACHE_SIZE = int(os.getenv("CONFLUENCE_CHUNK_CACHE_SIZE", "128"))
+_CHUNK_CACHE: OrderedDict = OrderedDict()
+# Scheduler workers, the batch write pool and webhook invalidation all touch the chunk cache
+_CHUNK_CACHE_LOCK = threading.Lock()
+
+# Optional local full-text index; searches in these spaces are served locally once synced
+CONFLUENCE_INDEX_SPACES = [key.strip() for key in os.getenv("CONFLUENCE_INDEX_SPACES", "").split(",") if key.strip()]
+CONFLUENCE_INDEX_PATH = os.getenv("CONFLUENCE_INDEX_PATH", "confluence_index.db")
+CONFLUENCE_INDEX_INTERVAL = float(os.getenv("CONFLUENCE_INDEX_INTERVAL", "300"))
+# Seconds between full passes that also drop pages deleted upstream; 0 disables them
+CONFLUENCE_INDEX_RECONCILE_INTERVAL = float(os.getenv("CONFLUENCE_INDEX_RECONCILE_INTERVAL", "3600"))
+# Searches go upstream once a space's last completed sync is older than this, e.g. while the crawler fails
+CONFLUENCE_INDEX_MAX_STALENESS = float(os.getenv("CONFLUENCE_INDEX_MAX_STALENESS", "900"))
+_local_index = None
+_index_crawler = None
+_index_lock = threading.Lock()
+
+# Concurrent writes per create_pages/update_pages call
+CONFLUENCE_WRITE_CONCURRENCY = int(os.getenv("CONFLUENCE_WRITE_CONCURRENCY", "4"))
+
+# Detected API version per base URL, and v2 space ids per (base URL, space key); kept in cache snapshots
+_API_VERSIONS: dict[str, str] = register_state("confluence_api_versions", {})
+_SPACE_IDS: dict[tuple[str, str], str] = register_state("confluence_space_ids", {})
+
+_SPACE_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_~]+$")
 
-    # Confluence Cloud API path: /wiki/rest/api/ (not just /rest/api/)
-    url = f"{CONFLUENCE_BASE_URL.rstrip('/')}/wiki/rest/api/content/search"
+class ConfluenceAPIError(Exception):
+    """Raised when a paginated or helper request cannot be fetched or decoded."""
+
+def cql_quote(value: str) -> str:
+    """Quote a value as a CQL string literal, escaping backslashes and double quotes."""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+def build_search_cql(query: str, space_key: str | None = None) -> str:
+    """Build the CQL for a text search, optionally restricted to a space."""
+    cql = f"text ~ {cql_quote(query)}"
+    if space_key:
+        # Space keys are plain identifiers; anything else is quoted rather than interpolated
+        space = space_key if _SPACE_KEY_PATTERN.match(space_key) else cql_quote(space_key)
+        cql += f" and space = {space}"
+    return cql
+
+def _lean_result(result: dict) -> dict:
+    """Project a search result down to id, title, space key and version number."""
+    return {
+        "id": result.get("id"),
+        "title": result.get("title"),
+        "space": (result.get("space") or {}).get("key"),
+        "version": (result.get("version") or {}).get("number"),
+    }
+
+def iter_search_page_responses(query: str, space_key: str | None = None,
+                               max_results: int | None = None, lean: bool = False):
+    """Yield decoded search responses, following `_links.next` cursors until exhausted or capped."""
+    base, auth_header = _site()
+    url = f"{base}/wiki/rest/api/content/search"
     headers = {
         "Accept": "application/json",
-        "Authorization": get_basic_auth_header(CONFLUENCE_USERNAME, CONFLUENCE_API_TOKEN)
+        "Authorization": auth_header
     }
-    params = {"cql": f"text ~ '{query}'" + (f" and space = {space_key}" if space_key else "")}
+    page_size = LEAN_SEARCH_PAGE_SIZE if lean else SEARCH_PAGE_SIZE
+    params = {"cql": build_search_cql(query, space_key)}
+    if lean:
+        params["expand"] = "space,version"
+    fetched = 0
+    while url:
+        if max_results is not None:
+            params["limit"] = max(1, min(page_size, max_results - fetched))
+        else:
+            params["limit"] = page_size
+        try:
+            response = upstream.request("confluence", "GET", url, headers=headers, params=params, timeout=20)
+        except requests.RequestException as exc:
+            raise ConfluenceAPIError(f"Request exception when calling Confluence search: {exc}")
+        if response.status_code != 200:
+            raise ConfluenceAPIError(f"Error: {response.status_code} - {response.text}")
+        try:
+            data = upstream.decode_json(response)
+        except ValueError:
+            raise ConfluenceAPIError(f"OK ({response.status_code}) but failed to decode JSON: {response.text}")
+        results = data.get("results") or []
+        if max_results is not None:
+            results = results[:max_results - fetched]
+        fetched += len(results)
+        data["results"] = [_lean_result(r) for r in results] if lean else results
+        yield data
+
+        next_link = (data.get("_links") or {}).get("next")
+        if not next_link or not results or (max_results is not None and fetched >= max_results):
+            break
+        # The next link already carries cql, cursor and limit; it is relative to the /wiki context
+        url = next_link if next_link.startswith("http") else f"{base}/wiki{next_link}"
+        params = {}
+
+def iter_search_results(query: str, space_key: str | None = None,
+                        max_results: int | None = None, lean: bool = False):
+    """Yield search results one at a time as each page arrives."""
+    for page in iter_search_page_responses(query, space_key, max_results=max_results, lean=lean):
+        yield from page["results"]
+
+def local_index(start_crawler: bool = True):
+    """Return the local search index, starting its background crawler on first use.
+
+    Returns None when no spaces are configured or SQLite lacks FTS5. Processes that only
+    patch the index (such as the webhook receiver) pass start_crawler=False.
+    """
+    global _local_index, _index_crawler
+    if not CONFLUENCE_INDEX_SPACES:
+        return None
+    with _index_lock:
+        if _local_index is None:
+            from confluence_index import ConfluenceIndex, IndexCrawler, fts5_available
+            if not fts5_available():
+                return None
+            index = ConfluenceIndex(CONFLUENCE_INDEX_PATH)
+            crawler = IndexCrawler(
+                index,
+                CONFLUENCE_INDEX_SPACES,
+                iter_space_pages,
+                _fetch_indexed_page,
+                interval=CONFLUENCE_INDEX_INTERVAL,
+                reconcile_interval=CONFLUENCE_INDEX_RECONCILE_INTERVAL,
+                crawl_pages=lambda key: iter_space_pages(key, body_format="storage")
+            )
+            if start_crawler:
+                crawler.start()
+            _local_index, _index_crawler = index, crawler
+    return _local_index
+
+def _fetch_indexed_page(page_id: str) -> dict:
+    """Fetch a page with its storage body for the index; raises ConfluenceAPIError on failure."""
+    page = _fetch_page(page_id)
+    if isinstance(page, str):
+        raise ConfluenceAPIError(page)
+    return page
+
+def _search_local(query: str, space_key: str | None, max_results: int, lean: bool):
+    """Answer a search from the local index, or return None if it can't serve this query."""
+    # The index holds the CONFLUENCE_* site only
+    if credentials.current_site() is not None:
+        return None
+    if not space_key or space_key not in CONFLUENCE_INDEX_SPACES:
+        return None
+    index = local_index()
+    if index is None:
+        return None
+    import sqlite3
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=20)
-    except requests.RequestException as exc:
-        return f"Request exception when calling Confluence search: {exc}"
+        synced_at = index.synced_at(space_key)
+        if not synced_at or time.time() - synced_at > CONFLUENCE_INDEX_MAX_STALENESS:
+            return None
+        hits = index.search(query, space_key, limit=max_results)
+    except sqlite3.Error:
+        return None
+    if not lean:
+        hits = [
+            {
+                "id": hit["id"],
+                "type": "page",
+                "title": hit["title"],
+                "space": {"key": hit["space"]},
+                "version": {"number": hit["version"]},
+                "score": hit["score"]
+            }
+            for hit in hits
+        ]
+    return {"results": hits, "size": len(hits), "source": "local-index"}
+
+@mcp.tool
+@metrics.instrument_tool("confluence")
+def search_pages(query: str, space_key: str | None = None, max_results: int = 100, lean: bool = False) -> str:
+    """Search for Confluence pages, following pagination up to `max_results`.
+
+    With `lean=True` only id, title, space key and version are returned for each page.
+    Spaces listed in CONFLUENCE_INDEX_SPACES are searched in the local index (BM25 ranked)
+    once it has synced; everything else goes to the remote CQL search.
+    """
+    # Fail on missing configuration before trying either search
+    _site()
+
+    local = _search_local(query, space_key, max_results, lean)
+    if local is not None:
+        return local
+
+    envelope = None
+    results = []
+    try:
+        for page in iter_search_page_responses(query, space_key, max_results=max_results, lean=lean):
+            if envelope is None:
+                envelope = page
+            results.extend(page["results"])
+    except ConfluenceAPIError as exc:
+        if envelope is None:
+            return str(exc)
+        # Keep what was already fetched and report where pagination stopped
+        envelope["error"] = str(exc)
+
+    envelope["results"] = results
+    if "size" in envelope:
+        envelope["size"] = len(results)
+    if "_links" in envelope:
+        envelope["_links"].pop("next", None)
+    return envelope
 
-    if response.status_code == 200:
+def _json_or_error(response, ok_statuses=(200,), passthrough=False):
+    """Decode a successful response as JSON, or format the error string the tools return.
+
+    With `passthrough` the body may come back undecoded (see upstream.json_result).
+    """
+    if response.status_code in ok_statuses:
         try:
-            return response.json()
+            return upstream.json_result(response) if passthrough else upstream.decode_json(response)
         except ValueError:
             return f"OK ({response.status_code}) but failed to decode JSON: {response.text}"
-    else:
-        return f"Error: {response.status_code} - {response.text}"
+    return f"Error: {response.status_code} - {response.text}"
 
-@mcp.tool
-def create_page(space_key: str, title: str, content: str) -> str:
-    """Create a new Confluence page."""
-    if not CONFLUENCE_BASE_URL or CONFLUENCE_BASE_URL == "https://your-domain.atlassian.net":
-        raise ValueError('CONFLUENCE_BASE_URL is not set or using placeholder')
-    if not CONFLUENCE_USERNAME or CONFLUENCE_USERNAME == "your-email@example.com":
-        raise ValueError('CONFLUENCE_USERNAME is not set or using placeholder')
-    if not CONFLUENCE_API_TOKEN or CONFLUENCE_API_TOKEN == "your-api-token":
-        raise ValueError('CONFLUENCE_API_TOKEN is not set or using placeholder')
+def _resolve_space_id(base: str, space_key: str, headers: dict) -> str:
+    """Look up (and remember) the v2 numeric space id for a space key."""
+    cache_key = (base, space_key)
+    if cache_key not in _SPACE_IDS:
+        url = f"{base}/wiki/api/v2/spaces"
+        response = upstream.request("confluence", "GET", url, headers=headers, params={"keys": space_key}, timeout=20)
+        data = _json_or_error(response)
+        if isinstance(data, str):
+            raise ConfluenceAPIError(data)
+        results = data.get("results") or []
+        if not results:
+            raise ConfluenceAPIError(f"Error: space {space_key} not found")
+        _SPACE_IDS[cache_key] = str(results[0]["id"])
+    return _SPACE_IDS[cache_key]
+
+def iter_space_pages(space_key: str, body_format: str | None = None, sort: str = "-modified-date"):
+    """Yield every page in a space via the v2 API, following cursor pagination.
 
-    url = f"{CONFLUENCE_BASE_URL.rstrip('/')}/wiki/rest/api/content"
+    Pages arrive most recently modified first by default, so incremental callers can stop early.
+    """
+    base, auth_header = _site()
     headers = {
+        "Accept": "application/json",
+        "Authorization": auth_header
+    }
+    try:
+        space_id = _resolve_space_id(base, space_key, headers)
+    except requests.RequestException as exc:
+        raise ConfluenceAPIError(f"Request exception when resolving Confluence space {space_key}: {exc}")
+    url = f"{base}/wiki/api/v2/spaces/{space_id}/pages"
+    params = {"limit": V2_PAGE_SIZE, "sort": sort}
+    if body_format:
+        params["body-format"] = body_format
+    while url:
+        try:
+            response = upstream.request("confluence", "GET", url, headers=headers, params=params, timeout=20)
+        except requests.RequestException as exc:
+            raise ConfluenceAPIError(f"Request exception when listing Confluence pages: {exc}")
+        data = _json_or_error(response)
+        if isinstance(data, str):
+            raise ConfluenceAPIError(data)
+        yield from data.get("results") or []
+        next_link = (data.get("_links") or {}).get("next")
+        if not next_link:
+            break
+        url = next_link if next_link.startswith("http") else f"{base}{'' if next_link.startswith('/wiki') else '/wiki'}{next_link}"
+        params = {}
+
+def api_version(base: str | None = None) -> str | None:
+    """Return the API version to use for a site: forced by config, detected, or None if unknown yet."""
+    if CONFLUENCE_API_VERSION in ("v1", "v2"):
+        return CONFLUENCE_API_VERSION
+    return _API_VERSIONS.get((base or CONFLUENCE_BASE_URL).rstrip('/'))
+
+def _write_headers(auth_header: str) -> dict:
+    return {
         "Accept": "application/json",
         "Content-Type": "application/json",
-        "Authorization": get_basic_auth_header(CONFLUENCE_USERNAME, CONFLUENCE_API_TOKEN)
+        "Authorization": auth_header
     }
+
+def _create_request(base: str, headers: dict, space_key: str, title: str, content: str,
+                    parent_id: str | None = None) -> tuple[str, dict]:
+    """URL and payload creating a page; raises ConfluenceAPIError if the v2 space id can't be resolved."""
+    # Writes only use v2 once a read has confirmed the site supports it, so they never pay for discovery
+    if api_version(base) == "v2":
+        space_id = _resolve_space_id(base, space_key, headers)
+        payload = {
+            "spaceId": space_id,
+            "status": "current",
+            "title": title,
+            "body": {
+                "representation": "storage",
+                "value": content
+            }
+        }
+        if parent_id:
+            payload["parentId"] = str(parent_id)
+        return f"{base}/wiki/api/v2/pages", payload
     payload = {
         "type": "page",
         "title": title,
@@ -78,46 +375,291 @@ def create_page(space_key: str, title: str, content: str) -> str:
             }
         }
     }
+    if parent_id:
+        payload["ancestors"] = [{"id": str(parent_id)}]
+    return f"{base}/wiki/rest/api/content", payload
+
+@mcp.tool
+@metrics.instrument_tool("confluence")
+def create_page(space_key: str, title: str, content: str) -> str:
+    """Create a new Confluence page."""
+    base, auth_header = _site()
+    headers = _write_headers(auth_header)
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=20)
+        url, payload = _create_request(base, headers, space_key, title, content)
+    except ConfluenceAPIError as exc:
+        return str(exc)
+    except requests.RequestException as exc:
+        return f"Request exception when resolving Confluence space {space_key}: {exc}"
+    try:
+        response = upstream.request("confluence", "POST", url, headers=headers, json=payload, timeout=20)
     except requests.RequestException as exc:
         return f"Request exception when creating Confluence page: {exc}"
 
-    if response.status_code in (200, 201):
+    return _json_or_error(response, (200, 201))
+
+def _get(url: str, hedge: str | None, **kwargs):
+    if hedge:
+        return hedging.request(hedge, "confluence", url, **kwargs)
+    return upstream.request("confluence", "GET", url, **kwargs)
+
+def _fetch_page(page_id: str, with_body: bool = True, passthrough: bool = False, hedge: str | None = None):
+    """Fetch a page through the detected API version; returns decoded JSON or an error string.
+
+    Without the body only metadata (title, version) is requested, which is what version checks need.
+    `passthrough` allows an undecoded body for callers that return it unchanged. With `hedge`
+    (the calling tool's name) slow reads are hedged, see hedging.py.
+    """
+    base, auth_header = _site()
+    headers = {
+        "Accept": "application/json",
+        "Authorization": auth_header
+    }
+    version = api_version(base)
+    if version != "v1":
+        url = f"{base}/wiki/api/v2/pages/{page_id}"
+        params = {"body-format": V2_BODY_FORMAT} if with_body else {}
         try:
-            return response.json()
-        except ValueError:
-            return f"OK ({response.status_code}) but failed to decode JSON: {response.text}"
-    else:
-        return f"Error: {response.status_code} - {response.text}"
+            response = _get(url, hedge, headers=headers, params=params, timeout=20)
+        except requests.RequestException as exc:
+            return f"Request exception when fetching Confluence page {page_id}: {exc}"
+        if response.status_code == 200:
+            _API_VERSIONS[base] = "v2"
+        # While the version is unknown a 404 may mean "no v2 API here", so retry on v1 before reporting it
+        if response.status_code != 404 or version == "v2":
+            return _json_or_error(response, passthrough=passthrough)
+        upstream.record_retry("confluence", "v2_not_found")
+
+    expand = "body.storage,version" if with_body else "version"
+    url = f"{base}/wiki/rest/api/content/{page_id}?expand={expand}"
+    try:
+        response = _get(url, hedge, headers=headers, timeout=20)
+    except requests.RequestException as exc:
+        return f"Request exception when fetching Confluence page {page_id}: {exc}"
+
+    if response.status_code == 200 and version is None:
+        _API_VERSIONS[base] = "v1"
+    return _json_or_error(response, passthrough=passthrough)
+
+def invalidate_page(page_id: str):
+    """Forget cached reads and converted chunks of a page."""
+    page_id = str(page_id)
+    PAGE_CACHE.invalidate_matching(lambda key: key[1] == page_id)
+    with _CHUNK_CACHE_LOCK:
+        for key in [key for key in _CHUNK_CACHE if key[1] == page_id]:
+            del _CHUNK_CACHE[key]
 
 @mcp.tool
+@metrics.instrument_tool("confluence")
 def get_page(page_id: str) -> str:
     """Get content of a Confluence page."""
-    if not CONFLUENCE_BASE_URL or CONFLUENCE_BASE_URL == "https://your-domain.atlassian.net":
-        raise ValueError('CONFLUENCE_BASE_URL is not set or using placeholder')
-    if not CONFLUENCE_USERNAME or CONFLUENCE_USERNAME == "your-email@example.com":
-        raise ValueError('CONFLUENCE_USERNAME is not set or using placeholder')
-    if not CONFLUENCE_API_TOKEN or CONFLUENCE_API_TOKEN == "your-api-token":
-        raise ValueError('CONFLUENCE_API_TOKEN is not set or using placeholder')
+    base, _ = _site()
 
-    url = f"{CONFLUENCE_BASE_URL.rstrip('/')}/wiki/rest/api/content/{page_id}?expand=body.storage"
-    headers = {
-        "Accept": "application/json",
-        "Authorization": get_basic_auth_header(CONFLUENCE_USERNAME, CONFLUENCE_API_TOKEN)
+    cache_key = (base, str(page_id))
+    cached = PAGE_CACHE.get(cache_key)
+    if cached is not None:
+        return upstream.as_result(cached)
+    page = _fetch_page(page_id, passthrough=True, hedge="get_page")
+    if not isinstance(page, str):
+        PAGE_CACHE.set(cache_key, page)
+    return page
+
+@mcp.tool
+@metrics.instrument_tool("confluence")
+def get_page_chunk(page_id: str, chunk: int = 0, format: str = "markdown") -> str:
+    """Get one heading-aligned chunk of a page converted to markdown or plain text.
+
+    Every response includes the chunk count and a table of contents mapping headings to chunk
+    indexes, so large pages can be read piece by piece. Converted chunks are cached per page version.
+    """
+    base, _ = _site()
+    if format not in ("markdown", "text"):
+        raise ValueError("format must be 'markdown' or 'text'")
+
+    # A metadata-only read is enough to tell whether the cached conversion is still current
+    meta = _fetch_page(page_id, with_body=False)
+    if isinstance(meta, str):
+        return meta
+    version = (meta.get("version") or {}).get("number")
+    cache_key = (base, str(page_id), version, format, CHUNK_CHARS)
+    with _CHUNK_CACHE_LOCK:
+        converted = _CHUNK_CACHE.get(cache_key)
+        if converted is not None:
+            _CHUNK_CACHE.move_to_end(cache_key)
+    if converted is None or version is None:
+        page = _fetch_page(page_id)
+        if isinstance(page, str):
+            return page
+        version = (page.get("version") or {}).get("number")
+        storage = ((page.get("body") or {}).get("storage") or {}).get("value", "")
+        converted = chunk_storage(storage, markdown=format == "markdown", max_chars=CHUNK_CHARS)
+        converted["title"] = page.get("title")
+        cache_key = cache_key[:2] + (version,) + cache_key[3:]
+        with _CHUNK_CACHE_LOCK:
+            _CHUNK_CACHE[cache_key] = converted
+            _CHUNK_CACHE.move_to_end(cache_key)
+            while len(_CHUNK_CACHE) > CHUNK_CACHE_SIZE:
+                _CHUNK_CACHE.popitem(last=False)
+
+    chunks = converted["chunks"]
+    if not 0 <= chunk < len(chunks):
+        return f"Error: chunk {chunk} out of range (page has {len(chunks)} chunks)"
+    return {
+        "id": str(page_id),
+        "title": converted["title"],
+        "version": version,
+        "format": format,
+        "chunk": chunk,
+        "chunks": len(chunks),
+        "toc": converted["toc"],
+        "content": chunks[chunk]
     }
+
+# Batch writes
+
+def _invalid_pages(pages: list, required: tuple[str, ...]) -> dict[int, str]:
+    """Map the index of each batch item that can't be sent to the reason, checking storage locally."""
+    invalid = {}
+    for index, page in enumerate(pages):
+        if not isinstance(page, dict):
+            invalid[index] = "item must be an object"
+            continue
+        missing = [name for name in required if not page.get(name)]
+        if missing:
+            invalid[index] = f"missing {', '.join(missing)}"
+            continue
+        version = page.get("version")
+        if version is not None and not _valid_version(version):
+            invalid[index] = "version must be a positive integer"
+            continue
+        problems = validate_storage(page["content"])
+        if problems:
+            invalid[index] = "invalid storage format: " + "; ".join(problems)
+    return invalid
+
+def _valid_version(version) -> bool:
+    if isinstance(version, str):
+        return version.isdigit() and int(version) > 0
+    return isinstance(version, int) and not isinstance(version, bool) and version > 0
+
+def _write_result(index: int, data, status: str = "created") -> dict:
+    """Per-page batch result from a write response: the page id and version, or the error."""
+    if isinstance(data, str):
+        return {"index": index, "status": "error", "error": data}
+    return {
+        "index": index,
+        "status": status,
+        "id": str(data.get("id")),
+        "title": data.get("title"),
+        "version": (data.get("version") or {}).get("number")
+    }
+
+def _create_one(index: int, page: dict) -> dict:
+    base, auth_header = _site()
+    headers = _write_headers(auth_header)
     try:
-        response = requests.get(url, headers=headers, timeout=20)
+        url, payload = _create_request(base, headers, page["space_key"], page["title"], page["content"],
+                                       page.get("parent_id"))
+        response = upstream.request("confluence", "POST", url, headers=headers, json=payload, timeout=20)
+    except ConfluenceAPIError as exc:
+        return _write_result(index, str(exc))
     except requests.RequestException as exc:
-        return f"Request exception when fetching Confluence page {page_id}: {exc}"
+        return _write_result(index, f"Request exception when creating Confluence page: {exc}")
+    return _write_result(index, _json_or_error(response, (200, 201)))
+
+def _update_one(index: int, page: dict) -> dict:
+    """Write one page as the version after the current one.
 
-    if response.status_code == 200:
+    With an expected `version` the write only applies on top of that version and a newer one is
+    reported as a conflict. Without it a concurrent edit (409) is retried once on the new version.
+    """
+    page_id = str(page["page_id"])
+    expected = page.get("version")
+    base, auth_header = _site()
+    headers = _write_headers(auth_header)
+    for attempt in range(2):
+        meta = _fetch_page(page_id, with_body=False)
+        if isinstance(meta, str):
+            return _write_result(index, meta)
+        current = (meta.get("version") or {}).get("number") or 0
+        if expected is not None and current != int(expected):
+            return {"index": index, "status": "conflict", "id": page_id, "version": current,
+                    "error": f"page is at version {current}, expected {expected}"}
+        title = page.get("title") or meta.get("title")
+        if api_version(base) == "v2":
+            url = f"{base}/wiki/api/v2/pages/{page_id}"
+            payload = {
+                "id": page_id,
+                "status": "current",
+                "title": title,
+                "body": {"representation": "storage", "value": page["content"]},
+                "version": {"number": current + 1}
+            }
+        else:
+            url = f"{base}/wiki/rest/api/content/{page_id}"
+            payload = {
+                "type": "page",
+                "title": title,
+                "body": {"storage": {"value": page["content"], "representation": "storage"}},
+                "version": {"number": current + 1}
+            }
         try:
-            return response.json()
-        except ValueError:
-            return f"OK ({response.status_code}) but failed to decode JSON: {response.text}"
-    else:
-        return f"Error: {response.status_code} - {response.text}"
+            response = upstream.request("confluence", "PUT", url, headers=headers, json=payload, timeout=20)
+        except requests.RequestException as exc:
+            return _write_result(index, f"Request exception when updating Confluence page {page_id}: {exc}")
+        if response.status_code != 409:
+            break
+        if expected is not None or attempt:
+            return {"index": index, "status": "conflict", "id": page_id, "version": current,
+                    "error": f"Error: {response.status_code} - {response.text}"}
+        upstream.record_retry("confluence", "version_conflict")
+    invalidate_page(page_id)
+    return _write_result(index, _json_or_error(response), status="updated")
+
+def _run_batch(pages: list, required: tuple[str, ...], write) -> dict:
+    """Validate every item, send the valid ones with bounded concurrency, report results in input order."""
+    invalid = _invalid_pages(pages, required)
+    results = {index: {"index": index, "status": "invalid", "error": reason} for index, reason in invalid.items()}
+    pending = [index for index in range(len(pages)) if index not in invalid]
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(CONFLUENCE_WRITE_CONCURRENCY, len(pending))),
+                                thread_name_prefix="confluence-write") as pool:
+            # Each write runs in a copy of the caller's context so the selected site carries over
+            futures = {index: pool.submit(contextvars.copy_context().run, write, index, pages[index])
+                       for index in pending}
+            for index, future in futures.items():
+                results[index] = future.result()
+    ordered = [results[index] for index in range(len(pages))]
+    summary = {"total": len(ordered)}
+    for result in ordered:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"results": ordered, "summary": summary}
+
+@mcp.tool
+@metrics.instrument_tool("confluence")
+def create_pages(pages: list[dict]) -> dict:
+    """Create several Confluence pages.
+
+    Each item needs `space_key`, `title` and `content` (storage format) and may set `parent_id`.
+    Content is validated locally first; invalid items are reported and not sent. Returns one
+    result per item, in input order, with its status, page id and version or error.
+    """
+    return _run_batch(pages, ("space_key", "title", "content"), _create_one)
+
+@mcp.tool
+@metrics.instrument_tool("confluence")
+def update_pages(pages: list[dict]) -> dict:
+    """Update several Confluence pages.
+
+    Each item needs `page_id` and `content` (storage format) and may set `title` (default: keep
+    the current one) and `version`, the version the edit was based on; if the page has moved on
+    since, the item is reported as a conflict instead of overwriting it. Invalid items are
+    reported and not sent. Returns one result per item, in input order.
+    """
+    return _run_batch(pages, ("page_id", "content"), _update_one)
 
 if __name__ == "__main__":
+    metrics.start_http_server_from_env()
+    credentials.install_reload_handler()
+    snapshots.start()
     mcp.run()
\ No newline at end of file
@@ -0,0 +1,210 @@
+import base64
+import contextvars
+import functools
+import json
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Optional JSON file of named sites; the gateway picks one per request with the X-MCP-Site header
+CREDENTIALS_FILE = os.getenv("CREDENTIALS_FILE")
+# How often the file's modification time is checked for rotated credentials; 0 disables watching
+CREDENTIALS_WATCH_INTERVAL = float(os.getenv("CREDENTIALS_WATCH_INTERVAL", "5"))
+
+_current_site: contextvars.ContextVar = contextvars.ContextVar("credentials_site", default=None)
+
+
+@functools.lru_cache(maxsize=64)
+def basic_auth_header(username: str | None, token: str | None) -> str:
+    """Generate a Basic Auth header value, computed once per username/token pair."""
+    if not username or not token:
+        raise ValueError("Username and token are required for authentication")
+    credentials = f"{username}:{token}"
+    encoded = base64.b64encode(credentials.encode()).decode()
+    return f"Basic {encoded}"
+
+
+class SiteCredentials:
+    """Base URL and ready-made Authorization header for one service at one site."""
+
+    __slots__ = ("site", "service", "base_url", "auth_header")
+
+    def __init__(self, site: str, service: str, base_url: str | None, auth_header: str):
+        self.site = site
+        self.service = service
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.auth_header = auth_header
+
+    @classmethod
+    def from_entry(cls, site: str, service: str, entry: dict) -> "SiteCredentials":
+        """Build from a credentials file entry; Atlassian services use username + api_token, others api_key."""
+        if service in ("jira", "confluence"):
+            if not entry.get("base_url"):
+                raise ValueError(f"{site}.{service}: base_url is required")
+            header = basic_auth_header(entry.get("username"), entry.get("api_token"))
+        elif service in ("cal", "resend"):
+            if not entry.get("api_key"):
+                raise ValueError(f"{site}.{service}: api_key is required")
+            header = entry["api_key"] if service == "cal" else f"Bearer {entry['api_key']}"
+        else:
+            raise ValueError(f"{site}: unknown service {service}")
+        return cls(site, service, entry.get("base_url"), header)
+
+
+class CredentialProvider:
+    """Named sites loaded from a JSON file, swapped atomically when the file changes.
+
+    The file maps site names to per-service credentials:
+
+        {"sites": {"acme": {"jira": {"base_url": "https://acme.atlassian.net",
+                                     "username": "bot@acme.com", "api_token": "..."},
+                            "cal": {"api_key": "cal_live_..."},
+                            "limits": {"max_concurrency": 4}}}}
+
+    The optional "limits" entry overrides the per-site quotas in tenants.py.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sites: dict = {}
+        self._limits: dict = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self.reload()
+
+    def reload(self) -> bool:
+        """Re-read the file; on any error the previous credentials stay in place."""
+        from request_log import logger
+
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, encoding="utf-8") as handle:
+                raw = json.load(handle)
+            sites, limits = {}, {}
+            for site, services in (raw.get("sites") or {}).items():
+                services = dict(services or {})
+                limits[site] = dict(services.pop("limits", None) or {})
+                sites[site] = {service: SiteCredentials.from_entry(site, service, entry)
+                               for service, entry in services.items()}
+        except (OSError, ValueError, AttributeError, TypeError) as exc:
+            logger.warning("credentials_reload_failed", extra={"fields": {"path": self.path, "error": str(exc)}})
+            return False
+        with self._lock:
+            self._sites = sites
+            self._limits = limits
+            self._mtime = mtime
+        logger.info("credentials_loaded", extra={"fields": {"path": self.path, "sites": sorted(sites)}})
+        return True
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        return mtime != self._mtime and self.reload()
+
+    def sites(self) -> list[str]:
+        return sorted(self._sites)
+
+    def has_site(self, site: str) -> bool:
+        return site in self._sites
+
+    def limits(self, site: str) -> dict:
+        return self._limits.get(site, {})
+
+    def get(self, site: str, service: str) -> SiteCredentials:
+        services = self._sites.get(site)
+        if services is None:
+            raise ValueError(f"Unknown site: {site}")
+        if service not in services:
+            raise ValueError(f"Site {site} has no {service} credentials")
+        return services[service]
+
+    def start_watching(self, interval: float = CREDENTIALS_WATCH_INTERVAL):
+        """Poll the file's modification time from a daemon thread and reload when it changes."""
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        def watch():
+            while True:
+                time.sleep(interval)
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=watch, name="credentials-watch", daemon=True)
+        self._watcher.start()
+
+
+_provider: CredentialProvider | None = None
+_provider_lock = threading.Lock()
+_env_reloaders: dict = {}
+
+
+def provider() -> CredentialProvider:
+    """Return the provider for CREDENTIALS_FILE, loading it and starting the watcher on first use."""
+    global _provider
+    if not CREDENTIALS_FILE:
+        raise ValueError("Named sites need CREDENTIALS_FILE to be set")
+    with _provider_lock:
+        if _provider is None:
+            _provider = CredentialProvider(CREDENTIALS_FILE)
+            _provider.start_watching()
+    return _provider
+
+
+def register_env_reload(name: str, reload):
+    """Register a connector callback that re-reads its env credentials on reload (replaces any earlier one)."""
+    _env_reloaders[name] = reload
+
+
+def reload_all():
+    """Re-read .env (its values win) and the credentials file, e.g. after rotating a token."""
+    load_dotenv(override=True)
+    for reload in list(_env_reloaders.values()):
+        reload()
+    if _provider is not None:
+        _provider.reload()
+
+
+def install_reload_handler():
+    """Reload credentials on SIGHUP; a no-op where SIGHUP doesn't exist or off the main thread."""
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signal.SIGHUP, lambda signum, frame: reload_all())
+
+
+def current_site() -> str | None:
+    return _current_site.get()
+
+
+@contextmanager
+def use_site(site: str | None):
+    """Route the connector calls in this block to a named site (None keeps the env credentials)."""
+    token = _current_site.set(site)
+    try:
+        yield
+    finally:
+        _current_site.reset(token)
+
+
+def for_service(service: str) -> SiteCredentials | None:
+    """Credentials of the active named site for `service`, or None when the env credentials apply."""
+    site = _current_site.get()
+    if site is None:
+        return None
+    return provider().get(site, service)
+
+
+def _restart_after_fork():
+    # The watcher thread doesn't survive fork (see launcher.py)
+    if _provider is not None:
+        _provider._watcher = None
+        _provider.start_watching()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
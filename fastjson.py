@@ -0,0 +1,90 @@
+"""JSON encoding and decoding through the fastest available backend.
+
+JSON_BACKEND picks the backend: `auto` (default) uses orjson, then ujson, then the standard
+library, whichever is installed first; `orjson`, `ujson` or `stdlib` forces one. All backends
+raise ValueError on invalid input and TypeError for values they can't encode, like `json`.
+"""
+import json
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+
+
+def _stdlib():
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    return "stdlib", json.loads, dumps
+
+
+def _orjson():
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    return "orjson", orjson.loads, dumps
+
+
+def _ujson():
+    import ujson
+
+    def dumps(obj) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+
+    return "ujson", ujson.loads, dumps
+
+
+def _select(name: str):
+    loaders = {"orjson": _orjson, "ujson": _ujson, "stdlib": _stdlib}
+    if name != "auto":
+        if name not in loaders:
+            raise ValueError(f"Unknown JSON_BACKEND: {name}")
+        return loaders[name]()
+    for loader in (_orjson, _ujson):
+        try:
+            return loader()
+        except ImportError:
+            continue
+    return _stdlib()
+
+
+BACKEND, loads, dumps = _select(JSON_BACKEND)
+
+
+class RawJSON:
+    """An upstream JSON body kept as bytes, to be written to the client without decoding.
+
+    `value()` decodes it for callers that need the Python objects after all.
+    """
+
+    __slots__ = ("body",)
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def value(self):
+        return loads(self.body)
+
+    def __len__(self):
+        return len(self.body)
+
+    def __repr__(self):
+        return f"RawJSON({len(self.body)} bytes)"
+
+
+def encode_result(result) -> bytes:
+    """Encode the gateway's {"result": ...} envelope, splicing a RawJSON body in as-is.
+
+    Values the backend can't encode are sent as their string form.
+    """
+    if isinstance(result, RawJSON):
+        return b'{"result":' + result.body + b"}"
+    try:
+        return dumps({"result": result})
+    except TypeError:
+        return dumps({"result": str(result)})
@@ -0,0 +1,171 @@
+import os
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Per-probe socket timeout and the deadline for a whole round of probes, in seconds
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "3"))
+HEALTH_DEADLINE = float(os.getenv("HEALTH_DEADLINE", "5"))
+# Services the gateway's /healthz probes, and how long a result is reused between load-balancer checks
+HEALTHZ_SERVICES = [s.strip() for s in os.getenv("HEALTHZ_SERVICES", "jira").split(",") if s.strip()]
+HEALTHZ_CACHE_SECONDS = float(os.getenv("HEALTHZ_CACHE_SECONDS", "10"))
+
+SERVICES = ("jira", "confluence", "cal", "resend")
+
+
+def validate_services(services) -> list[str]:
+    """Return `services` as a list; ValueError naming any that aren't in SERVICES."""
+    unknown = [service for service in services if service not in SERVICES]
+    if unknown:
+        raise ValueError(f"Unknown service: {', '.join(unknown)} (choose from {', '.join(SERVICES)})")
+    return list(services)
+
+
+def probe_targets(services=SERVICES) -> dict:
+    """Return {service: (url, headers) or None when unconfigured} for cheap authenticated read endpoints."""
+    targets = {}
+    for service in services:
+        if service == "jira":
+            import jira_mcp
+
+            targets[service] = None if not (jira_mcp.JIRA_BASE_URL and jira_mcp.JIRA_API_TOKEN) else (
+                f"{jira_mcp.JIRA_BASE_URL.rstrip('/')}/rest/api/3/myself",
+                {"Authorization": jira_mcp.get_basic_auth_header(jira_mcp.JIRA_USERNAME, jira_mcp.JIRA_API_TOKEN)},
+            )
+        elif service == "confluence":
+            import confluence_mcp
+
+            configured = confluence_mcp.CONFLUENCE_API_TOKEN not in (None, "", "your-api-token")
+            targets[service] = None if not configured else (
+                f"{confluence_mcp.CONFLUENCE_BASE_URL.rstrip('/')}/wiki/rest/api/space?limit=1",
+                {"Authorization": confluence_mcp.get_basic_auth_header(
+                    confluence_mcp.CONFLUENCE_USERNAME, confluence_mcp.CONFLUENCE_API_TOKEN)},
+            )
+        elif service == "cal":
+            import cal_mcp
+
+            targets[service] = None if not cal_mcp.CAL_API_KEY else (
+                f"{cal_mcp.CAL_API_BASE_URL}/v2/me",
+                {"Authorization": cal_mcp.CAL_API_KEY, "cal-api-version": "2024-08-06"},
+            )
+        elif service == "resend":
+            import resend_mcp
+
+            # Listing domains proves the key works without sending anything
+            targets[service] = None if not resend_mcp.RESEND_API_KEY else (
+                f"{resend_mcp.RESEND_API_BASE_URL}/domains",
+                {"Authorization": f"Bearer {resend_mcp.RESEND_API_KEY}"},
+            )
+        else:
+            raise ValueError(f"Unknown service: {service}")
+    return targets
+
+
+def _classify(status_code: int) -> str:
+    if 200 <= status_code < 300:
+        return "ok"
+    # Rate limited still means reachable and authenticated
+    if status_code == 429:
+        return "degraded"
+    return "error"
+
+
+def probe(url: str, headers: dict | None = None, timeout: float = HEALTH_PROBE_TIMEOUT) -> dict:
+    """Time DNS, TCP connect, TLS handshake and time to first byte of one GET request.
+
+    Uses a raw socket so each phase can be measured separately; proxies are not used.
+    """
+    parts = urlsplit(url)
+    https = parts.scheme == "https"
+    host = parts.hostname
+    port = parts.port or (443 if https else 80)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    result = {"url": f"{parts.scheme}://{parts.netloc}{parts.path}", "status": "error", "http_status": None,
+              "dns_ms": None, "connect_ms": None, "tls_ms": None, "ttfb_ms": None, "total_ms": None, "error": None}
+    start = time.perf_counter()
+    phase = start
+
+    def lap(key):
+        nonlocal phase
+        now = time.perf_counter()
+        result[key] = round((now - phase) * 1000, 2)
+        phase = now
+
+    sock = None
+    try:
+        family, kind, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+        lap("dns_ms")
+        sock = socket.socket(family, kind, proto)
+        sock.settimeout(timeout)
+        sock.connect(address)
+        lap("connect_ms")
+        if https:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+            lap("tls_ms")
+        lines = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", "Accept: application/json",
+                 "User-Agent: mcp-healthcheck", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode())
+        first = sock.recv(1024)
+        lap("ttfb_ms")
+        if not first:
+            raise ConnectionError("connection closed before a response")
+        status_line = first.split(b"\r\n", 1)[0].decode("latin-1")
+        result["http_status"] = int(status_line.split()[1])
+        result["status"] = _classify(result["http_status"])
+    except (OSError, ValueError, IndexError) as exc:
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    finally:
+        if sock is not None:
+            sock.close()
+        result["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def check(services=SERVICES, timeout: float = HEALTH_PROBE_TIMEOUT, deadline: float = HEALTH_DEADLINE) -> dict:
+    """Probe the services concurrently; probes still running at the deadline are reported as timeouts.
+
+    The overall status is "ok" only if every configured service is ok; unconfigured services are skipped.
+    """
+    targets = probe_targets(services)
+    results = {name: {"status": "skipped", "error": "not configured"} for name, target in targets.items()
+               if target is None}
+    pending = {name: target for name, target in targets.items() if target is not None}
+    pool = ThreadPoolExecutor(max_workers=max(1, len(pending)), thread_name_prefix="healthcheck")
+    futures = {pool.submit(probe, url, headers, timeout): name for name, (url, headers) in pending.items()}
+    done, not_done = wait(futures, timeout=deadline)
+    for future in done:
+        results[futures[future]] = future.result()
+    for future in not_done:
+        results[futures[future]] = {"status": "timeout", "error": f"no answer within {deadline}s"}
+    # Don't wait for stuck probes (getaddrinfo has no timeout); their threads finish on their own
+    pool.shutdown(wait=False)
+
+    statuses = [r["status"] for r in results.values() if r["status"] != "skipped"]
+    overall = "ok" if all(s == "ok" for s in statuses) else ("degraded" if all(
+        s in ("ok", "degraded") for s in statuses) else "error")
+    return {"status": overall, "checked_at": time.time(), "services": {k: results[k] for k in targets}}
+
+
+_cached: dict = {}
+_cache_lock = threading.Lock()
+
+
+def cached_check(services=None, max_age: float = HEALTHZ_CACHE_SECONDS) -> dict:
+    """Like `check`, but reuse a result younger than `max_age` so frequent load-balancer polls stay cheap."""
+    services = tuple(services or HEALTHZ_SERVICES)
+    with _cache_lock:
+        entry = _cached.get(services)
+        if entry and time.monotonic() - entry[0] < max_age:
+            return entry[1]
+    result = check(services)
+    with _cache_lock:
+        _cached[services] = (time.monotonic(), result)
+    return result
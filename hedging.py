@@ -0,0 +1,136 @@
+"""Hedged upstream reads for latency-critical tools.
+
+A hedged read sends the request, and if it hasn't completed after the tool's recent p95 upstream
+latency, sends the same request again and uses whichever response arrives first. A budget keeps
+the extra requests to a fraction of all hedged reads. Only use it for idempotent GETs.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+import metrics
+import upstream
+
+load_dotenv()
+
+# Off unless HEDGE_REQUESTS is set; it trades extra upstream load for lower tail latency
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "0").lower() in ("1", "true", "yes")
+# Latency quantile after which the duplicate is sent, and bounds on that delay in seconds
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.02"))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", "5"))
+# Fraction of hedged reads that may send a duplicate, and how many unused hedges may be saved up
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.05"))
+HEDGE_BUDGET_BURST = float(os.getenv("HEDGE_BUDGET_BURST", "10"))
+# Reads seen before hedging starts, so the delay comes from a meaningful p95
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "32"))
+
+
+class HedgeBudget:
+    """Each read earns `ratio` of a hedge, up to `burst` saved; each hedge spends one."""
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+_budgets: dict[str, HedgeBudget] = {}
+_pool: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def _budget(tool: str) -> HedgeBudget:
+    with _lock:
+        budget = _budgets.get(tool)
+        if budget is None:
+            budget = _budgets[tool] = HedgeBudget(HEDGE_BUDGET, HEDGE_BUDGET_BURST)
+        return budget
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+        return _pool
+
+
+def delay(tool: str) -> float | None:
+    """How long to wait before hedging a read for `tool`, or None while there are too few samples."""
+    latency = metrics.HEDGED_LATENCY.quantile(HEDGE_QUANTILE, tool=tool)
+    if latency is None or metrics.HEDGED_LATENCY.count(tool=tool) < HEDGE_MIN_SAMPLES:
+        return None
+    return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, latency))
+
+
+def request(tool: str, service: str, url: str, **kwargs):
+    """upstream.request("GET", ...) for `tool`, hedged when HEDGE_REQUESTS is on.
+
+    Returns the first response to arrive; if the first attempt raises, the other one's outcome is
+    used. The losing request can't be interrupted once sent, so its response is discarded.
+    """
+    if not HEDGE_REQUESTS:
+        return upstream.request(service, "GET", url, **kwargs)
+    budget = _budget(tool)
+    budget.earn()
+    hedge_after = delay(tool)
+    pool = _executor()
+
+    def attempt():
+        start = time.perf_counter()
+        response = upstream.request(service, "GET", url, **kwargs)
+        metrics.HEDGED_LATENCY.observe(time.perf_counter() - start, tool=tool)
+        return response
+
+    # Each attempt runs in a copy of the caller's context (active site, passthrough, log record)
+    primary = pool.submit(contextvars.copy_context().run, attempt)
+    attempts = [primary]
+    if hedge_after is not None:
+        done, _ = wait(attempts, timeout=hedge_after)
+        if not done:
+            if budget.try_spend():
+                metrics.HEDGES.inc(tool=tool, outcome="sent")
+                attempts.append(pool.submit(contextvars.copy_context().run, attempt))
+            else:
+                metrics.HEDGES.inc(tool=tool, outcome="over_budget")
+
+    pending = list(attempts)
+    while True:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        winner = next(iter(done))
+        pending.remove(winner)
+        if winner.exception() is None or not pending:
+            break
+    for loser in pending:
+        loser.cancel()
+    if winner is not primary:
+        metrics.HEDGES.inc(tool=tool, outcome="won")
+    return winner.result()
+
+
+def reset():
+    global _pool
+    with _lock:
+        _budgets.clear()
+        _pool = None
+
+
+os.register_at_fork(after_in_child=reset)
@@ -1,8 +1,18 @@
 from fastmcp import FastMCP
 import requests
-import os
 import base64
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
 from dotenv import load_dotenv
+import credentials
+import hedging
+import metrics
+import snapshots
+import upstream
+from cache import TTLCache
 
 load_dotenv()
 
@@ -12,23 +22,173 @@ JIRA_USERNAME = os.getenv("JIRA_USERNAME")
 JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN")
 
 def get_basic_auth_header(username: str | None, token: str | None) -> str:
-    """Generate Basic Auth header value."""
-    if not username or not token:
-        raise ValueError("Username and token are required for authentication")
-    credentials = f"{username}:{token}"
-    encoded = base64.b64encode(credentials.encode()).decode()
-    return f"Basic {encoded}"
+    """Generate Basic Auth header value (computed once per credential pair)."""
+    return credentials.basic_auth_header(username, token)
+
+def _reload_env_credentials():
+    global JIRA_BASE_URL, JIRA_USERNAME, JIRA_API_TOKEN
+    JIRA_BASE_URL = os.getenv("JIRA_BASE_URL")
+    JIRA_USERNAME = os.getenv("JIRA_USERNAME")
+    JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN")
+
+credentials.register_env_reload("jira", _reload_env_credentials)
+
+def _site() -> tuple[str, str]:
+    """Return the base URL and Authorization header for this call's site.
+
+    A named site selected with credentials.use_site (the gateway's X-MCP-Site header) wins;
+    otherwise the JIRA_* settings apply.
+    """
+    site = credentials.for_service("jira")
+    if site is not None:
+        return site.base_url, site.auth_header
+    if not JIRA_BASE_URL:
+        raise ValueError('JIRA_BASE_URL is not set')
+    return JIRA_BASE_URL.rstrip('/'), get_basic_auth_header(JIRA_USERNAME, JIRA_API_TOKEN)
+
+# Optional local issue mirror for read-mostly projects; tolerates JIRA_MIRROR_MAX_STALENESS seconds of lag
+JIRA_MIRROR_PROJECTS = [key.strip().upper() for key in os.getenv("JIRA_MIRROR_PROJECTS", "").split(",") if key.strip()]
+JIRA_MIRROR_PATH = os.getenv("JIRA_MIRROR_PATH", "jira_mirror.db")
+JIRA_MIRROR_INTERVAL = float(os.getenv("JIRA_MIRROR_INTERVAL", "60"))
+JIRA_MIRROR_MAX_STALENESS = float(os.getenv("JIRA_MIRROR_MAX_STALENESS", "120"))
+# Seconds between passes that drop mirrored issues deleted or moved upstream; 0 turns them off
+JIRA_MIRROR_RECONCILE_INTERVAL = float(os.getenv("JIRA_MIRROR_RECONCILE_INTERVAL", "3600"))
+SEARCH_PAGE_SIZE = 100
+
+# get_issue results keyed by (base URL, issue key); disabled unless JIRA_CACHE_TTL is set.
+# Webhooks (see webhooks.py) invalidate entries in the process that receives them only.
+ISSUE_CACHE = TTLCache("jira_issues", float(os.getenv("JIRA_CACHE_TTL", "0")))
+_mirror = None
+_mirror_syncer = None
+_mirror_lock = threading.Lock()
+
+# Where each watched issue's get_issue_changes left off, keyed by (base URL, issue key)
+CHANGES_PAGE_SIZE = 100
+CURSOR_STORE_SIZE = int(os.getenv("JIRA_CURSOR_STORE_SIZE", "10000"))
+_cursors = OrderedDict()
+_cursors_lock = threading.Lock()
 
 mcp = FastMCP("JIRA MCP Server")
 
+class JiraSearchError(Exception):
+    """Raised when a page of search results cannot be fetched or decoded."""
+
+def iter_search(jql: str, fields: list[str] | None = None):
+    """Yield every issue matching `jql` from the JQL search endpoint, following nextPageToken."""
+    base, auth_header = _site()
+    url = f"{base}/rest/api/3/search/jql"
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "Authorization": auth_header
+    }
+    payload = {"jql": jql, "maxResults": SEARCH_PAGE_SIZE}
+    if fields:
+        payload["fields"] = fields
+    while True:
+        try:
+            resp = upstream.request("jira", "POST", url, headers=headers, json=payload, timeout=20)
+        except requests.RequestException as exc:
+            raise JiraSearchError(f"Request error when calling {url}: {exc}")
+        if resp.status_code != 200:
+            raise JiraSearchError(f"Error: {resp.status_code} - {resp.text}")
+        try:
+            data = upstream.decode_json(resp)
+        except ValueError:
+            raise JiraSearchError(f"OK ({resp.status_code}) but failed to decode JSON: {resp.text}")
+        yield from data.get("issues") or []
+        token = data.get("nextPageToken")
+        if not token or data.get("isLast"):
+            break
+        payload["nextPageToken"] = token
+
+def account_timezone():
+    """The API user's timezone from their profile, which Jira reads JQL date literals in."""
+    from zoneinfo import ZoneInfo
+    base, auth_header = _site()
+    url = f"{base}/rest/api/3/myself"
+    try:
+        resp = upstream.request("jira", "GET", url, headers={"Accept": "application/json", "Authorization": auth_header},
+                                timeout=20)
+    except requests.RequestException as exc:
+        raise JiraSearchError(f"Request error when calling {url}: {exc}")
+    if resp.status_code != 200:
+        raise JiraSearchError(f"Error: {resp.status_code} - {resp.text}")
+    return ZoneInfo(upstream.decode_json(resp).get("timeZone") or "UTC")
+
+def local_mirror(start_syncer: bool = True):
+    """Return the local issue mirror, starting its sync thread on first use; None when disabled."""
+    global _mirror, _mirror_syncer
+    if not JIRA_MIRROR_PROJECTS:
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            from jira_mirror import JiraMirror, MirrorSyncer
+            mirror = JiraMirror(JIRA_MIRROR_PATH)
+            syncer = MirrorSyncer(mirror, JIRA_MIRROR_PROJECTS, iter_search, interval=JIRA_MIRROR_INTERVAL,
+                                  reconcile_interval=JIRA_MIRROR_RECONCILE_INTERVAL,
+                                  account_timezone=account_timezone)
+            if start_syncer:
+                syncer.start()
+            _mirror, _mirror_syncer = mirror, syncer
+    return _mirror
+
+def _mirror_is_fresh(mirror, projects) -> bool:
+    import time
+    for project in projects:
+        if project not in JIRA_MIRROR_PROJECTS:
+            return False
+        synced_at = mirror.synced_at(project)
+        if synced_at is None or time.time() - synced_at > JIRA_MIRROR_MAX_STALENESS:
+            return False
+    return True
+
+def _search_mirror(jql: str):
+    """Answer a search from the mirror, or return None so the caller goes upstream."""
+    # The mirror holds the JIRA_* site only
+    if credentials.current_site() is not None:
+        return None
+    mirror = local_mirror()
+    if mirror is None:
+        return None
+    import sqlite3
+    from jira_mirror import UnsupportedQuery, parse_jql, referenced_projects
+    try:
+        clauses, order_by = parse_jql(jql)
+        projects = referenced_projects(clauses)
+        if not projects or not _mirror_is_fresh(mirror, projects):
+            return None
+        return mirror.query(clauses, order_by)
+    except (UnsupportedQuery, sqlite3.Error):
+        return None
+
+def _get_mirrored_issue(issue_key: str):
+    if credentials.current_site() is not None:
+        return None
+    mirror = local_mirror()
+    if mirror is None:
+        return None
+    import sqlite3
+    project = issue_key.rpartition("-")[0].upper()
+    try:
+        if not _mirror_is_fresh(mirror, [project]):
+            return None
+        return mirror.get_issue(issue_key)
+    except sqlite3.Error:
+        return None
+
 @mcp.tool
+@metrics.instrument_tool("jira")
 def search_issues(jql: str) -> str:
     """Search for JIRA issues using JQL query."""
     # Prefer the new JQL search endpoint, but fall back to the older search endpoint
-    if not JIRA_BASE_URL:
-        raise ValueError('JIRA_BASE_URL is not set')
+    base, auth_header = _site()
+
+    # Mirrored projects answer the supported JQL subset locally; anything else goes upstream
+    local = _search_mirror(jql)
+    if local is not None:
+        return local
 
-    auth_header = get_basic_auth_header(JIRA_USERNAME, JIRA_API_TOKEN)
     headers = {
         "Accept": "application/json",
         "Content-Type": "application/json",
@@ -36,16 +196,16 @@ def search_issues(jql: str) -> str:
     }
 
     # Try the new POST-based JQL endpoint first
-    post_url = f"{JIRA_BASE_URL.rstrip('/')}/rest/api/3/search/jql"
+    post_url = f"{base}/rest/api/3/search/jql"
     post_payload = {"query": jql}
     try:
-        resp = requests.post(post_url, headers=headers, json=post_payload, timeout=20)
+        resp = upstream.request("jira", "POST", post_url, headers=headers, json=post_payload, timeout=20)
     except requests.RequestException as exc:
         return f"Request error when calling {post_url}: {exc}"
 
     if resp.status_code == 200:
         try:
-            return resp.json()
+            return upstream.json_result(resp)
         except ValueError:
             return f"OK ({resp.status_code}) but failed to decode JSON: {resp.text}"
 
@@ -53,17 +213,18 @@ def search_issues(jql: str) -> str:
     # try falling back to the traditional search endpoint which accepts a jql query param.
     # Examples of statuses to try fallback on: 410 (gone), 400 (bad request), 404 (not found)
     if resp.status_code in (410, 400, 404):
-        get_url = f"{JIRA_BASE_URL.rstrip('/')}/rest/api/3/search"
+        upstream.record_retry("jira", f"search_fallback_{resp.status_code}")
+        get_url = f"{base}/rest/api/3/search"
         try:
             params = {"jql": jql}
             get_headers = {"Accept": "application/json", "Authorization": auth_header}
-            get_resp = requests.get(get_url, headers=get_headers, params=params, timeout=20)
+            get_resp = upstream.request("jira", "GET", get_url, headers=get_headers, params=params, timeout=20)
         except requests.RequestException as exc:
             return f"Request error when calling fallback {get_url}: {exc}"
 
         if get_resp.status_code == 200:
             try:
-                return get_resp.json()
+                return upstream.json_result(get_resp)
             except ValueError:
                 return f"OK ({get_resp.status_code}) but failed to decode JSON: {get_resp.text}"
         else:
@@ -73,16 +234,16 @@ def search_issues(jql: str) -> str:
     return f"Error: {resp.status_code} - {resp.text}"
 
 @mcp.tool
+@metrics.instrument_tool("jira")
 def create_issue(project_key: str, summary: str, description: str, issue_type: str = "Task") -> str:
     """Create a new JIRA issue."""
-    if not JIRA_BASE_URL:
-        raise ValueError('JIRA_BASE_URL is not set')
+    base, auth_header = _site()
 
-    url = f"{JIRA_BASE_URL.rstrip('/')}/rest/api/3/issue"
+    url = f"{base}/rest/api/3/issue"
     headers = {
         "Accept": "application/json",
         "Content-Type": "application/json",
-        "Authorization": get_basic_auth_header(JIRA_USERNAME, JIRA_API_TOKEN)
+        "Authorization": auth_header
     }
     payload = {
         "fields": {
@@ -93,41 +254,246 @@ def create_issue(project_key: str, summary: str, description: str, issue_type: s
         }
     }
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=20)
+        response = upstream.request("jira", "POST", url, headers=headers, json=payload, timeout=20)
     except requests.RequestException as exc:
         return f"Request exception when creating issue: {exc}"
 
     if response.status_code == 201:
         try:
-            return response.json()
+            return upstream.decode_json(response)
         except ValueError:
             return f"OK ({response.status_code}) but failed to decode JSON: {response.text}"
     else:
         return f"Error: {response.status_code} - {response.text}"
 
 @mcp.tool
+@metrics.instrument_tool("jira")
 def get_issue(issue_key: str) -> str:
     """Get details of a JIRA issue."""
-    if not JIRA_BASE_URL:
-        raise ValueError('JIRA_BASE_URL is not set')
+    base, auth_header = _site()
+
+    local = _get_mirrored_issue(issue_key)
+    if local is not None:
+        return local
+    cache_key = (base, issue_key.upper())
+    cached = ISSUE_CACHE.get(cache_key)
+    if cached is not None:
+        return upstream.as_result(cached)
 
-    url = f"{JIRA_BASE_URL.rstrip('/')}/rest/api/3/issue/{issue_key}"
+    url = f"{base}/rest/api/3/issue/{issue_key}"
     headers = {
         "Accept": "application/json",
-        "Authorization": get_basic_auth_header(JIRA_USERNAME, JIRA_API_TOKEN)
+        "Authorization": auth_header
     }
     try:
-        response = requests.get(url, headers=headers, timeout=20)
+        response = hedging.request("get_issue", "jira", url, headers=headers, timeout=20)
     except requests.RequestException as exc:
         return f"Request exception when fetching issue {issue_key}: {exc}"
 
     if response.status_code == 200:
         try:
-            return response.json()
+            data = upstream.json_result(response)
         except ValueError:
             return f"OK ({response.status_code}) but failed to decode JSON: {response.text}"
+        ISSUE_CACHE.set(cache_key, data)
+        return data
     else:
         return f"Error: {response.status_code} - {response.text}"
 
+def _parse_time(value: str | None) -> datetime | None:
+    """Parse a Jira or ISO 8601 timestamp with an offset (2024-05-01T10:00:00.000+0000, ...Z, ...+00:00).
+
+    strptime rather than fromisoformat, which rejects Jira's +0000 and a trailing Z before Python 3.11.
+    """
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Timestamp needs a UTC offset: {value}")
+
+def _entry_time(value: str | None) -> datetime | None:
+    """An upstream entry's timestamp, or None when it is missing or malformed."""
+    try:
+        return _parse_time(value)
+    except (ValueError, TypeError):
+        return None
+
+def _newer(value: str | None, since: datetime | None) -> bool:
+    """Whether an entry stamped `value` is after `since`; entries without a usable time count as new."""
+    stamp = _entry_time(value)
+    return since is None or stamp is None or stamp > since
+
+def encode_cursor(since: str | None, changelog_offset: int) -> str:
+    """Opaque cursor: the newest change seen and how many changelog entries were read."""
+    raw = json.dumps({"since": since, "changelog": changelog_offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[str | None, int | None]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return data.get("since"), int(data["changelog"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError(f"since must be a timestamp with a UTC offset or a cursor: {cursor}")
+
+def _get_page(url: str, headers: dict, params: dict) -> dict:
+    try:
+        resp = upstream.request("jira", "GET", url, headers=headers, params=params, timeout=20)
+    except requests.RequestException as exc:
+        raise JiraSearchError(f"Request error when calling {url}: {exc}")
+    if resp.status_code != 200:
+        raise JiraSearchError(f"Error: {resp.status_code} - {resp.text}")
+    try:
+        return upstream.decode_json(resp)
+    except ValueError:
+        raise JiraSearchError(f"OK ({resp.status_code}) but failed to decode JSON: {resp.text}")
+
+def _compact_history(entry: dict) -> dict:
+    return {
+        "id": entry.get("id"),
+        "created": entry.get("created"),
+        "author": (entry.get("author") or {}).get("displayName"),
+        "items": [{"field": item.get("field"), "from": item.get("fromString"), "to": item.get("toString")}
+                  for item in entry.get("items") or []],
+    }
+
+def _changelog_since(base: str, headers: dict, issue_key: str, since: datetime | None,
+                     offset: int | None, limit: int) -> tuple[list[dict], int, bool]:
+    """Changelog entries newer than `since`, oldest first, the offset to resume from, and whether `limit` cut them.
+
+    With a cursor `offset` the entries after it are read in order. Otherwise the changelog (which
+    Jira returns oldest first) is walked backwards from the end until an entry older than `since`,
+    and when `limit` cuts it the newest entries are kept.
+    """
+    url = f"{base}/rest/api/3/issue/{issue_key}/changelog"
+    entries = []
+    if offset is not None:
+        # Continue after the entries already read; a cut-off batch resumes where it stopped
+        start = offset
+        while len(entries) <= limit:
+            page = _get_page(url, headers, {"startAt": start, "maxResults": CHANGES_PAGE_SIZE})
+            values = page.get("values") or []
+            entries += values
+            start += len(values)
+            if page.get("isLast", True) or not values:
+                break
+        return entries[:limit], offset + min(len(entries), limit), len(entries) > limit
+    else:
+        total = _get_page(url, headers, {"startAt": 0, "maxResults": 1}).get("total") or 0
+        end = total
+        while end > 0 and len(entries) < limit:
+            start = max(0, end - CHANGES_PAGE_SIZE)
+            values = _get_page(url, headers, {"startAt": start, "maxResults": end - start}).get("values") or []
+            newer = [v for v in values if _newer(v.get("created"), since)]
+            entries = newer + entries
+            if len(newer) < len(values):
+                break
+            end = start
+    entries = [e for e in entries if _newer(e.get("created"), since)]
+    truncated = len(entries) > limit
+    return entries[-limit:] if truncated else entries, total, truncated
+
+def _comments_since(base: str, headers: dict, issue_key: str, since: datetime | None,
+                    limit: int) -> tuple[list[dict], bool]:
+    """Comments created or edited after `since`, newest first, and whether `limit` cut them.
+
+    Pages are read newest first and stop at the first comment created before `since`, so
+    edits to comments older than the scanned pages are not reported. When `limit` cuts the
+    comments after `since`, the oldest are kept, so a cursor at the newest one returned loses
+    nothing; without `since` the newest are kept.
+    """
+    url = f"{base}/rest/api/3/issue/{issue_key}/comment"
+    comments = []
+    start = 0
+    while since is not None or len(comments) <= limit:
+        page = _get_page(url, headers, {"startAt": start, "maxResults": CHANGES_PAGE_SIZE, "orderBy": "-created"})
+        values = page.get("comments") or []
+        for comment in values:
+            if _newer(comment.get("updated") or comment.get("created"), since):
+                comments.append({
+                    "id": comment.get("id"),
+                    "created": comment.get("created"),
+                    "updated": comment.get("updated"),
+                    "author": (comment.get("author") or {}).get("displayName"),
+                    "body": comment.get("body"),
+                })
+        start += len(values)
+        reached_old = since is not None and values and not _newer(values[-1].get("created"), since)
+        if reached_old or not values or start >= (page.get("total") or 0):
+            break
+    if since is None or len(comments) <= limit:
+        return comments[:limit], len(comments) > limit
+
+    def stamp(comment):
+        return _entry_time(comment["updated"] or comment["created"])
+    # Oldest first by the time that made each comment new; undated comments first, as they always count
+    comments.sort(key=lambda c: (stamp(c) is not None, stamp(c) or since))
+    kept = limit
+    # Don't split comments sharing the last kept time; the cursor resumes strictly after it
+    while kept < len(comments) and stamp(comments[kept]) == stamp(comments[kept - 1]):
+        kept += 1
+    return comments[kept - 1::-1], kept < len(comments)
+
+@mcp.tool
+@metrics.instrument_tool("jira")
+def get_issue_changes(issue_key: str, since: str | None = None, max_results: int = 100) -> str:
+    """Get only what changed on a JIRA issue: changelog entries and new or edited comments.
+
+    `since` is an ISO timestamp (e.g. 2024-05-01T10:00:00+00:00) or the `cursor` from a previous
+    call; when omitted, the cursor stored for this issue by the last call is used, so a watch
+    loop can simply call this repeatedly. The first call without either returns the latest
+    `max_results` changes.
+    """
+    base, auth_header = _site()
+    issue_key = issue_key.upper()
+    store_key = (base, issue_key)
+    offset = None
+    if since is None:
+        with _cursors_lock:
+            stored = _cursors.get(store_key)
+        if stored is not None:
+            since, offset = decode_cursor(stored)
+    else:
+        try:
+            _parse_time(since)
+        except ValueError:
+            since, offset = decode_cursor(since)
+    since_time = _parse_time(since)
+    headers = {"Accept": "application/json", "Authorization": auth_header}
+    limit = max(1, int(max_results))
+
+    try:
+        history, changelog_offset, history_cut = _changelog_since(base, headers, issue_key, since_time, offset, limit)
+        comments, comments_cut = _comments_since(base, headers, issue_key, since_time, limit)
+    except JiraSearchError as exc:
+        return str(exc)
+
+    # The next cursor resumes the changelog where this call stopped, and comments after the newest
+    # one returned; changelog times stay out of it, or comments that limit cut would be skipped
+    stamps = [since_time] if since_time else []
+    stamps += [_entry_time(c.get("updated") or c.get("created")) for c in comments]
+    newest = max((stamp for stamp in stamps if stamp is not None), default=None)
+    cursor = encode_cursor(newest.isoformat() if newest else None, changelog_offset)
+    with _cursors_lock:
+        _cursors[store_key] = cursor
+        _cursors.move_to_end(store_key)
+        while len(_cursors) > CURSOR_STORE_SIZE:
+            _cursors.popitem(last=False)
+
+    return {
+        "issue": issue_key,
+        "since": since_time.isoformat() if since_time else None,
+        "changelog": [_compact_history(entry) for entry in history],
+        "comments": comments,
+        "cursor": cursor,
+        "truncated": history_cut or comments_cut,
+    }
+
 if __name__ == "__main__":
+    metrics.start_http_server_from_env()
+    credentials.install_reload_handler()
+    snapshots.start()
     mcp.run()
\ No newline at end of file
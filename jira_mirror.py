@@ -0,0 +1,458 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone, tzinfo
+
+import fastjson
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    key TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    key_number INTEGER,
+    status TEXT,
+    assignee_id TEXT,
+    assignee_name TEXT,
+    assignee_email TEXT,
+    created TEXT,
+    updated TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS issues_project_updated ON issues (project, updated);
+CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts5(
+    key UNINDEXED, summary, description, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS projects (
+    project TEXT PRIMARY KEY,
+    watermark TEXT,
+    synced_at REAL
+);
+"""
+
+# Fields the mirror needs to answer queries and serve get_issue
+SYNC_FIELDS = ["*all"]
+# Same default page size as the upstream search endpoint
+DEFAULT_RESULT_LIMIT = 50
+# JQL date literals are read in the API user's timezone. While that is unknown the sync query
+# starts early enough to cover any UTC offset; upserts are idempotent, so overlap is harmless
+UNKNOWN_TIMEZONE_MARGIN = timedelta(hours=14, minutes=1)
+
+_TOKEN_PATTERN = re.compile(
+    r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|>=|<=|!=|[=<>~(),]|[^\s=<>!~(),"\']+'
+)
+_RELATIVE_DATE = re.compile(r"^([+-]?\d+)([wdhm])$")
+_UNITS = {"w": "weeks", "d": "days", "h": "hours", "m": "minutes"}
+_ORDER_COLUMNS = {"updated": "updated", "created": "created", "key": "project, key_number"}
+
+
+class UnsupportedQuery(Exception):
+    """Raised for JQL the mirror cannot answer; callers should go upstream instead."""
+
+
+def normalize_timestamp(value: str | None) -> str | None:
+    """Convert a Jira timestamp such as 2025-01-02T03:04:05.678+0100 to a sortable UTC ISO string."""
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    return value
+
+
+def _jql_date(value: str, now: datetime | None = None, tz: tzinfo | None = None) -> str:
+    """Convert a JQL date literal (absolute or relative like -1d) to the mirror's UTC format.
+
+    Absolute dates are local times in `tz`, the API user's timezone, as Jira reads them (UTC if unknown).
+    """
+    now = now or datetime.now(timezone.utc)
+    relative = _RELATIVE_DATE.match(value)
+    if relative:
+        amount, unit = int(relative.group(1)), relative.group(2)
+        return (now + timedelta(**{_UNITS[unit]: amount})).strftime("%Y-%m-%dT%H:%M:%S")
+    for fmt in ("%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M", "%Y-%m-%d", "%Y/%m/%d"):
+        try:
+            local = datetime.strptime(value, fmt).replace(tzinfo=tz or timezone.utc)
+        except ValueError:
+            continue
+        return local.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    raise UnsupportedQuery(f"Unsupported date value: {value}")
+
+
+def _adf_text(node) -> str:
+    """Flatten an Atlassian Document Format description (or a plain string) to text."""
+    if node is None:
+        return ""
+    if isinstance(node, str):
+        return node
+    if isinstance(node, dict):
+        if node.get("type") == "text":
+            return node.get("text", "")
+        return " ".join(_adf_text(child) for child in node.get("content") or [])
+    if isinstance(node, list):
+        return " ".join(_adf_text(child) for child in node)
+    return ""
+
+
+def _match_query(text: str) -> str:
+    tokens = re.findall(r"\w+", text, re.UNICODE)
+    if not tokens:
+        raise UnsupportedQuery("Empty text search")
+    return " ".join(f'"{token}"' for token in tokens)
+
+
+def _unquote(token: str) -> str:
+    if len(token) >= 2 and token[0] == token[-1] and token[0] in "\"'":
+        return re.sub(r"\\(.)", r"\1", token[1:-1])
+    return token
+
+
+def _tokenize(jql: str) -> list[str]:
+    """Split JQL into tokens; UnsupportedQuery if anything but whitespace falls between them."""
+    tokens = []
+    end = 0
+    for match in _TOKEN_PATTERN.finditer(jql):
+        if jql[end:match.start()].strip():
+            raise UnsupportedQuery(f"Unsupported syntax: {jql[end:match.start()].strip()}")
+        tokens.append(match.group())
+        end = match.end()
+    if jql[end:].strip():
+        raise UnsupportedQuery(f"Unsupported syntax: {jql[end:].strip()}")
+    return tokens
+
+
+def parse_jql(jql: str) -> tuple[list[tuple], list[tuple[str, str]]]:
+    """Parse the supported JQL subset into (clauses, order_by).
+
+    Supported: clauses joined by AND on project, status, assignee, updated and text, using
+    =, !=, IN, NOT IN, IS [NOT] EMPTY, comparison operators for updated and ~ for text,
+    plus ORDER BY updated/created/key. Anything else raises UnsupportedQuery.
+    """
+    tokens = _tokenize(jql)
+    position = 0
+
+    def peek(offset=0):
+        index = position + offset
+        return tokens[index] if index < len(tokens) else None
+
+    def take():
+        nonlocal position
+        token = peek()
+        if token is None:
+            raise UnsupportedQuery("Unexpected end of query")
+        position += 1
+        return token
+
+    clauses = []
+    order_by = []
+    while peek() is not None:
+        if peek().lower() == "order" and (peek(1) or "").lower() == "by":
+            position += 2
+            while True:
+                field = take().lower()
+                if field not in _ORDER_COLUMNS:
+                    raise UnsupportedQuery(f"Unsupported ORDER BY field: {field}")
+                direction = "ASC"
+                if (peek() or "").upper() in ("ASC", "DESC"):
+                    direction = take().upper()
+                order_by.append((field, direction))
+                if peek() != ",":
+                    break
+                take()
+            if peek() is not None:
+                raise UnsupportedQuery("Unexpected tokens after ORDER BY")
+            break
+
+        if clauses:
+            if take().lower() != "and":
+                raise UnsupportedQuery("Only AND is supported between clauses")
+        field = take().lower()
+        if field not in ("project", "status", "assignee", "updated", "text"):
+            raise UnsupportedQuery(f"Unsupported field: {field}")
+        operator = take().lower()
+        if operator == "not" and (peek() or "").lower() == "in":
+            take()
+            operator = "not in"
+        elif operator == "is" and (peek() or "").lower() == "not":
+            take()
+            operator = "is not"
+
+        if operator in ("in", "not in"):
+            if take() != "(":
+                raise UnsupportedQuery("Expected ( after IN")
+            values = []
+            while True:
+                values.append(_unquote(take()))
+                separator = take()
+                if separator == ")":
+                    break
+                if separator != ",":
+                    raise UnsupportedQuery("Expected , or ) in IN list")
+            value = values
+        elif operator in ("is", "is not"):
+            if take().lower() not in ("empty", "null"):
+                raise UnsupportedQuery("Only IS [NOT] EMPTY is supported")
+            value = None
+        else:
+            value = _unquote(take())
+            if peek() == "(":
+                raise UnsupportedQuery("JQL functions are not supported")
+        clauses.append((field, operator, value))
+    return clauses, order_by
+
+
+def _clause_sql(field: str, operator: str, value, now: datetime | None = None,
+                tz: tzinfo | None = None) -> tuple[str, list]:
+    if field == "text":
+        if operator != "~":
+            raise UnsupportedQuery("text only supports ~")
+        return "key IN (SELECT key FROM issues_fts WHERE issues_fts MATCH ?)", [_match_query(value)]
+
+    if field == "updated":
+        if operator not in ("=", "!=", ">", ">=", "<", "<="):
+            raise UnsupportedQuery(f"Unsupported operator for updated: {operator}")
+        return f"updated {operator} ?", [_jql_date(value, now, tz)]
+
+    if field == "assignee":
+        match = "(lower(assignee_id) = ? OR lower(assignee_name) = ? OR lower(assignee_email) = ?)"
+        if operator == "is":
+            return "assignee_id IS NULL", []
+        if operator == "is not":
+            return "assignee_id IS NOT NULL", []
+        if operator in ("=", "!="):
+            sql = match if operator == "=" else f"(assignee_id IS NULL OR NOT {match})"
+            return sql, [value.lower()] * 3
+        if operator in ("in", "not in"):
+            parts = [match] * len(value)
+            params = [v.lower() for v in value for _ in range(3)]
+            sql = "(" + " OR ".join(parts) + ")"
+            return (sql if operator == "in" else f"(assignee_id IS NULL OR NOT {sql})"), params
+        raise UnsupportedQuery(f"Unsupported operator for assignee: {operator}")
+
+    column = "upper(project)" if field == "project" else "lower(status)"
+    normalize = str.upper if field == "project" else str.lower
+    if operator in ("=", "!="):
+        return f"{column} {operator} ?", [normalize(value)]
+    if operator in ("in", "not in"):
+        placeholders = ", ".join("?" for _ in value)
+        return f"{column} {operator.upper()} ({placeholders})", [normalize(v) for v in value]
+    raise UnsupportedQuery(f"Unsupported operator for {field}: {operator}")
+
+
+def referenced_projects(clauses: list[tuple]) -> set[str] | None:
+    """Return the projects a query is restricted to, or None if it is not restricted to any."""
+    projects = None
+    for field, operator, value in clauses:
+        if field != "project" or operator not in ("=", "in"):
+            continue
+        values = {v.upper() for v in (value if isinstance(value, list) else [value])}
+        projects = values if projects is None else projects & values
+    return projects
+
+
+class JiraMirror:
+    """SQLite copy of the issues in a set of projects, kept fresh by incremental JQL polling.
+
+    `timezone` is the Jira account's timezone, which JQL date literals are read in; None until known.
+    """
+
+    def __init__(self, path: str, timezone: tzinfo | None = None):
+        self.path = path
+        self.timezone = timezone
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def synced_at(self, project: str) -> float | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM projects WHERE project = ?", (project.upper(),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def watermark(self, project: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT watermark FROM projects WHERE project = ?", (project.upper(),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def upsert_issue(self, issue: dict):
+        """Store (or replace) one issue as returned by the search API."""
+        fields = issue.get("fields") or {}
+        key = issue["key"]
+        project, _, number = key.rpartition("-")
+        assignee = fields.get("assignee") or {}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO issues (key, project, key_number, status, assignee_id, assignee_name, "
+                "assignee_email, created, updated, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    project.upper(),
+                    int(number) if number.isdigit() else None,
+                    ((fields.get("status") or {}).get("name") or "").lower() or None,
+                    assignee.get("accountId"),
+                    assignee.get("displayName"),
+                    assignee.get("emailAddress"),
+                    normalize_timestamp(fields.get("created")),
+                    normalize_timestamp(fields.get("updated")),
+                    json.dumps(issue)
+                )
+            )
+            self._conn.execute("DELETE FROM issues_fts WHERE key = ?", (key,))
+            self._conn.execute(
+                "INSERT INTO issues_fts (key, summary, description) VALUES (?, ?, ?)",
+                (key, fields.get("summary") or "", _adf_text(fields.get("description")))
+            )
+            self._conn.commit()
+
+    def delete_issue(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM issues WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM issues_fts WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def sync_project(self, project: str, search) -> int:
+        """Fetch issues updated since the project's watermark; returns how many were stored.
+
+        `search(jql, fields)` must yield issues. JQL date filters have minute resolution and are
+        read in the account's timezone, so the UTC watermark is converted to it and the query
+        starts a minute early (UNKNOWN_TIMEZONE_MARGIN early while the timezone is unknown),
+        relying on upserts being idempotent.
+        """
+        watermark = self.watermark(project)
+        jql = f'project = "{project}"'
+        if watermark:
+            since = datetime.strptime(watermark, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+            if self.timezone is None:
+                since -= UNKNOWN_TIMEZONE_MARGIN
+            else:
+                since = since.astimezone(self.timezone) - timedelta(minutes=1)
+            jql += f' AND updated >= "{since.strftime("%Y-%m-%d %H:%M")}"'
+        jql += " ORDER BY updated ASC"
+        newest = watermark
+        count = 0
+        for issue in search(jql, SYNC_FIELDS):
+            self.upsert_issue(issue)
+            count += 1
+            updated = normalize_timestamp((issue.get("fields") or {}).get("updated"))
+            if updated and (newest is None or updated > newest):
+                newest = updated
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO projects (project, watermark, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(project) DO UPDATE SET watermark = excluded.watermark, synced_at = excluded.synced_at",
+                (project.upper(), newest, time.time())
+            )
+            self._conn.commit()
+        return count
+
+    def reconcile_project(self, project: str, search) -> int:
+        """Drop mirrored issues that no longer exist in the project (deleted or moved); returns how many.
+
+        Lists every key in the project, so it is far more expensive than a sync and runs rarely.
+        """
+        project = project.upper()
+        live = {issue["key"].upper() for issue in search(f'project = "{project}"', ["id"])}
+        with self._lock:
+            stored = [row[0] for row in self._conn.execute("SELECT key FROM issues WHERE project = ?", (project,))]
+            gone = [key for key in stored if key.upper() not in live]
+            for key in gone:
+                self._conn.execute("DELETE FROM issues WHERE key = ?", (key,))
+                self._conn.execute("DELETE FROM issues_fts WHERE key = ?", (key,))
+            self._conn.commit()
+        return len(gone)
+
+    def get_issue(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM issues WHERE key = ?", (key.upper(),)).fetchone()
+        return fastjson.loads(row[0]) if row else None
+
+    def query(self, clauses: list[tuple], order_by: list[tuple[str, str]],
+              limit: int = DEFAULT_RESULT_LIMIT, now: datetime | None = None) -> dict:
+        """Run parsed JQL against the mirror and return a search-API shaped response."""
+        conditions = []
+        params: list = []
+        for clause in clauses:
+            sql, clause_params = _clause_sql(*clause, now=now, tz=self.timezone)
+            conditions.append(sql)
+            params.extend(clause_params)
+        sql = "SELECT data FROM issues"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        order = order_by or [("updated", "DESC")]
+        sql += " ORDER BY " + ", ".join(
+            ", ".join(f"{column} {direction}" for column in _ORDER_COLUMNS[field].split(", "))
+            for field, direction in order
+        )
+        # Fetch one extra row to know whether more results exist
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        issues = [fastjson.loads(row[0]) for row in rows[:limit]]
+        return {"issues": issues, "isLast": len(rows) <= limit, "source": "local-mirror"}
+
+
+class MirrorSyncer:
+    """Background thread that polls Jira for recently updated issues in each mirrored project.
+
+    Every `reconcile_interval` seconds (and on the first pass) it also drops issues that were
+    deleted or moved, which polling by update time never sees. `account_timezone()`, when
+    given, is asked for the mirror's timezone until it answers.
+    """
+
+    def __init__(self, mirror: JiraMirror, projects: list[str], search, interval: float = 60,
+                 reconcile_interval: float = 3600, account_timezone=None):
+        self.mirror = mirror
+        self.projects = projects
+        self.search = search
+        self.interval = interval
+        self.reconcile_interval = reconcile_interval
+        self.account_timezone = account_timezone
+        self.last_error: str | None = None
+        self._reconciled_at: float | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="jira-mirror-sync", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def sync_once(self):
+        if self.mirror.timezone is None and self.account_timezone is not None:
+            try:
+                self.mirror.timezone = self.account_timezone()
+            except Exception as exc:
+                self.last_error = f"timezone: {exc}"
+        reconcile = self.reconcile_interval > 0 and (
+            self._reconciled_at is None or time.monotonic() - self._reconciled_at >= self.reconcile_interval)
+        for project in self.projects:
+            try:
+                self.mirror.sync_project(project, self.search)
+                if reconcile:
+                    self.mirror.reconcile_project(project, self.search)
+            except Exception as exc:
+                self.last_error = f"{project}: {exc}"
+                reconcile = False
+        if reconcile:
+            self._reconciled_at = time.monotonic()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync_once()
+            self._stop.wait(self.interval)
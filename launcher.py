@@ -0,0 +1,353 @@
+"""Warm launcher for the stdio MCP servers.
+
+MCP clients spawn a new server process per session, and importing fastmcp dominates that start-up
+time. `python launcher.py jira` starts (once) a fork server that has already imported the connectors,
+then hands it this process's stdin, stdout and stderr over a Unix socket. The fork server forks a
+child that serves the session on those descriptors, so each session skips the imports entirely.
+
+The launcher itself only imports the standard library. It needs `socket.send_fds` (Unix, Python 3.9+);
+elsewhere it runs the connector directly.
+
+    python launcher.py jira                # use in the MCP client config instead of `python jira_mcp.py`
+    python launcher.py --serve jira,cal    # run the fork server in the foreground
+    python launcher.py --stop              # stop the fork server for this configuration
+
+Launched sessions don't serve METRICS_PORT: each session is its own forked process, so the
+counters live in the child and a listener per child would collide on the port. Run the connector
+directly (or use the JSON runner's /metrics) to scrape metrics.
+
+Only the user who started the fork server can use it. Its socket is created with mode 0600,
+and on Linux both sides check the other's user id before trusting the connection.
+"""
+import hashlib
+import json
+import os
+import selectors
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+CONNECTORS = ("jira", "confluence", "cal", "resend")
+# Variables that change what an imported connector does; a different set gets its own fork server
+CONFIG_PREFIXES = ("JIRA_", "CONFLUENCE_", "CAL_", "RESEND_", "FROM_EMAIL", "LOG_", "TRACING_", "OTEL_",
+                   "HEALTH", "CREDENTIALS_", "TENANT_", "ADAPTIVE_", "HEDGE_", "CACHE_", "PROFILE_",
+                   "MAX_RESULT_BYTES", "JSON_", "COMPRESS_", "SCHEDULER_", "ADMIN_TOKEN",
+                   "PYTHONPATH")
+# A fork server with no sessions for this long exits; 0 keeps it running
+IDLE_TIMEOUT = float(os.getenv("LAUNCHER_IDLE_TIMEOUT", "1800"))
+START_TIMEOUT = 30.0
+
+_HEADER = struct.Struct("!I")
+
+
+def _dotenv_digest(cwd: str) -> str:
+    """Hash of the .env files the connectors may load at import: the nearest one above this file, and cwd's."""
+    paths = [os.path.join(cwd, ".env")]
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(directory, ".env")
+        if os.path.isfile(candidate):
+            paths.append(candidate)
+            break
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            with open(path, "rb") as dotenv:
+                digest.update(path.encode() + b"\0" + dotenv.read() + b"\0")
+        except OSError:
+            continue
+    return digest.hexdigest()
+
+
+def socket_path(connectors=CONNECTORS, env=None, cwd=None) -> str:
+    """Socket of the fork server for this interpreter, working directory and connector configuration.
+
+    The configuration includes the .env files, which the fork server reads once when it imports the
+    connectors, so editing one starts a fresh fork server.
+    """
+    env = os.environ if env is None else env
+    cwd = os.path.abspath(cwd or os.getcwd())
+    config = sorted((k, v) for k, v in env.items() if k.startswith(CONFIG_PREFIXES))
+    fingerprint = json.dumps([sys.executable, cwd, sorted(connectors), config, _dotenv_digest(cwd)])
+    digest = hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+    directory = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(directory, f"mcp-launcher-{os.getuid()}-{digest}.sock")
+
+
+def _peer_uid(sock) -> int | None:
+    """User id of the process at the other end of a Unix socket, or None where it can't be read."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+
+def _same_user(sock) -> bool:
+    uid = _peer_uid(sock)
+    return uid is None or uid == os.getuid()
+
+
+def _recv_exactly(sock, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("launcher connection closed")
+        data += chunk
+    return data
+
+
+# Fork server
+
+def _run_session(connector: str, request: dict, fds: list):
+    """In the forked child: adopt the client's descriptors, environment and cwd, then serve stdio."""
+    for target, fd in enumerate(fds[:3]):
+        os.dup2(fd, target)
+        os.close(fd)
+    # Rebuild the std streams on the new descriptors
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", closefd=False)
+    os.environ.clear()
+    os.environ.update(request.get("env") or {})
+    os.chdir(request.get("cwd") or os.getcwd())
+    if os.environ.get("METRICS_PORT"):
+        print("launcher: METRICS_PORT is not served by launched sessions; run the connector directly "
+              "to expose /metrics", file=sys.stderr, flush=True)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    module = sys.modules[f"{connector}_mcp"]
+    if "credentials" in sys.modules:
+        sys.modules["credentials"].install_reload_handler()
+    if "snapshots" in sys.modules:
+        sys.modules["snapshots"].start()
+    module.mcp.run(show_banner=False)
+
+
+def serve(connectors=CONNECTORS, path: str | None = None, idle_timeout: float = IDLE_TIMEOUT):
+    """Import the connectors, then fork a child per client connection until idle or stopped."""
+    import importlib
+
+    modules = {name: importlib.import_module(f"{name}_mcp") for name in connectors}
+    path = path or socket_path(connectors)
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Create the socket 0600 rather than chmod it after bind, which leaves a window where the
+    # shared tempdir lets any local user connect
+    umask = os.umask(0o177)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(umask)
+    listener.listen(64)
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    sessions = {}  # child pid -> client connection waiting for the exit status
+    last_active = time.monotonic()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        while not stopping:
+            for key, _ in selector.select(timeout=0.2):
+                conn, _ = listener.accept()
+                # A session runs with this user's credentials; never hand one to another user
+                if not _same_user(conn):
+                    conn.close()
+                    continue
+                try:
+                    header, fds, _, _ = socket.recv_fds(conn, _HEADER.size, 3)
+                    if len(header) < _HEADER.size:
+                        header += _recv_exactly(conn, _HEADER.size - len(header))
+                    request = json.loads(_recv_exactly(conn, _HEADER.unpack(header)[0]))
+                except (OSError, ValueError):
+                    conn.close()
+                    continue
+                if request.get("command") == "stop":
+                    conn.sendall(b"stopping\n")
+                    conn.close()
+                    stopping = True
+                    break
+                connector = request.get("connector")
+                if connector not in modules or len(fds) != 3:
+                    conn.sendall(f"error unknown connector {connector}\n".encode())
+                    conn.close()
+                    for fd in fds:
+                        os.close(fd)
+                    continue
+                pid = os.fork()
+                if pid == 0:
+                    selector.close()
+                    listener.close()
+                    conn.close()
+                    # The child must never return into the accept loop, whatever happens
+                    code = 1
+                    try:
+                        _run_session(connector, request, fds)
+                        code = 0
+                    except BaseException:
+                        import traceback
+                        traceback.print_exc()
+                    finally:
+                        try:
+                            sys.stdout.flush()
+                        except (OSError, ValueError):
+                            pass
+                        os._exit(code)
+                for fd in fds:
+                    os.close(fd)
+                conn.sendall(f"pid {pid}\n".encode())
+                sessions[pid] = conn
+
+            # Reap finished sessions and report their exit status to the waiting launcher
+            while sessions:
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    break
+                if pid == 0:
+                    break
+                conn = sessions.pop(pid, None)
+                if conn is not None:
+                    try:
+                        conn.sendall(f"exit {os.waitstatus_to_exitcode(status)}\n".encode())
+                    except OSError:
+                        pass
+                    conn.close()
+            if sessions:
+                last_active = time.monotonic()
+            elif idle_timeout and time.monotonic() - last_active > idle_timeout:
+                break
+    finally:
+        selector.close()
+        listener.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+# Launcher (client side)
+
+def _send(sock, request: dict, fds=()):
+    body = json.dumps(request).encode()
+    socket.send_fds(sock, [_HEADER.pack(len(body))], list(fds))
+    sock.sendall(body)
+
+
+def _connect(path: str):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    # The launcher sends its environment, secrets included; only to a fork server of this user
+    if not _same_user(sock):
+        sock.close()
+        raise PermissionError(f"launcher socket {path} belongs to another user")
+    return sock
+
+
+def _start_server(connectors, path: str):
+    """Spawn a detached fork server and wait for its socket."""
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", ",".join(connectors), "--socket", path],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        cwd=os.getcwd(), start_new_session=True,
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        sock = _connect(path)
+        if sock is not None:
+            return sock
+        time.sleep(0.05)
+    raise TimeoutError(f"fork server did not start within {START_TIMEOUT}s")
+
+
+def launch(connector: str, connectors=CONNECTORS) -> int:
+    """Run one stdio session of `connector` in the warm fork server; returns its exit code."""
+    path = socket_path(connectors)
+    sock = _connect(path) or _start_server(connectors, path)
+    with sock:
+        _send(sock, {"connector": connector, "cwd": os.getcwd(), "env": dict(os.environ)},
+              [sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()])
+        reader = sock.makefile("r")
+        reply = reader.readline().split()
+        if not reply or reply[0] != "pid":
+            print(f"Launcher error: {' '.join(reply) or 'no reply'}", file=sys.stderr)
+            return 1
+        child = int(reply[1])
+
+        # The MCP client stops a session by signalling the process it spawned; pass that on
+        def forward(signum, frame):
+            try:
+                os.kill(child, signum)
+            except ProcessLookupError:
+                pass
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        reply = reader.readline().split()
+    return int(reply[1]) if len(reply) == 2 and reply[0] == "exit" else 1
+
+
+def stop_server(connectors=CONNECTORS) -> bool:
+    sock = _connect(socket_path(connectors))
+    if sock is None:
+        return False
+    with sock:
+        _send(sock, {"command": "stop"})
+        sock.makefile("r").readline()
+    return True
+
+
+def _run_direct(connector: str) -> int:
+    import importlib
+
+    importlib.import_module(f"{connector}_mcp").mcp.run()
+    return 0
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Start MCP stdio sessions from a warm fork server.")
+    parser.add_argument("connector", nargs="?", choices=CONNECTORS)
+    parser.add_argument("--serve", metavar="CONNECTORS", help="Run the fork server for these connectors")
+    parser.add_argument("--socket", help="Socket path for --serve (default: derived from the configuration)")
+    parser.add_argument("--stop", action="store_true", help="Stop the fork server for this configuration")
+    args = parser.parse_args(argv)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    if args.serve:
+        serve(tuple(args.serve.split(",")), args.socket)
+        return 0
+    if args.stop:
+        return 0 if stop_server() else 1
+    if not args.connector:
+        parser.error("a connector is required")
+    if not hasattr(socket, "send_fds") or os.getenv("LAUNCHER_DISABLE") == "1":
+        return _run_direct(args.connector)
+    try:
+        return launch(args.connector)
+    except PermissionError as exc:
+        print(f"Launcher error: {exc}; running the connector directly", file=sys.stderr)
+        return _run_direct(args.connector)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+import fastjson
+import profiling
+import request_log
+import tracing
+import transfer
+
+# Latency buckets in seconds, spanning fast cache hits to the 20 s upstream timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+# Observations kept per label set for the p50/p95/p99 estimates
+RESERVOIR_SIZE = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+# Size buckets in bytes, from 1 KiB to 256 MiB
+BYTE_BUCKETS = tuple(1024 * 4 ** n for n in range(10))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: dict = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram that also keeps a reservoir of recent observations for quantiles."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {
+                    "counts": [0] * len(self.buckets), "sum": 0.0, "count": 0,
+                    "recent": deque(maxlen=RESERVOIR_SIZE)
+                }
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+            state["recent"].append(value)
+
+    def quantile(self, q: float, **labels) -> float | None:
+        """Estimate a quantile from recent observations, or None if there are none."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            recent = sorted(state["recent"]) if state else []
+        if not recent:
+            return None
+        return recent[min(len(recent) - 1, int(q * len(recent)))]
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state["count"] if state else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        quantile_lines = []
+        with self._lock:
+            items = sorted(self._values.items())
+            snapshot = [(key, list(s["counts"]), s["sum"], s["count"], sorted(s["recent"])) for key, s in items]
+        for key, counts, total, count, recent in snapshot:
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(self.label_names, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+            for q in QUANTILES:
+                if recent:
+                    value = recent[min(len(recent) - 1, int(q * len(recent)))]
+                    labels = _format_labels(self.label_names, key, [("quantile", q)])
+                    quantile_lines.append(f"{self.name}_recent{labels} {_format_value(value)}")
+        if quantile_lines:
+            lines += [
+                f"# HELP {self.name}_recent p50/p95/p99 over the last {RESERVOIR_SIZE} observations",
+                f"# TYPE {self.name}_recent gauge",
+            ] + quantile_lines
+        return lines
+
+
+_registry: list[_Metric] = []
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def counter(name, help, labels=()) -> Counter:
+    return _register(Counter(name, help, labels))
+
+
+def gauge(name, help, labels=()) -> Gauge:
+    return _register(Gauge(name, help, labels))
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labels, buckets))
+
+
+TOOL_CALLS = counter("mcp_tool_calls_total", "Tool calls by outcome", ("connector", "tool", "outcome"))
+TOOL_LATENCY = histogram("mcp_tool_latency_seconds", "Tool call duration", ("connector", "tool"))
+TOOL_IN_FLIGHT = gauge("mcp_tool_in_flight", "Tool calls currently running", ("connector", "tool"))
+UPSTREAM_REQUESTS = counter(
+    "mcp_upstream_requests_total", "Upstream HTTP requests by status code", ("service", "method", "status")
+)
+UPSTREAM_LATENCY = histogram("mcp_upstream_request_seconds", "Upstream HTTP request duration", ("service", "method"))
+UPSTREAM_IN_FLIGHT = gauge("mcp_upstream_in_flight", "Upstream HTTP requests currently open", ("service",))
+UPSTREAM_ENCODED = counter(
+    "mcp_upstream_compressed_responses_total", "Upstream responses received compressed", ("service", "encoding")
+)
+TOOL_RESULTS_TRUNCATED = counter(
+    "mcp_tool_results_truncated_total", "Tool results cut down to MAX_RESULT_BYTES", ("connector", "tool")
+)
+UPSTREAM_RETRIES = counter(
+    "mcp_upstream_retries_total", "Upstream requests repeated against a fallback endpoint", ("service", "reason")
+)
+UPSTREAM_CONCURRENCY_LIMIT = gauge(
+    "mcp_upstream_concurrency_limit", "Adaptive in-flight request limit per upstream host", ("host",)
+)
+UPSTREAM_LIMIT_EVENTS = counter(
+    "mcp_upstream_limit_events_total", "Adaptive limit backoffs and queue timeouts per upstream host", ("host", "event")
+)
+HEDGED_LATENCY = histogram("mcp_hedged_request_seconds", "Upstream latency of hedgeable reads", ("tool",))
+HEDGES = counter(
+    "mcp_upstream_hedges_total", "Duplicate reads sent, won, or skipped for lack of budget", ("tool", "outcome")
+)
+
+TENANT_UPSTREAM_IN_FLIGHT = gauge(
+    "mcp_tenant_upstream_in_flight", "Upstream HTTP requests currently open per tenant", ("tenant",)
+)
+TENANT_THROTTLED = counter(
+    "mcp_tenant_throttled_total", "Requests refused by a tenant quota", ("tenant", "reason")
+)
+
+SCHEDULER_QUEUED = gauge("mcp_scheduler_queued", "Gateway tool calls waiting for a worker", ("lane",))
+SCHEDULER_RUNNING = gauge("mcp_scheduler_running", "Gateway tool calls running", ("lane",))
+SCHEDULER_WAIT = histogram("mcp_scheduler_wait_seconds", "Time gateway tool calls spent queued", ("lane",))
+SCHEDULER_EXPIRED = counter(
+    "mcp_scheduler_expired_total", "Queued gateway tool calls dropped past their deadline", ("lane",)
+)
+
+GATEWAY_IN_FLIGHT = gauge("mcp_gateway_in_flight", "Requests admitted by the JSON runner and not yet answered")
+GATEWAY_WAITING = gauge("mcp_gateway_admission_waiting", "Requests waiting for admission to the JSON runner")
+GATEWAY_SHED = counter("mcp_gateway_shed_total", "Requests the JSON runner rejected with 503", ("reason",))
+
+TOOL_MEMORY_PEAK = histogram(
+    "mcp_tool_memory_peak_bytes", "Traced memory peak above the start of a profiled tool call", ("connector", "tool"),
+    buckets=BYTE_BUCKETS
+)
+TOOL_RESULT_BYTES = histogram(
+    "mcp_tool_result_bytes", "Size of profiled tool results", ("connector", "tool"), buckets=BYTE_BUCKETS
+)
+
+
+def _cache_lines() -> list[str]:
+    from cache import all_caches
+
+    caches = all_caches()
+    lines = []
+    for name, help, read in (
+        ("mcp_cache_hits_total", "Cache hits", lambda c: c.hits),
+        ("mcp_cache_misses_total", "Cache misses", lambda c: c.misses),
+        ("mcp_cache_entries", "Entries currently cached", len),
+    ):
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {'gauge' if name.endswith('entries') else 'counter'}"]
+        lines += [f"{name}{_format_labels(('cache',), (c.name,))} {read(c)}" for c in caches]
+    return lines
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines += metric.render()
+    lines += _cache_lines()
+    return "\n".join(lines) + "\n"
+
+
+def is_error_result(result) -> bool:
+    """Tools report failures as strings rather than exceptions; recognise those."""
+    return isinstance(result, str) and result.startswith(
+        ("Error", "Fallback Error", "Request error", "Request exception", "OK (")
+    )
+
+
+def instrument_tool(connector: str):
+    """Decorator recording call counts, latency, in-flight calls, a trace span and a log line for a tool function.
+
+    Results over MAX_RESULT_BYTES are cut down with a truncation marker (see transfer.py), unless
+    the caller applies the limit itself (transfer.defer_limit). While
+    memory profiling is on, the call's memory and result size are recorded too (see profiling.py).
+    """
+    def decorator(fn):
+        tool = fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            TOOL_IN_FLIGHT.inc(connector=connector, tool=tool)
+            stats, token = request_log.start_call()
+            profile = profiling.begin()
+            start = time.perf_counter()
+            outcome = "error"
+            limited = None
+            try:
+                with tracing.span(f"tool {tool}", connector=connector, tool=tool) as current:
+                    result = fn(*args, **kwargs)
+                    outcome = "error" if is_error_result(result) else "ok"
+                    if outcome == "error":
+                        current.set_error(result[:200])
+                    # Callers that encode the result themselves apply the limit then
+                    limited = result if transfer.limit_deferred() else transfer.limit_result(result)
+                    if limited is not result:
+                        TOOL_RESULTS_TRUNCATED.inc(connector=connector, tool=tool)
+                        current.set_attribute("mcp.truncated", True)
+                return limited
+            except Exception:
+                outcome = "exception"
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                TOOL_LATENCY.observe(duration, connector=connector, tool=tool)
+                TOOL_CALLS.inc(connector=connector, tool=tool, outcome=outcome)
+                TOOL_IN_FLIGHT.dec(connector=connector, tool=tool)
+                if profile is not None:
+                    measured = profiling.finish(profile, connector, tool, limited)
+                    if measured is not None:
+                        TOOL_MEMORY_PEAK.observe(measured[1], connector=connector, tool=tool)
+                        TOOL_RESULT_BYTES.observe(measured[2], connector=connector, tool=tool)
+                request_log.finish_call(stats, token, connector, tool, outcome, duration)
+        return wrapper
+    return decorator
+
+
+def start_http_server(port: int, host: str = "127.0.0.1"):
+    """Serve /metrics from a daemon thread, for stdio servers that have no HTTP endpoint.
+
+    It also serves the memory profile at /debug/memory: GET for a report, and POST with
+    `?action=start|stop|reset` to control profiling. Like the JSON runner's, that endpoint needs
+    ADMIN_TOKEN when it is set and otherwise only answers this host.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlsplit
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == "/debug/memory":
+                self._profile(url, lambda params: profiling.report(
+                    int(params["limit"]) if "limit" in params else None, params.get("group_by", "lineno")))
+                return
+            if url.path != "/metrics":
+                self.send_error(404)
+                return
+            self._send(200, "text/plain; version=0.0.4", render().encode())
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path != "/debug/memory":
+                self.send_error(404)
+                return
+            self._profile(url, lambda params: profiling.control(
+                params.get("action", ""), int(params["frames"]) if "frames" in params else None))
+
+        def _profile(self, url, handle):
+            denied = profiling.admin_denied(self.headers.get("Authorization", ""), self.client_address[0])
+            if denied is not None:
+                status, error = denied
+                self._send(status, "application/json", fastjson.dumps({"error": error}))
+                return
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            try:
+                status, body = 200, handle(params)
+            except ValueError as exc:
+                status, body = 400, {"error": str(exc)}
+            self._send(status, "application/json", fastjson.dumps(body))
+
+        def _send(self, status: int, content_type: str, body: bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_http_server_from_env():
+    """Start the metrics listener when METRICS_PORT is set."""
+    port = os.getenv("METRICS_PORT")
+    if port:
+        start_http_server(int(port))
@@ -0,0 +1,252 @@
+"""Per-tool memory profiling, to find which tool calls make a worker's memory grow.
+
+Off unless PROFILE_MEMORY is set or profiling is started through an admin endpoint. While it is
+on, tracemalloc traces Python allocations and every tool call records how much memory it kept
+(net), how far traced memory rose above its starting point (peak), and the size of its result.
+tracemalloc measures the whole process, so a call that overlapped others is charged for their
+allocations too; those calls are counted separately as `overlapped_calls`.
+
+report() adds the largest allocation sites now, and those that grew most since profiling started
+or was last reset.
+"""
+import hmac
+import os
+import threading
+import time
+import tracemalloc
+
+from dotenv import load_dotenv
+
+import transfer
+
+load_dotenv()
+
+PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "0").lower() in ("1", "true", "yes")
+# Stack frames stored per allocation; more give fuller tracebacks at more memory and CPU cost
+PROFILE_FRAMES = int(os.getenv("PROFILE_FRAMES", "1"))
+# Allocation sites listed in a report
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "20"))
+# Bearer token for the /debug endpoints; when unset they only answer requests from this host
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+_GROUPINGS = ("lineno", "filename", "traceback")
+# tracemalloc's own bookkeeping and module imports aren't what anyone is looking for
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class ToolProfile:
+    """Memory figures accumulated over one tool's profiled calls."""
+
+    def __init__(self, connector: str, tool: str):
+        self.connector = connector
+        self.tool = tool
+        self.calls = 0
+        self.overlapped_calls = 0
+        self.net_bytes_total = 0
+        self.net_bytes_max = 0
+        self.peak_bytes_total = 0
+        self.peak_bytes_max = 0
+        self.result_bytes_total = 0
+        self.result_bytes_max = 0
+
+    def add(self, net: int, peak: int, result_bytes: int, overlapped: bool):
+        self.calls += 1
+        self.overlapped_calls += overlapped
+        self.net_bytes_total += net
+        self.net_bytes_max = max(self.net_bytes_max, net)
+        self.peak_bytes_total += peak
+        self.peak_bytes_max = max(self.peak_bytes_max, peak)
+        self.result_bytes_total += result_bytes
+        self.result_bytes_max = max(self.result_bytes_max, result_bytes)
+
+    def snapshot(self) -> dict:
+        return {
+            "connector": self.connector,
+            "tool": self.tool,
+            "calls": self.calls,
+            "overlapped_calls": self.overlapped_calls,
+            "net_bytes_total": self.net_bytes_total,
+            "net_bytes_max": self.net_bytes_max,
+            "peak_bytes_max": self.peak_bytes_max,
+            "peak_bytes_mean": self.peak_bytes_total // self.calls if self.calls else 0,
+            "result_bytes_total": self.result_bytes_total,
+            "result_bytes_max": self.result_bytes_max,
+        }
+
+
+class _Call:
+    __slots__ = ("start_bytes", "overlapped")
+
+    def __init__(self, start_bytes: int):
+        self.start_bytes = start_bytes
+        self.overlapped = False
+
+
+_profiles: dict[tuple, ToolProfile] = {}
+_active: set = set()
+_baseline: tracemalloc.Snapshot | None = None
+_since: float | None = None
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def start(frames: int | None = None) -> bool:
+    """Start tracing allocations; False if tracing was already on."""
+    global _baseline, _since
+    with _lock:
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(PROFILE_FRAMES if frames is None else max(1, frames))
+        _baseline = tracemalloc.take_snapshot()
+        _since = time.time()
+        return True
+
+
+def stop() -> bool:
+    """Stop tracing, freeing its memory; the per-tool figures are kept. False if it wasn't on."""
+    global _baseline
+    with _lock:
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        _active.clear()
+        _baseline = None
+        return True
+
+
+def reset():
+    """Clear the per-tool figures and measure growth from now on."""
+    global _baseline, _since
+    with _lock:
+        _profiles.clear()
+        if tracemalloc.is_tracing():
+            _baseline = tracemalloc.take_snapshot()
+            _since = time.time()
+
+
+def begin() -> _Call | None:
+    """Mark the start of a tool call; None while profiling is off."""
+    if not tracemalloc.is_tracing():
+        return None
+    with _lock:
+        if not _active:
+            # The peak is process-wide; only reset it when no other call is measuring from it
+            tracemalloc.reset_peak()
+        call = _Call(tracemalloc.get_traced_memory()[0])
+        if _active:
+            call.overlapped = True
+            for other in _active:
+                other.overlapped = True
+        _active.add(call)
+        return call
+
+
+def finish(call: _Call, connector: str, tool: str, result) -> tuple[int, int, int] | None:
+    """Record a call's (net, peak, result) bytes and return them; None if profiling stopped meanwhile."""
+    current, peak = tracemalloc.get_traced_memory()
+    with _lock:
+        if call not in _active:
+            return None
+        _active.discard(call)
+    net = current - call.start_bytes
+    peak = max(0, peak - call.start_bytes)
+    result_bytes = transfer.result_size(result) if result is not None else 0
+    with _lock:
+        profile = _profiles.get((connector, tool))
+        if profile is None:
+            profile = _profiles[(connector, tool)] = ToolProfile(connector, tool)
+        profile.add(net, peak, result_bytes, call.overlapped)
+    return net, peak, result_bytes
+
+
+def _site(stat) -> dict:
+    frame = stat.traceback[0]
+    site = {"file": frame.filename, "line": frame.lineno}
+    if len(stat.traceback) > 1:
+        site["traceback"] = [f"{f.filename}:{f.lineno}" for f in stat.traceback]
+    return site
+
+
+def _rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def report(limit: int | None = None, group_by: str = "lineno") -> dict:
+    """Per-tool figures, largest peak first, and while tracing the top allocation sites.
+
+    `group_by` is "lineno", "filename" or "traceback" (useful with PROFILE_FRAMES above 1).
+    """
+    if group_by not in _GROUPINGS:
+        raise ValueError(f"group_by must be one of {', '.join(_GROUPINGS)}")
+    limit = PROFILE_TOP if limit is None else limit
+    with _lock:
+        tools = sorted((p.snapshot() for p in _profiles.values()),
+                       key=lambda p: p["peak_bytes_max"], reverse=True)
+        baseline = _baseline
+    result = {"enabled": tracemalloc.is_tracing(), "since": _since, "rss_bytes": _rss_bytes(), "tools": tools}
+    if not result["enabled"]:
+        return result
+
+    result["frames"] = tracemalloc.get_traceback_limit()
+    result["traced_bytes"] = tracemalloc.get_traced_memory()[0]
+    current = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    result["top"] = [
+        dict(_site(stat), size_bytes=stat.size, count=stat.count)
+        for stat in current.statistics(group_by)[:limit]
+    ]
+    if baseline is not None:
+        growth = current.compare_to(baseline.filter_traces(_FILTERS), group_by)
+        result["growth"] = [
+            dict(_site(stat), size_diff_bytes=stat.size_diff, count_diff=stat.count_diff, size_bytes=stat.size)
+            for stat in growth[:limit] if stat.size_diff > 0
+        ]
+    return result
+
+
+def admin_denied(authorization: str, client_host: str | None) -> tuple[int, str] | None:
+    """The (status, error) to refuse an admin request with, or None to let it through."""
+    if ADMIN_TOKEN:
+        supplied = authorization.removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+            return 401, "Unauthorized"
+    elif client_host not in ("127.0.0.1", "::1"):
+        return 403, "Admin endpoints are local-only without ADMIN_TOKEN"
+    return None
+
+
+def control(action: str, frames: int | None = None) -> dict:
+    """Apply an admin action ("start", "stop" or "reset") and return the new state."""
+    if action == "start":
+        changed = start(frames)
+    elif action == "stop":
+        changed = stop()
+    elif action == "reset":
+        reset()
+        changed = True
+    else:
+        raise ValueError("action must be start, stop or reset")
+    return {"enabled": tracemalloc.is_tracing(), "changed": changed}
+
+
+def _after_fork():
+    # Calls being measured belong to the parent
+    _active.clear()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+# Started at import so allocations made while the server starts up are traced too
+if PROFILE_MEMORY:
+    start()
@@ -0,0 +1,180 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" for one JSON object per line, "text" for a human-readable line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Log file path; stderr when unset (stdout carries the stdio MCP protocol)
+LOG_FILE = os.getenv("LOG_FILE")
+# Fraction of successful tool calls that are logged; errors are always logged
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+# Records waiting for the writer thread; further records are dropped, never blocking a call
+LOG_QUEUE_SIZE = 10000
+
+# Not "mcp": the MCP SDK logs under that name, and its records would flow through this handler
+logger = logging.getLogger("connectors")
+
+# Upstream and cache activity of the tool call running in this context, or None outside one
+_call_stats: contextvars.ContextVar = contextvars.ContextVar("call_stats", default=None)
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as single-line JSON, merging the `fields` dict passed via `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{k}={v}" for k, v in (getattr(record, "fields", None) or {}).items())
+        line = f"{self.formatTime(record)} {record.levelname} {record.name}: {record.getMessage()} {fields}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line.rstrip()
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the writer thread without ever blocking; counts records dropped when full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the writer thread; only resolve the message so args can't change later
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: _DroppingQueueHandler | None = None
+_listener: logging.handlers.QueueListener | None = None
+_settings: dict = {}
+
+
+def configure(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None, path: str | None = LOG_FILE):
+    """Route the `connectors` logger through a bounded queue to a writer thread.
+
+    Calling this again replaces the previous handler, flushing what it had queued.
+    """
+    global _handler, _listener, _settings
+    shutdown()
+    _settings = {"level": level, "fmt": fmt, "stream": stream, "path": path}
+    target = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(stream or sys.stderr)
+    target.setFormatter(TextFormatter() if fmt == "text" else JSONFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler = _DroppingQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, target)
+    _listener.start()
+    logger.addHandler(_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def shutdown():
+    """Write out queued records and detach the handler."""
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    if _handler is not None:
+        logger.removeHandler(_handler)
+    _handler = None
+    _listener = None
+
+
+def start_call():
+    """Begin collecting upstream and cache activity for a tool call.
+
+    Returns (stats, token) to pass to `finish_call`; stats is None when tool calls aren't logged,
+    so the record_* hooks cost one context lookup.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return None, None
+    stats = {"upstream_calls": 0, "upstream_status": None, "bytes_in": 0, "bytes_out": 0,
+             "cache_hits": 0, "cache_misses": 0}
+    return stats, _call_stats.set(stats)
+
+
+def record_upstream(status, bytes_in: int = 0, bytes_out: int = 0):
+    stats = _call_stats.get()
+    if stats is not None:
+        stats["upstream_calls"] += 1
+        stats["upstream_status"] = status
+        stats["bytes_in"] += bytes_in
+        stats["bytes_out"] += bytes_out
+
+
+def record_cache(hit: bool):
+    stats = _call_stats.get()
+    if stats is not None:
+        stats["cache_hits" if hit else "cache_misses"] += 1
+
+
+def finish_call(stats, token, connector: str, tool: str, outcome: str, duration: float):
+    """Log one line for a finished tool call, sampling successful calls by LOG_SAMPLE_RATE."""
+    if token is not None:
+        _call_stats.reset(token)
+    if stats is None:
+        return
+    if outcome == "ok" and LOG_SAMPLE_RATE < 1.0 and random.random() >= LOG_SAMPLE_RATE:
+        return
+    fields = {"connector": connector, "tool": tool, "outcome": outcome, "duration_ms": round(duration * 1000, 2)}
+    fields.update(stats)
+    logger.log(logging.INFO if outcome == "ok" else logging.WARNING, "tool_call", extra={"fields": fields})
+
+
+def response_sizes(response) -> tuple[int, int]:
+    """Best-effort (received, sent) body sizes of a `requests` response, without re-reading the body."""
+    received = 0
+    content = getattr(response, "_content", None)
+    if isinstance(content, (bytes, bytearray)):
+        received = len(content)
+    sent = 0
+    body = getattr(getattr(response, "request", None), "body", None)
+    if isinstance(body, (bytes, bytearray, str)):
+        sent = len(body)
+    return received, sent
+
+
+def _restart_after_fork():
+    """The writer thread doesn't survive fork (see launcher.py); give the child its own."""
+    global _handler, _listener
+    if _handler is not None:
+        logger.removeHandler(_handler)
+    _handler = None
+    _listener = None
+    configure(**_settings)
+
+
+configure()
+atexit.register(shutdown)
+os.register_at_fork(after_in_child=_restart_after_fork)
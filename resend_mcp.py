@@ -2,6 +2,9 @@ from fastmcp import FastMCP
 import requests
 import os
 from dotenv import load_dotenv
+import credentials
+import metrics
+import upstream
 
 load_dotenv()
 
@@ -10,15 +13,29 @@ FROM_EMAIL = os.getenv("FROM_EMAIL", "onboarding@resend.dev")
 
 # Placeholder for API key - replace with your actual Resend API key
 RESEND_API_KEY = os.getenv("RESEND_API_KEY")
+# Overridable so benchmarks and tests can point the connector at a local stand-in
+RESEND_API_BASE_URL = os.getenv("RESEND_API_BASE_URL", "https://api.resend.com").rstrip("/")
+
+def _reload_env_credentials():
+    global RESEND_API_KEY
+    RESEND_API_KEY = os.getenv("RESEND_API_KEY")
+
+credentials.register_env_reload("resend", _reload_env_credentials)
+
+def _auth_header() -> str:
+    """Authorization header for this call's site: a named site's key, else RESEND_API_KEY."""
+    site = credentials.for_service("resend")
+    return site.auth_header if site is not None else f"Bearer {RESEND_API_KEY}"
 
 mcp = FastMCP("Resend MCP Server")
 
 @mcp.tool
+@metrics.instrument_tool("resend")
 def send_email(to: str | None, subject: str, html: str, from_email: str = FROM_EMAIL) -> str:
     """Send an email using Resend API."""
-    url = "https://api.resend.com/emails"
+    url = f"{RESEND_API_BASE_URL}/emails"
     headers = {
-        "Authorization": f"Bearer {RESEND_API_KEY}",
+        "Authorization": _auth_header(),
         "Content-Type": "application/json"
     }
     # Ensure `to` is a single string. If None, try RECIPIENT from env.
@@ -39,20 +56,22 @@ def send_email(to: str | None, subject: str, html: str, from_email: str = FROM_E
         "html": html
     }
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=20)
+        response = upstream.request("resend", "POST", url, headers=headers, json=payload, timeout=20)
     except requests.RequestException as exc:
         return f"Request exception when calling Resend: {exc}"
 
     # Resend may return 200 or 202 on success; accept both and decode JSON where possible
     if response.status_code in (200, 202):
         try:
-            return response.json()
+            return upstream.decode_json(response)
         except ValueError:
             return f"OK ({response.status_code}) but failed to decode JSON: {response.text}"
     else:
         return f"Error: {response.status_code} - {response.text}"
 
 if __name__ == "__main__":
+    metrics.start_http_server_from_env()
+    credentials.install_reload_handler()
     # Optional: run a one-off test when RUN_RESEND_TEST is set to '1'.
     # This avoids sending test emails during normal server runs.
     run_test = os.getenv("RUN_RESEND_TEST", "0") == "1"
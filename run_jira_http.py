@@ -1,5 +1,12 @@
+from starlette.middleware import Middleware
+
 from jira_mcp import mcp
+from transfer import CompressionMiddleware
+import snapshots
 
 if __name__ == '__main__':
-    # Run the MCP server with HTTP transport on port 8000 under path /mcp
-    mcp.run('streamable-http', host='127.0.0.1', port=8000, path='/mcp')
+    snapshots.start()
+    # Run the MCP server with HTTP transport on port 8000 under path /mcp.
+    # JSON responses above COMPRESS_MIN_BYTES are compressed; SSE streams are left as they are.
+    mcp.run('streamable-http', host='127.0.0.1', port=8000, path='/mcp',
+            middleware=[Middleware(CompressionMiddleware)])
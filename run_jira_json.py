@@ -1,16 +1,44 @@
 from fastmcp import FastMCP
 from starlette.applications import Starlette
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 from starlette.requests import Request
+from starlette.concurrency import run_in_threadpool
 import uvicorn
-import json
+import os
 
 from jira_mcp import mcp
+from webhooks import handle_webhook
+import admission
+import credentials
+import fastjson
+import healthcheck
+import metrics
+import profiling
+import request_log
+import scheduler
+import snapshots
+import tenants
+import tracing
+import transfer
+import upstream
 from fastmcp.exceptions import NotFoundError
 from dotenv import load_dotenv
 load_dotenv()
 
+# Forward upstream JSON bodies that tools return unchanged without decoding and re-encoding them;
+# a request can opt out with "raw": false
+JSON_PASSTHROUGH = os.getenv("JSON_PASSTHROUGH", "1") == "1"
+
+# Fail at start-up, not on the first load-balancer check, when HEALTHZ_SERVICES names an unknown service
+healthcheck.validate_services(healthcheck.HEALTHZ_SERVICES)
+
+# Admission control for /mcp-json: bounded in-flight requests, queue deadlines and load shedding
+_admission = admission.AdmissionController()
+
 app = Starlette()
+# Compress responses above COMPRESS_MIN_BYTES for clients that accept gzip (or zstd)
+app.add_middleware(transfer.CompressionMiddleware)
+app.add_route('/webhooks/{source}', handle_webhook, methods=['POST'])
 
 
 @app.route('/mcp-json', methods=['POST'])
@@ -19,10 +47,68 @@ async def handle_mcp(request: Request):
 
     Example request body:
     {"tool": "search_issues", "args": {"jql": "project = TEST"}}
+
+    Tools that return an upstream body unchanged (get_issue, get_page, search_issues) send it
+    through as received while JSON_PASSTHROUGH is on and the body doesn't set "raw": false.
+
+    A W3C `traceparent` request header makes the call part of the caller's trace; the
+    response carries the server span's `traceparent` when tracing is enabled. An
+    `X-MCP-Site` header runs the tool against a named site from CREDENTIALS_FILE, within
+    that site's quotas (429 when it already has TENANT_MAX_CALLS calls running).
+    `X-MCP-Priority: interactive|default|bulk` overrides the tool's scheduling lane.
+
+    Under overload the call is answered 503 with `Retry-After` instead of being queued
+    indefinitely (see admission.py); `X-MCP-Timeout` says how many seconds the client will wait.
     """
-    data = await request.json()
+    parent = tracing.parse_traceparent(request.headers.get('traceparent'))
+    site = request.headers.get('x-mcp-site') or None
+    with tracing.span('POST /mcp-json', kind='server', parent=parent) as server_span:
+        if site is not None and not _known_site(site):
+            response = JSONResponse({"error": f"Unknown site: {site}"}, status_code=400)
+        else:
+            with credentials.use_site(site):
+                tenant = tenants.get()
+                if not tenant.try_start_call():
+                    response = JSONResponse({"error": f"Too many concurrent calls for {tenant.name}"},
+                                            status_code=429, headers={"Retry-After": "1"})
+                else:
+                    try:
+                        response = await _admit_and_dispatch(request, server_span)
+                    finally:
+                        tenant.finish_call()
+        server_span.set_attribute('http.status_code', response.status_code)
+    traceparent = server_span.traceparent()
+    if traceparent:
+        response.headers['traceparent'] = traceparent
+    return response
+
+
+def _known_site(site: str) -> bool:
+    return bool(credentials.CREDENTIALS_FILE) and credentials.provider().has_site(site)
+
+
+def _overloaded(message: str) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=503,
+                        headers={"Retry-After": str(admission.GATEWAY_RETRY_AFTER)})
+
+
+async def _admit_and_dispatch(request: Request, server_span):
+    deadline = admission.deadline(request.headers.get('x-mcp-timeout'))
+    shed = await _admission.acquire(deadline)
+    if shed is not None:
+        server_span.set_attribute('mcp.shed', shed)
+        return _overloaded(f"Server overloaded ({shed.replace('_', ' ')}), retry later")
+    try:
+        return await _dispatch(request, server_span, deadline)
+    finally:
+        _admission.release()
+
+
+async def _dispatch(request: Request, server_span, deadline: float | None = None):
+    data = fastjson.loads(await request.body())
     tool_name = data.get('tool')
     args = data.get('args', {}) or {}
+    server_span.set_attribute('mcp.tool', str(tool_name))
     try:
         tool = await mcp.get_tool(tool_name)
     except NotFoundError as e:
@@ -33,9 +119,6 @@ async def handle_mcp(request: Request):
         # It may be a coroutine (async) or a regular function.
         # FastMCP FunctionTool exposes the callable at `.fn`.
         fn = getattr(tool, 'fn', None) or (tool if callable(tool) else None)
-        # Debug logging
-        print('DEBUG: tool type=', type(tool), 'repr=', repr(tool))
-        print('DEBUG: fn resolved type=', type(fn), 'callable=', callable(fn))
         # Validate required parameters if present
         params = getattr(tool, 'parameters', None) or {}
         required = params.get('required', []) if isinstance(params, dict) else []
@@ -48,20 +131,87 @@ async def handle_mcp(request: Request):
         if inspect.iscoroutinefunction(fn):
             result = await fn(**args)
         else:
-            result = fn(**args)
-        # Ensure result is JSON serializable
-        try:
-            json.dumps(result)
-            return JSONResponse({"result": result})
-        except TypeError:
-            return JSONResponse({"result": str(result)})
+            # Off the event loop, on the scheduler's workers in the call's priority lane
+            lane = scheduler.lane_for(str(tool_name), request.headers.get('x-mcp-priority'))
+            server_span.set_attribute('mcp.lane', lane)
+            with upstream.passthrough(bool(data.get('raw', JSON_PASSTHROUGH))), transfer.defer_limit():
+                future = scheduler.get().submit_before(deadline, lane, fn, **args)
+            result = await asyncio.wrap_future(future)
+        # Encode once, applying MAX_RESULT_BYTES to the encoded size; upstream bodies passed
+        # through as RawJSON are spliced in without decoding
+        with tracing.span('serialize', backend=fastjson.BACKEND) as current:
+            body, truncated = transfer.encode_limited(result)
+            if truncated:
+                current.set_attribute('mcp.truncated', True)
+                metrics.TOOL_RESULTS_TRUNCATED.inc(connector='jira', tool=str(tool_name))
+            return Response(body, media_type='application/json')
+    except scheduler.DeadlineExceeded as e:
+        return _overloaded(str(e))
     except Exception as e:
+        request_log.logger.exception('tool_exception', extra={'fields': {'tool': str(tool_name)}})
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
+@app.route('/healthz', methods=['GET'])
+async def handle_healthz(request: Request):
+    """Report upstream reachability for load balancers: 200 when healthy, 503 otherwise.
+
+    Probes run concurrently with short deadlines and results are reused for a few seconds.
+    `?shallow=1` skips the upstream probes and only confirms the process is serving.
+    """
+    if request.query_params.get('shallow') in ('1', 'true'):
+        return JSONResponse({"status": "ok"})
+    result = await run_in_threadpool(healthcheck.cached_check)
+    return JSONResponse(result, status_code=200 if result["status"] in ("ok", "degraded") else 503)
+
+
+@app.route('/metrics', methods=['GET'])
+async def handle_metrics(request: Request):
+    """Expose tool, upstream and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+
+def _admin_denied(request: Request) -> JSONResponse | None:
+    denied = profiling.admin_denied(request.headers.get('authorization', ''),
+                                    request.client.host if request.client else None)
+    if denied is None:
+        return None
+    status, error = denied
+    return JSONResponse({"error": error}, status_code=status)
+
+
+@app.route('/debug/memory', methods=['GET', 'POST'])
+async def handle_memory_profile(request: Request):
+    """Dump or control the per-tool memory profile (see profiling.py).
+
+    GET returns the report; `?limit=` sets how many allocation sites are listed and
+    `?group_by=lineno|filename|traceback` how they are grouped. POST with
+    `{"action": "start"|"stop"|"reset"}` (and optionally `"frames"`) turns profiling on or off
+    without a restart, or starts a fresh measurement.
+    """
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+    try:
+        if request.method == 'POST':
+            data = fastjson.loads(await request.body() or b'{}')
+            frames = data.get('frames')
+            result = profiling.control(str(data.get('action', '')), int(frames) if frames is not None else None)
+        else:
+            limit = request.query_params.get('limit')
+            # Taking a snapshot walks every traced allocation, so keep it off the event loop
+            result = await run_in_threadpool(profiling.report, int(limit) if limit is not None else None,
+                                             request.query_params.get('group_by', 'lineno'))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return Response(fastjson.dumps(result), media_type='application/json')
+
+
 if __name__ == '__main__':
     import sys
     try:
+        credentials.install_reload_handler()
+        snapshots.start()
         print("Starting JSON MCP endpoint on http://127.0.0.1:8001/mcp-json", file=sys.stderr)
         uvicorn.run(app, host='127.0.0.1', port=8001, log_level='info')
     except KeyboardInterrupt:
@@ -0,0 +1,179 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+# Tool calls the gateway runs at once, across all lanes
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "16"))
+# name=weight:max_concurrency per lane; weights share the workers between busy lanes, and the
+# bulk lane's cap keeps some workers free for interactive calls
+SCHEDULER_LANES = os.getenv("SCHEDULER_LANES", "interactive=8:16,default=4:16,bulk=1:12")
+# tool=lane overrides of TOOL_LANES, e.g. "search_issues=bulk"
+SCHEDULER_TOOL_LANES = os.getenv("SCHEDULER_TOOL_LANES", "")
+
+DEFAULT_LANE = "default"
+# The gateway serves the Jira tools only. Single-issue reads and writes an agent waits on are
+# interactive; searches stay in the default lane
+TOOL_LANES = {
+    "get_issue": "interactive",
+    "get_issue_changes": "interactive",
+    "create_issue": "interactive",
+}
+
+
+def parse_lanes(spec: str) -> dict:
+    """Parse "name=weight:max_concurrency,..." into {name: (weight, max_concurrency)}."""
+    lanes = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, values = item.partition("=")
+        weight, _, limit = values.partition(":")
+        if not name or float(weight) <= 0:
+            raise ValueError(f"Invalid lane: {item}")
+        lanes[name.strip()] = (float(weight), int(limit or 0))
+    return lanes
+
+
+def parse_tool_lanes(spec: str) -> dict:
+    return dict(item.strip().split("=", 1) for item in spec.split(",") if "=" in item)
+
+
+class DeadlineExceeded(Exception):
+    """A queued call was dropped because its deadline passed before a worker could start it."""
+
+
+class _Lane:
+    def __init__(self, name: str, weight: float, max_concurrency: int):
+        self.name = name
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.queue: deque = deque()
+        self.running = 0
+        self.last_finish = 0.0
+
+    def eligible(self) -> bool:
+        return bool(self.queue) and (self.max_concurrency <= 0 or self.running < self.max_concurrency)
+
+
+class Scheduler:
+    """Runs calls on a fixed set of worker threads, picking the next call by weighted fair queuing.
+
+    Each call gets a virtual finish tag of max(virtual time, its lane's last tag) + 1/weight; a free
+    worker takes the queued call with the smallest tag among lanes under their concurrency limit.
+    Busy lanes therefore share the workers in proportion to their weights, and an idle lane's
+    share goes to the others. Calls run in the submitter's contextvars context.
+    """
+
+    def __init__(self, lanes: dict, workers: int = SCHEDULER_WORKERS, default_lane: str = DEFAULT_LANE):
+        self.lanes = {name: _Lane(name, weight, limit) for name, (weight, limit) in lanes.items()}
+        if default_lane not in self.lanes:
+            raise ValueError(f"Default lane {default_lane} is not configured")
+        self.default_lane = default_lane
+        self.workers = workers
+        self._virtual_time = 0.0
+        self._condition = threading.Condition()
+        self._threads: list = []
+
+    def submit(self, lane: str, fn, *args, **kwargs) -> Future:
+        """Queue `fn(*args, **kwargs)` in `lane` (unknown lanes use the default) and return its Future."""
+        return self.submit_before(None, lane, fn, *args, **kwargs)
+
+    def submit_before(self, deadline: float | None, lane: str, fn, *args, **kwargs) -> Future:
+        """Like `submit`, but if no worker has started the call by `deadline` (a time.monotonic()
+        value) it is not run and its Future raises DeadlineExceeded."""
+        future = Future()
+        context = contextvars.copy_context()
+        with self._condition:
+            self._start_workers()
+            target = self.lanes.get(lane) or self.lanes[self.default_lane]
+            tag = max(self._virtual_time, target.last_finish) + 1 / target.weight
+            target.last_finish = tag
+            target.queue.append((tag, time.perf_counter(), deadline, future, context, fn, args, kwargs))
+            metrics.SCHEDULER_QUEUED.inc(lane=target.name)
+            self._condition.notify()
+        return future
+
+    def _start_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        for index in range(len(self._threads), self.workers):
+            thread = threading.Thread(target=self._work, name=f"scheduler-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next(self):
+        """Wait for and claim the queued call with the smallest finish tag in an eligible lane."""
+        with self._condition:
+            while True:
+                eligible = [lane for lane in self.lanes.values() if lane.eligible()]
+                if eligible:
+                    lane = min(eligible, key=lambda candidate: candidate.queue[0][0])
+                    item = lane.queue.popleft()
+                    lane.running += 1
+                    self._virtual_time = max(self._virtual_time, item[0] - 1 / lane.weight)
+                    metrics.SCHEDULER_QUEUED.dec(lane=lane.name)
+                    metrics.SCHEDULER_RUNNING.inc(lane=lane.name)
+                    return lane, item
+                self._condition.wait()
+
+    def _work(self):
+        while True:
+            lane, (_, queued_at, deadline, future, context, fn, args, kwargs) = self._next()
+            waited = time.perf_counter() - queued_at
+            metrics.SCHEDULER_WAIT.observe(waited, lane=lane.name)
+            try:
+                if deadline is not None and time.monotonic() > deadline:
+                    # The caller has given up by now; running the call would only add load
+                    metrics.SCHEDULER_EXPIRED.inc(lane=lane.name)
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(DeadlineExceeded(
+                            f"Queued {waited:.2f}s in lane {lane.name}, past the deadline"))
+                elif future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(context.run(fn, *args, **kwargs))
+                    except BaseException as exc:
+                        future.set_exception(exc)
+            finally:
+                with self._condition:
+                    lane.running -= 1
+                    metrics.SCHEDULER_RUNNING.dec(lane=lane.name)
+                    # A lane that was at its limit may be eligible again
+                    self._condition.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._condition:
+            return {name: {"queued": len(lane.queue), "running": lane.running}
+                    for name, lane in self.lanes.items()}
+
+
+_scheduler: Scheduler | None = None
+_scheduler_lock = threading.Lock()
+_tool_lanes = {**TOOL_LANES, **parse_tool_lanes(SCHEDULER_TOOL_LANES)}
+
+
+def get() -> Scheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(parse_lanes(SCHEDULER_LANES))
+        return _scheduler
+
+
+def lane_for(tool: str, requested: str | None = None) -> str:
+    """The lane for a call: an explicitly requested lane, else the tool's configured lane."""
+    return requested or _tool_lanes.get(tool, DEFAULT_LANE)
+
+
+def _reset_after_fork():
+    # Worker threads and the condition's lock state don't survive fork
+    global _scheduler
+    _scheduler = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,239 @@
+"""Cache snapshots in SQLite, so a restarted server starts with warm read caches.
+
+With CACHE_SNAPSHOT_PATH set, every TTLCache (issues, pages, event types, availability) and every
+registered state dict (such as detected Confluence API versions) is written to the file every
+CACHE_SNAPSHOT_INTERVAL seconds and at exit. A new process loads each cache's entries the first
+time that cache is used; entries keep their original expiry, so nothing outlives its TTL.
+"""
+import atexit
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import cache
+import fastjson
+
+load_dotenv()
+
+# Off unless a path is set
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH", "")
+CACHE_SNAPSHOT_INTERVAL = float(os.getenv("CACHE_SNAPSHOT_INTERVAL", "60"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache TEXT NOT NULL,
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (cache, key)
+);
+"""
+# Cache names are prefixed so a state dict can't collide with a cache of the same name
+_STATE_PREFIX = "state:"
+
+
+def _encode_key(key) -> str:
+    return fastjson.dumps(key).decode("utf-8")
+
+
+def _decode_key(text: str):
+    """Keys are tuples, which JSON stores as lists; turn them back so lookups match."""
+    def tuples(value):
+        return tuple(tuples(item) for item in value) if isinstance(value, list) else value
+    return tuples(fastjson.loads(text))
+
+
+def _encode_value(value) -> tuple[str, bytes]:
+    if isinstance(value, fastjson.RawJSON):
+        return "raw", value.body
+    return "json", fastjson.dumps(value)
+
+
+def _decode_value(kind: str, data: bytes):
+    if kind == "raw":
+        return fastjson.RawJSON(bytes(data))
+    return fastjson.loads(bytes(data))
+
+
+class Snapshot:
+    """The SQLite file caches are saved to and restored from."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _rows(self, name: str) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, kind, value, expires_at FROM entries WHERE cache = ? ORDER BY position", (name,)
+            ).fetchall()
+
+    def load(self, name: str) -> list[tuple]:
+        """Saved (key, value, expires_at) entries of one cache that haven't expired, least recent first."""
+        now = time.time()
+        entries = []
+        try:
+            rows = self._rows(name)
+        except sqlite3.Error:
+            return entries
+        for key, kind, value, expires_at in rows:
+            if expires_at is not None and expires_at <= now:
+                continue
+            try:
+                entries.append((_decode_key(key), _decode_value(kind, value), expires_at))
+            except ValueError:
+                continue
+        return entries
+
+    def restore_states(self) -> int:
+        """Fill the registered state dicts with saved values they don't have yet."""
+        restored = 0
+        for name, mapping in cache.all_states().items():
+            for key, value, _ in self.load(_STATE_PREFIX + name):
+                if key not in mapping:
+                    mapping[key] = value
+                    restored += 1
+        return restored
+
+    def save(self) -> int:
+        """Write every live entry of the caches used by this process, and the state dicts.
+
+        Several processes (stdio sessions, launcher children) share one file, so entries are
+        upserted rather than replacing a cache's rows: each process adds what it holds and leaves
+        the others' entries alone. An entry dropped here (evicted or invalidated) can therefore
+        be restored later, but never past its expiry, and expired rows are deleted. Caches this
+        process never touched aren't written at all. Entries that can't be encoded are skipped.
+        Returns the entries written.
+        """
+        tables = {}
+        for item in cache.all_caches():
+            if item.enabled and item.restored:
+                tables[item.name] = item.entries()
+        for name, mapping in cache.all_states().items():
+            tables[_STATE_PREFIX + name] = [(key, value, None) for key, value in list(mapping.items())]
+
+        written = 0
+        # Positions order entries least recent first across processes: later saves sort after
+        base = time.time_ns() // 1000
+        with self._lock, self._conn:
+            for name, entries in tables.items():
+                for position, (key, value, expires_at) in enumerate(entries):
+                    try:
+                        encoded_key = _encode_key(key)
+                        kind, data = _encode_value(value)
+                    except TypeError:
+                        continue
+                    self._conn.execute(
+                        "INSERT INTO entries (cache, key, kind, value, expires_at, position) VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(cache, key) DO UPDATE SET kind = excluded.kind, value = excluded.value, "
+                        "expires_at = excluded.expires_at, position = excluded.position",
+                        (name, encoded_key, kind, data, expires_at, base + position)
+                    )
+                    written += 1
+            self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                               (time.time(),))
+        return written
+
+
+class SnapshotWriter:
+    """Background thread that saves a snapshot every `interval` seconds."""
+
+    def __init__(self, snapshot: Snapshot, interval: float = 60):
+        self.snapshot = snapshot
+        self.interval = interval
+        self.last_error: str | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cache-snapshot", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshot.save()
+            except sqlite3.Error as exc:
+                self.last_error = str(exc)
+
+
+_snapshot: Snapshot | None = None
+_writer: SnapshotWriter | None = None
+_lock = threading.Lock()
+
+
+def _save_at_exit():
+    if _snapshot is not None:
+        try:
+            _snapshot.save()
+        except sqlite3.Error:
+            pass
+
+
+def start(path: str | None = None, interval: float | None = None) -> Snapshot | None:
+    """Restore from and periodically save to `path` (default CACHE_SNAPSHOT_PATH); None when unset.
+
+    Also saves at exit, including on SIGTERM when nothing else handles it.
+    """
+    global _snapshot, _writer
+    path = CACHE_SNAPSHOT_PATH if path is None else path
+    interval = CACHE_SNAPSHOT_INTERVAL if interval is None else interval
+    if not path:
+        return None
+    with _lock:
+        if _snapshot is not None:
+            return _snapshot
+        _snapshot = Snapshot(path)
+        _snapshot.restore_states()
+        cache.set_restorer(_snapshot.load)
+        if interval > 0:
+            _writer = SnapshotWriter(_snapshot, interval)
+            _writer.start()
+    atexit.register(_save_at_exit)
+    # SIGTERM ends the process without running atexit handlers unless it becomes a normal exit
+    if threading.current_thread() is threading.main_thread() and \
+            signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    return _snapshot
+
+
+def stop():
+    """Save a final snapshot and stop saving."""
+    global _snapshot, _writer
+    with _lock:
+        if _writer is not None:
+            _writer.stop()
+        _save_at_exit()
+        if _snapshot is not None:
+            _snapshot.close()
+        _snapshot = _writer = None
+    cache.set_restorer(None)
+    atexit.unregister(_save_at_exit)
+
+
+def _after_fork():
+    # The connection and writer thread belong to the parent; a forked session calls start() again
+    global _snapshot, _writer
+    _snapshot = _writer = None
+    cache.set_restorer(None)
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,234 @@
+from html.entities import name2codepoint
+from html.parser import HTMLParser
+from xml.parsers import expat
+import re
+
+# Target size of a chunk; sections larger than this are split at paragraph boundaries
+DEFAULT_CHUNK_CHARS = 8000
+
+_HEADING_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_BLOCK_TAGS = {"p", "div", "blockquote", "tr", "table", "ul", "ol", "pre", "hr"}
+# Macro parts whose text is configuration rather than page content
+_SKIPPED_TAGS = {"ac:parameter", "style", "script"}
+_ENTITY = re.compile(r"&([A-Za-z][A-Za-z0-9]*);")
+_XML_ENTITIES = {"amp", "lt", "gt", "quot", "apos"}
+_VALIDATION_ROOT = "<ac:root>"
+
+
+class _StorageConverter(HTMLParser):
+    """Convert Confluence storage XHTML into markdown (or plain text) lines."""
+
+    def __init__(self, markdown: bool = True):
+        super().__init__(convert_charrefs=True)
+        self.markdown = markdown
+        self.lines: list[str] = []
+        self.headings: list[tuple[int, int, str]] = []  # (line index, level, text)
+        self._current: list[str] = []
+        self._prefix = ""
+        self._heading_level = 0
+        self._skip_depth = 0
+        self._list_stack: list[str] = []
+        self._link_href = None
+        self._in_code_macro = False
+        self._row: list[str] | None = None
+        self._cell: list[str] | None = None
+
+    def _flush(self):
+        text = re.sub(r"[ \t\r\n]+", " ", "".join(self._current)).strip()
+        self._current = []
+        prefix, self._prefix = self._prefix, ""
+        if not text:
+            return
+        text = prefix + text
+        if self._heading_level:
+            self.headings.append((len(self.lines), self._heading_level, text))
+            if self.markdown:
+                text = "#" * self._heading_level + " " + text
+        self.lines.append(text)
+
+    def _write(self, text: str):
+        if self._cell is not None:
+            self._cell.append(text)
+        else:
+            self._current.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in _HEADING_TAGS:
+            self._flush()
+            self._heading_level = _HEADING_TAGS[tag]
+        elif tag in ("ul", "ol"):
+            self._flush()
+            self._list_stack.append(tag)
+        elif tag == "li":
+            self._flush()
+            indent = "  " * (len(self._list_stack) - 1)
+            marker = ("1. " if self._list_stack and self._list_stack[-1] == "ol" else "- ") if self.markdown else ""
+            self._prefix = indent + marker
+        elif tag == "tr":
+            self._flush()
+            self._row = []
+        elif tag in ("td", "th"):
+            self._cell = []
+        elif tag == "br":
+            self._flush()
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+        elif tag == "ac:structured-macro" and attrs.get("ac:name") in ("code", "noformat"):
+            self._flush()
+            self._in_code_macro = True
+        elif tag in ("strong", "b") and self.markdown:
+            self._write("**")
+        elif tag in ("em", "i") and self.markdown:
+            self._write("_")
+        elif tag == "code" and self.markdown:
+            self._write("`")
+        elif tag == "a":
+            self._link_href = attrs.get("href")
+            if self.markdown and self._link_href:
+                self._write("[")
+        elif tag == "ri:attachment" and attrs.get("ri:filename"):
+            self._write(f"[attachment: {attrs['ri:filename']}]")
+        elif tag == "ri:page" and attrs.get("ri:content-title"):
+            self._write(attrs["ri:content-title"])
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _HEADING_TAGS:
+            self._flush()
+            self._heading_level = 0
+        elif tag in ("ul", "ol"):
+            self._flush()
+            if self._list_stack:
+                self._list_stack.pop()
+        elif tag in ("td", "th"):
+            if self._row is not None and self._cell is not None:
+                self._row.append(re.sub(r"\s+", " ", "".join(self._cell)).strip())
+            self._cell = None
+        elif tag == "tr":
+            if self._row:
+                joiner = " | " if self.markdown else "\t"
+                row = joiner.join(self._row)
+                self.lines.append(f"| {row} |" if self.markdown else row)
+            self._row = None
+        elif tag == "ac:structured-macro" and self._in_code_macro:
+            self._in_code_macro = False
+        elif tag in _BLOCK_TAGS or tag == "li":
+            self._flush()
+        elif tag in ("strong", "b") and self.markdown:
+            self._write("**")
+        elif tag in ("em", "i") and self.markdown:
+            self._write("_")
+        elif tag == "code" and self.markdown:
+            self._write("`")
+        elif tag == "a":
+            if self.markdown and self._link_href:
+                self._write(f"]({self._link_href})")
+            self._link_href = None
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        self._write(data)
+
+    def unknown_decl(self, data):
+        # Code macros keep their body in CDATA; emit it verbatim as a fenced block
+        if data.startswith("CDATA[") and not self._skip_depth:
+            body = data[len("CDATA["):].rstrip("\n")
+            if self._in_code_macro:
+                self._flush()
+                self.lines.append(f"```\n{body}\n```" if self.markdown else body)
+            else:
+                self._write(body)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def convert_storage(value: str, markdown: bool = True) -> tuple[list[str], list[tuple[int, int, str]]]:
+    """Convert storage XHTML into text lines plus (line index, level, text) headings."""
+    converter = _StorageConverter(markdown=markdown)
+    converter.feed(value or "")
+    converter.close()
+    return converter.lines, converter.headings
+
+
+def chunk_storage(value: str, markdown: bool = True, max_chars: int = DEFAULT_CHUNK_CHARS) -> dict:
+    """Split a storage-format body into heading-aligned chunks with a table of contents.
+
+    Returns {"chunks": [str, ...], "toc": [{"heading", "level", "chunk"}, ...]}. Each chunk starts
+    at a heading where possible; sections longer than `max_chars` are split between paragraphs.
+    """
+    lines, headings = convert_storage(value, markdown=markdown)
+    heading_at = {index: (level, text) for index, level, text in headings}
+
+    # Group lines into sections that start at each heading
+    sections: list[list[int]] = []
+    for index in range(len(lines)):
+        if index in heading_at or not sections:
+            sections.append([])
+        sections[-1].append(index)
+
+    chunks: list[str] = []
+    toc = []
+    current: list[str] = []
+    size = 0
+
+    def close_chunk():
+        nonlocal current, size
+        if current:
+            chunks.append("\n\n".join(current))
+        current, size = [], 0
+
+    for section in sections:
+        section_size = sum(len(lines[i]) + 2 for i in section)
+        if current and size + section_size > max_chars:
+            close_chunk()
+        for i in section:
+            if current and size + len(lines[i]) > max_chars:
+                close_chunk()
+            if i in heading_at:
+                level, text = heading_at[i]
+                toc.append({"heading": text, "level": level, "chunk": len(chunks)})
+            current.append(lines[i])
+            size += len(lines[i]) + 2
+    close_chunk()
+    return {"chunks": chunks or [""], "toc": toc}
+
+
+def validate_storage(value: str) -> list[str]:
+    """Check a storage-format body the way Confluence will, without a round trip.
+
+    Storage format is XHTML: tags must be closed (`<br/>`, not `<br>`), attributes quoted and
+    entities known. HTML named entities such as `&nbsp;` are allowed. Structured macros need an
+    `ac:name`. Returns error messages with line and column; an empty list means valid.
+    """
+    errors = []
+
+    def entity(match):
+        name = match.group(1)
+        if name in _XML_ENTITIES:
+            return match.group(0)
+        if name in name2codepoint:
+            return f"&#{name2codepoint[name]};"
+        return match.group(0)  # left for the parser to report as undefined
+
+    def start(tag, attributes):
+        if tag == "ac:structured-macro" and "ac:name" not in attributes:
+            errors.append(f"line {parser.CurrentLineNumber}: ac:structured-macro without ac:name")
+
+    # Without namespace processing the ac:/ri: prefixes are just part of the names
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    try:
+        parser.Parse(_VALIDATION_ROOT + _ENTITY.sub(entity, value or "") + "</ac:root>", True)
+    except expat.ExpatError as exc:
+        line, column = exc.lineno, exc.offset
+        if line == 1:
+            column -= len(_VALIDATION_ROOT)
+        errors.append(f"line {line}, column {column + 1}: {expat.errors.messages[exc.code]}")
+    return errors
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+import credentials
+import metrics
+
+load_dotenv()
+
+# Per-tenant quotas; a tenant is a named site from CREDENTIALS_FILE, or "default" for the .env credentials.
+# 0 means unlimited. A site's "limits" entry in the credentials file overrides these.
+TENANT_MAX_CONCURRENCY = int(os.getenv("TENANT_MAX_CONCURRENCY", "0"))  # upstream requests in flight
+TENANT_RATE_LIMIT = float(os.getenv("TENANT_RATE_LIMIT", "0"))  # upstream requests per second
+TENANT_RATE_BURST = int(os.getenv("TENANT_RATE_BURST", "0"))  # defaults to one second's worth of requests
+TENANT_MAX_CALLS = int(os.getenv("TENANT_MAX_CALLS", "0"))  # gateway tool calls in flight
+# How long an upstream request waits for a concurrency slot or rate token before failing
+TENANT_QUEUE_TIMEOUT = float(os.getenv("TENANT_QUEUE_TIMEOUT", "10"))
+# Connections kept open per host in a named site's session pool
+TENANT_POOL_SIZE = int(os.getenv("TENANT_POOL_SIZE", "10"))
+
+DEFAULT_TENANT = "default"
+
+
+class QuotaExceeded(requests.RequestException):
+    """An upstream request could not get a concurrency slot or rate token within the queue timeout.
+
+    Subclasses RequestException so tools report it like any other failed request.
+    """
+
+
+class RateLimiter:
+    """Token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: int = 0):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+def _settings(limits: dict) -> tuple:
+    return (int(limits.get("max_concurrency", TENANT_MAX_CONCURRENCY)),
+            float(limits.get("rate_limit", TENANT_RATE_LIMIT)),
+            int(limits.get("burst", TENANT_RATE_BURST)),
+            int(limits.get("max_calls", TENANT_MAX_CALLS)))
+
+
+class Tenant:
+    """Connection pool and quotas for one tenant."""
+
+    def __init__(self, name: str, limits: dict | None = None):
+        self.name = name
+        self.settings = _settings(limits or {})
+        self.max_concurrency, self.rate_limit, burst, self.max_calls = self.settings
+        self._slots = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency > 0 else None
+        self._limiter = RateLimiter(self.rate_limit, burst) if self.rate_limit > 0 else None
+        self._calls = 0
+        self._calls_lock = threading.Lock()
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def session(self):
+        """This tenant's own requests.Session, so tenants never share keep-alive connections."""
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                size = max(TENANT_POOL_SIZE, self.max_concurrency)
+                adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    @contextmanager
+    def upstream_slot(self, timeout: float | None = None):
+        """Hold one of this tenant's upstream concurrency slots and spend a rate token."""
+        timeout = TENANT_QUEUE_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        if self._slots is not None and not self._slots.acquire(timeout=timeout):
+            metrics.TENANT_THROTTLED.inc(tenant=self.name, reason="concurrency")
+            raise QuotaExceeded(f"Tenant {self.name}: no upstream slot within {timeout}s")
+        try:
+            if self._limiter is not None and not self._limiter.acquire(max(0.0, deadline - time.monotonic())):
+                metrics.TENANT_THROTTLED.inc(tenant=self.name, reason="rate")
+                raise QuotaExceeded(f"Tenant {self.name}: rate limit of {self.rate_limit}/s exceeded")
+            metrics.TENANT_UPSTREAM_IN_FLIGHT.inc(tenant=self.name)
+            try:
+                yield
+            finally:
+                metrics.TENANT_UPSTREAM_IN_FLIGHT.dec(tenant=self.name)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def try_start_call(self) -> bool:
+        """Count a gateway tool call in, unless the tenant already has max_calls running."""
+        with self._calls_lock:
+            if self.max_calls > 0 and self._calls >= self.max_calls:
+                metrics.TENANT_THROTTLED.inc(tenant=self.name, reason="calls")
+                return False
+            self._calls += 1
+            return True
+
+    def finish_call(self):
+        with self._calls_lock:
+            self._calls -= 1
+
+
+_tenants: dict = {}
+_tenants_lock = threading.Lock()
+
+
+def get(site: str | None = None) -> Tenant:
+    """The tenant for `site` (default: the active site); rebuilt when its limits change in the credentials file."""
+    site = credentials.current_site() if site is None else site
+    name = site or DEFAULT_TENANT
+    limits = credentials.provider().limits(site) if site else {}
+    with _tenants_lock:
+        tenant = _tenants.get(name)
+        if tenant is None or tenant.settings != _settings(limits):
+            tenant = _tenants[name] = Tenant(name, limits)
+        return tenant
+
+
+def sender(tenant: Tenant):
+    """Where a tenant's requests go: its own session, the .env tenant included, for keep-alive pooling."""
+    return tenant.session()
+
+
+def reset():
+    """Forget all tenant state (pools, quotas, in-flight counts)."""
+    with _tenants_lock:
+        _tenants.clear()
+
+
+# Sessions hold sockets and locks that must not be shared with a forked child (see launcher.py)
+os.register_at_fork(after_in_child=reset)
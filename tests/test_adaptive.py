@@ -0,0 +1,126 @@
+import pytest
+from unittest.mock import Mock, patch
+import os
+import sys
+import threading
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+
+import adaptive
+import metrics
+import tenants
+import upstream
+
+
+def _run(limiter, latency=0.01, outcome="ok", epoch=None, route="GET /x"):
+    if epoch is None:
+        epoch = limiter.acquire(1)
+    limiter.release(epoch, latency, outcome, route)
+
+
+class TestAdaptive:
+    """Test suite for the adaptive (AIMD) upstream concurrency limits."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_limiters(self):
+        adaptive.reset()
+        yield
+        adaptive.reset()
+
+    def test_grows_while_busy_and_healthy(self):
+        """Test the limit grows by about one per round trip only while it is in use."""
+        limiter = adaptive.AIMDLimiter("a.example", initial=4)
+        for _ in range(20):
+            _run(limiter)
+        assert limiter.limit == 4  # one request at a time never uses the limit
+
+        for _ in range(6):
+            epochs = [limiter.acquire(1) for _ in range(limiter.limit)]
+            for epoch in epochs:
+                limiter.release(epoch, 0.01, "ok")
+        assert 6 <= limiter.limit <= 10
+
+    def test_backs_off_once_per_congestion_signal(self):
+        """Test a 429 halves the limit, and requests sent before the cut don't cut it again."""
+        limiter = adaptive.AIMDLimiter("b.example", initial=16)
+        epochs = [limiter.acquire(1) for _ in range(3)]
+        for epoch in epochs:
+            limiter.release(epoch, 0.01, "throttled")
+        assert limiter.limit == 8
+        _run(limiter, outcome="timeout")
+        assert limiter.limit == 4
+        _run(limiter, outcome="error")
+        assert limiter.limit == 4
+        assert metrics.UPSTREAM_LIMIT_EVENTS.value(host="b.example", event="throttled") == 1
+
+    def test_backs_off_on_latency_inflation(self):
+        """Test smoothed latency well above the baseline cuts the limit."""
+        limiter = adaptive.AIMDLimiter("c.example", initial=10, tolerance=2.0)
+        for _ in range(adaptive._WARMUP_SAMPLES):
+            _run(limiter, latency=0.05)
+        for _ in range(10):
+            _run(limiter, latency=0.5)
+        assert limiter.limit < 10
+        assert limiter.snapshot()["routes"]["GET /x"]["baseline_ms"] < 100
+
+    def test_slow_routes_have_their_own_baseline(self):
+        """Test healthy slow searches on a host with fast reads don't count as congestion."""
+        limiter = adaptive.AIMDLimiter("f.example", initial=16)
+        for _ in range(200):
+            for route, latency in (("GET /issue/*", 0.03), ("GET /myself", 0.1), ("POST /search", 1.5)):
+                epochs = [limiter.acquire(1) for _ in range(8)]
+                for epoch in epochs:
+                    limiter.release(epoch, latency, "ok", route)
+        assert limiter.limit >= 16
+        assert metrics.UPSTREAM_LIMIT_EVENTS.value(host="f.example", event="latency") == 0
+
+    def test_route_masks_ids(self):
+        """Test ids in paths are masked so one resource type shares a route."""
+        assert adaptive.route("get", "https://x.atlassian.net/rest/api/3/issue/PROJ-12?fields=a") == \
+            adaptive.route("GET", "https://x.atlassian.net/rest/api/3/issue/OPS-7") == "GET /rest/api/*/issue/*"
+        assert adaptive.route("POST", "https://x/rest/api/3/search") != adaptive.route("GET", "https://x/rest/api/3/search")
+
+    def test_limit_bounds_and_queue_timeout(self):
+        """Test the limit stays within its bounds and waiting past the timeout fails."""
+        limiter = adaptive.AIMDLimiter("d.example", initial=2, minimum=1, maximum=2)
+        for _ in range(5):
+            _run(limiter, outcome="throttled")
+        assert limiter.limit == 1
+        limiter.acquire(1)
+        with pytest.raises(tenants.QuotaExceeded, match="adaptive limit 1"):
+            limiter.acquire(0.05)
+
+    def test_waiting_request_gets_released_slot(self):
+        """Test a request over the limit proceeds as soon as a slot is returned."""
+        limiter = adaptive.AIMDLimiter("e.example", initial=1)
+        epoch = limiter.acquire(1)
+        acquired = threading.Event()
+        waiter = threading.Thread(target=lambda: (limiter.acquire(2), acquired.set()))
+        waiter.start()
+        assert not acquired.wait(0.1)
+        limiter.release(epoch, 0.01, "ok")
+        assert acquired.wait(2)
+        waiter.join()
+
+    @patch('requests.Session.get')
+    def test_upstream_requests_feed_the_host_limiter(self, mock_get, monkeypatch):
+        """Test upstream calls hold a slot per host and report 429s and timeouts to it."""
+        monkeypatch.setattr(adaptive, "ADAPTIVE_CONCURRENCY", True)
+        mock_get.return_value = Mock(status_code=429, headers={})
+        upstream.request("jira", "GET", "https://limits.atlassian.net/rest/api/3/myself")
+        limiter = adaptive.for_url("https://limits.atlassian.net/other")
+        assert limiter.limit == adaptive.ADAPTIVE_INITIAL_LIMIT // 2
+        assert limiter.in_flight == 0
+
+        mock_get.side_effect = requests.Timeout("slow")
+        with pytest.raises(requests.Timeout):
+            upstream.request("jira", "GET", "https://limits.atlassian.net/rest/api/3/myself")
+        assert limiter.limit == adaptive.ADAPTIVE_INITIAL_LIMIT // 4
+        assert "limits.atlassian.net" in adaptive.snapshot()
+
+    def test_disabled_by_default(self):
+        """Test requests are sent without a limiter unless ADAPTIVE_CONCURRENCY is set."""
+        assert adaptive.for_url("https://x.atlassian.net/") is None
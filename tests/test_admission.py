@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.testclient import TestClient
+
+import admission
+import metrics
+
+
+class TestAdmission:
+    """Test suite for admission control on the JSON runner."""
+
+    def test_deadline_uses_client_timeout_capped(self, monkeypatch):
+        """Test the client's X-MCP-Timeout shortens the queue deadline but can't extend it."""
+        monkeypatch.setattr(admission, "GATEWAY_QUEUE_TIMEOUT", 10)
+        assert admission.deadline(None, now=100) == 110
+        assert admission.deadline("2.5", now=100) == 102.5
+        assert admission.deadline("60", now=100) == 110
+        assert admission.deadline("soon", now=100) == 110
+
+    def test_admits_up_to_limit_then_queues_in_order(self):
+        """Test requests over the limit wait and get released slots first come, first served."""
+        async def scenario():
+            controller = admission.AdmissionController(max_in_flight=1, max_queue=4)
+            deadline = time.monotonic() + 5
+            assert await controller.acquire(deadline) is None
+            order = []
+
+            async def waiter(name):
+                assert await controller.acquire(deadline) is None
+                order.append(name)
+
+            tasks = [asyncio.create_task(waiter(name)) for name in ("a", "b")]
+            await asyncio.sleep(0.01)
+            assert order == [] and controller.in_flight == 1
+            controller.release()
+            await asyncio.sleep(0.01)
+            controller.release()
+            await asyncio.gather(*tasks)
+            controller.release()
+            return order, controller.in_flight
+
+        assert asyncio.run(scenario()) == (["a", "b"], 0)
+
+    def test_sheds_when_queue_full_or_deadline_passes(self):
+        """Test a full queue rejects at once and a waiter past its deadline gives up."""
+        async def scenario():
+            controller = admission.AdmissionController(max_in_flight=1, max_queue=1)
+            await controller.acquire(time.monotonic() + 5)
+            waiting = asyncio.create_task(controller.acquire(time.monotonic() + 0.05))
+            await asyncio.sleep(0)
+            full = await controller.acquire(time.monotonic() + 5)
+            expired = await waiting
+            controller.release()
+            return full, expired, controller.in_flight, len(controller._waiters)
+
+        assert asyncio.run(scenario()) == ("queue_full", "deadline", 0, 0)
+        assert metrics.GATEWAY_SHED.value(reason="queue_full") >= 1
+
+    def test_gateway_answers_503_when_overloaded(self, monkeypatch):
+        """Test the JSON runner sheds requests with 503 and Retry-After instead of queueing them."""
+        import run_jira_json
+        busy = admission.AdmissionController(max_in_flight=1, max_queue=0)
+        busy.in_flight = 1
+        monkeypatch.setattr(run_jira_json, "_admission", busy)
+
+        response = TestClient(run_jira_json.app).post('/mcp-json', json={"tool": "get_issue", "args": {}})
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == str(admission.GATEWAY_RETRY_AFTER)
+        assert "overloaded" in response.json()["error"]
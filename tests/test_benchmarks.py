@@ -0,0 +1,140 @@
+import pytest
+import os
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+import requests
+
+from mock_upstreams import MockUpstreamServer, UpstreamBehavior
+import replay
+import run_benchmarks
+
+
+class TestBenchmarks:
+    """Test suite for the benchmark harness and mock upstreams."""
+
+    @pytest.fixture
+    def server(self):
+        with MockUpstreamServer(UpstreamBehavior(latency_ms=0, jitter_ms=0, page_size=10, total_issues=25,
+                                                 total_pages=25, seed=1)) as mock:
+            yield mock
+
+    @pytest.fixture
+    def connectors(self, server, monkeypatch):
+        """Point the connectors at the mock, restoring their configuration afterwards."""
+        import cal_mcp
+        import confluence_mcp
+        import jira_mcp
+        import resend_mcp
+        for module, names in (
+            (jira_mcp, ("JIRA_BASE_URL", "JIRA_USERNAME", "JIRA_API_TOKEN")),
+            (confluence_mcp, ("CONFLUENCE_BASE_URL", "CONFLUENCE_USERNAME", "CONFLUENCE_API_TOKEN")),
+            (cal_mcp, ("CAL_API_KEY", "CAL_API_BASE_URL")),
+            (resend_mcp, ("RESEND_API_KEY", "RESEND_API_BASE_URL")),
+        ):
+            for name in names:
+                monkeypatch.setattr(module, name, getattr(module, name))
+        run_benchmarks.point_connectors_at(server.url)
+        yield server
+        confluence_mcp._API_VERSIONS.clear()
+
+    def test_jira_search_paginates(self, server, connectors):
+        """Test the mock Jira search pages with nextPageToken until every issue is returned."""
+        import jira_mcp
+        issues = list(jira_mcp.iter_search("project = BENCH"))
+        assert len(issues) == 25
+        assert server.requests["POST /rest/api/3/search/jql"] == 3
+
+    def test_confluence_search_follows_next_links(self, server, connectors):
+        """Test the mock Confluence search returns relative next links the connector follows."""
+        import confluence_mcp
+        results = list(confluence_mcp.iter_search_results("benchmark"))
+        assert len(results) == 25
+
+    def test_rate_limit_injection(self, server):
+        """Test injected 429s carry Retry-After."""
+        server.behavior.rate_limit_rate = 1.0
+        response = requests.get(f"{server.url}/v2/event-types", timeout=5)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+
+    def test_run_level_counts_errors(self):
+        """Test a level summary counts error strings and exceptions separately."""
+        def call(index):
+            if index % 4 == 0:
+                raise RuntimeError("boom")
+            return "Error: 500 - x" if index % 4 == 1 else {"ok": True}
+
+        level = run_benchmarks.run_level(call, concurrency=2, total=8)
+        assert level["requests"] == 8
+        assert level["errors"] == 4
+        assert level["exceptions"] == 2
+        assert level["latency_ms"]["p50"] is not None
+
+    def test_compare_flags_regressions(self):
+        """Test regressions beyond the tolerance are reported and improvements are not."""
+        def doc(rps, p95, errors=0):
+            return {"results": [{"scenario": "jira.get_issue", "concurrency": 4, "throughput_rps": rps,
+                                 "latency_ms": {"p95": p95}, "errors": errors}]}
+
+        assert run_benchmarks.compare(doc(100, 10), doc(110, 9)) == []
+        regressions = run_benchmarks.compare(doc(100, 10), doc(50, 20, errors=1))
+        assert len(regressions) == 3
+
+    def test_replay_loads_collection_calls(self):
+        """Test the Postman collection yields its JSON runner calls with variables filled in."""
+        calls = replay.load_collection()
+        tools = [call["tool"] for call in calls]
+        assert "get_issue" in tools and "search_issues" in tools
+        assert {"tool": "get_issue", "args": {"issue_key": "TEST-1"}} == {
+            k: v for k, v in calls[tools.index("get_issue")].items() if k != "name"}
+        assert tools.count("search_issues") == 1  # the streamable HTTP request is skipped
+
+    def test_replay_trace_and_schedule(self, tmp_path):
+        """Test traces keep their timing, log lines borrow collection args, and rates cycle the mix."""
+        trace = tmp_path / "trace.jsonl"
+        trace.write_text("\n".join([
+            '{"ts": 100.5, "tool": "get_issue", "args": {"issue_key": "A-1"}, "priority": "bulk"}',
+            '{"ts": 100.0, "msg": "tool_call", "connector": "jira", "tool": "search_issues"}',
+            '{"ts": 101.0, "msg": "tool_exception", "tool": "get_issue"}',
+        ]))
+        calls = replay.load_trace(str(trace), [{"tool": "search_issues", "args": {"jql": "project = X"}}])
+        assert [(c["offset"], c["tool"], c["args"]) for c in calls] == [
+            (0.0, "search_issues", {"jql": "project = X"}), (0.5, "get_issue", {"issue_key": "A-1"})]
+        assert [due for due, _ in replay.schedule(calls, speed=2)] == [0.0, 0.25]
+
+        plan = replay.schedule(calls, rate=10, duration=1, arrivals="uniform")
+        assert len(plan) == 10
+        assert [call["tool"] for _, call in plan[:3]] == ["search_issues", "get_issue", "search_issues"]
+        assert plan[1][0] == pytest.approx(0.1)
+        with pytest.raises(ValueError, match="pass a rate"):
+            replay.schedule([{"tool": "get_issue", "args": {}, "offset": None}])
+
+    def test_replay_against_gateway(self, connectors, monkeypatch):
+        """Test a replay through the JSON runner reports per-tool statuses and latency."""
+        calls = [{"tool": "get_issue", "args": {"issue_key": "BENCH-1"}}, {"tool": "not_a_real_tool", "args": {}}]
+        plan = replay.schedule(calls, rate=50, duration=0.2, arrivals="uniform")
+        with run_benchmarks.GatewayServer() as gateway:
+            report = replay.replay(plan, gateway.url, max_workers=4)
+        assert report["overall"]["requests"] == 10
+        assert report["tools"]["get_issue"]["statuses"] == {"200": 5}
+        assert report["tools"]["not_a_real_tool"]["statuses"] == {"404": 5}
+        assert report["tools"]["get_issue"]["latency_ms"]["p95"] is not None
+        assert report["tools"]["not_a_real_tool"]["latency_ms"]["p50"] is None
+        assert report["overall"]["failed"] == 5
+        assert report["overall"]["latency_ms"]["p50"] == report["tools"]["get_issue"]["latency_ms"]["p50"]
+
+    def test_replay_selects_served_read_calls(self):
+        """Test the collection replay keeps only tools the gateway serves, and writes only on request."""
+        calls = replay.load_collection()
+        kept, skipped = replay.select(calls, replay.served_tools())
+        assert {call["tool"] for call in kept} == {"search_issues", "create_issue", "get_issue"}
+        assert skipped == {"get_event_types": 1, "not_a_real_tool": 1, "search_pages": 1, "send_email": 1}
+        kept, skipped = replay.select(calls, replay.served_tools(), allow_writes=False)
+        assert {call["tool"] for call in kept} == {"search_issues", "get_issue"}
+        assert skipped["create_issue"] == 1
+        kept, _ = replay.select(calls, replay.served_tools(), tools={"get_issue"})
+        assert [call["tool"] for call in kept] == ["get_issue"]
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cache import TTLCache
+
+
+class TestTTLCache:
+    """Test suite for the shared TTL cache."""
+
+    def test_disabled_with_zero_ttl(self):
+        """Test a zero TTL cache never stores anything."""
+        cache = TTLCache("test", ttl=0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_entries_expire(self, monkeypatch):
+        """Test entries are served until their TTL passes."""
+        now = [100.0]
+        monkeypatch.setattr(time, "monotonic", lambda: now[0])
+        cache = TTLCache("test", ttl=10)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        now[0] = 111.0
+        assert cache.get("a") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted at maxsize."""
+        cache = TTLCache("test", ttl=60, maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+    def test_invalidate_matching(self):
+        """Test predicate invalidation drops only matching keys."""
+        cache = TTLCache("test", ttl=60)
+        cache.set(("x", 1), "a")
+        cache.set(("y", 1), "b")
+        assert cache.invalidate_matching(lambda key: key[0] == "x") == 1
+        assert cache.get(("y", 1)) == "b"
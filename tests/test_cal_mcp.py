@@ -17,7 +17,7 @@ class TestCalMCP:
         """Set up mock environment variables."""
         monkeypatch.setenv("CAL_API_KEY", "cal_live_test_key_123")
 
-    @patch('cal_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_get_event_types_success(self, mock_get, mock_env_vars):
         """Test successful get event types."""
         # Mock response
@@ -39,7 +39,7 @@ class TestCalMCP:
         assert len(result["event_types"]) == 2
         mock_get.assert_called_once()
 
-    @patch('cal_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_get_event_types_error(self, mock_get, mock_env_vars):
         """Test get event types with error."""
         # Mock error response
@@ -55,7 +55,7 @@ class TestCalMCP:
         assert "Error: 401" in result
         assert "Unauthorized" in result
 
-    @patch('cal_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_create_booking_success(self, mock_post, mock_env_vars):
         """Test successful booking creation."""
         # Mock response
@@ -84,7 +84,7 @@ class TestCalMCP:
         assert result["eventTypeId"] == 1
         mock_post.assert_called_once()
 
-    @patch('cal_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_create_booking_error(self, mock_post, mock_env_vars):
         """Test booking creation with error."""
         # Mock error response
@@ -105,7 +105,7 @@ class TestCalMCP:
         assert "Error: 400" in result
         assert "Time slot not available" in result
 
-    @patch('cal_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_get_availability_success(self, mock_get, mock_env_vars):
         """Test successful get availability."""
         # Mock response
@@ -132,7 +132,7 @@ class TestCalMCP:
         assert len(result["slots"]) == 3
         mock_get.assert_called_once()
 
-    @patch('cal_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_get_availability_error(self, mock_get, mock_env_vars):
         """Test get availability with error."""
         # Mock error response
@@ -152,7 +152,7 @@ class TestCalMCP:
         assert "Error: 404" in result
         assert "Event type not found" in result
 
-    @patch('cal_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_get_availability_params(self, mock_get, mock_env_vars):
         """Test get availability with correct parameters."""
         # Mock response
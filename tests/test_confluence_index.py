@@ -0,0 +1,150 @@
+import pytest
+import os
+import sys
+from unittest.mock import patch
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import confluence_mcp
+from confluence_index import ConfluenceIndex, IndexCrawler, to_match_query
+
+
+def listed(page):
+    """The page as a metadata listing returns it, without the body."""
+    return {key: value for key, value in page.items() if key != "body"}
+
+
+def make_page(page_id, title, body, modified, version=1):
+    return {
+        "id": page_id,
+        "title": title,
+        "version": {"number": version, "createdAt": modified},
+        "body": {"storage": {"value": body}}
+    }
+
+
+class TestConfluenceIndex:
+    """Test suite for the local Confluence full-text index."""
+
+    @pytest.fixture
+    def index(self):
+        idx = ConfluenceIndex(":memory:")
+        yield idx
+        idx.close()
+
+    def test_to_match_query_quotes_tokens(self):
+        """Test free text becomes quoted tokens so FTS5 operators are inert."""
+        assert to_match_query('deploy OR "rollback"*') == '"deploy" "OR" "rollback"'
+        assert to_match_query("  !! ") is None
+
+    def test_search_ranks_title_matches_first(self, index):
+        """Test BM25 ranking favours title matches over body matches."""
+        pages = [
+            make_page("1", "Onboarding", "<p>how to deploy the service</p>", "2025-01-02T00:00:00Z"),
+            make_page("2", "Deploy runbook", "<p>steps</p>", "2025-01-01T00:00:00Z"),
+        ]
+        index.sync_space("DEV", lambda key: iter(pages))
+
+        hits = index.search("deploy", "DEV")
+
+        assert [hit["id"] for hit in hits] == ["2", "1"]
+        assert index.is_synced("DEV")
+
+    def test_incremental_sync_stops_at_watermark(self, index):
+        """Test incremental syncs only index pages newer than the watermark."""
+        old = make_page("1", "Old", "<p>alpha</p>", "2025-01-01T00:00:00Z")
+        index.sync_space("DEV", lambda key: iter([old]))
+        new = make_page("2", "New", "<p>alpha</p>", "2025-02-01T00:00:00Z")
+        edited = make_page("1", "Old", "<p>beta</p>", "2025-01-01T00:00:00Z")
+
+        count = index.sync_space("DEV", lambda key: iter([new, edited]))
+
+        assert count == 1
+        assert index.watermark("DEV") == "2025-02-01T00:00:00Z"
+        assert [hit["id"] for hit in index.search("beta")] == []
+
+    def test_page_changed_at_the_watermark_is_indexed(self, index):
+        """Test a page stamped exactly at the watermark is re-checked and indexed if its version moved."""
+        index.sync_space("DEV", lambda key: iter([make_page("1", "One", "<p>alpha</p>", "2025-01-01T00:00:00Z")]))
+        same_time = make_page("2", "Two", "<p>beta</p>", "2025-01-01T00:00:00Z")
+
+        assert index.sync_space("DEV", lambda key: iter([same_time])) == 1
+        assert [hit["id"] for hit in index.search("beta")] == ["2"]
+
+    def test_full_sync_drops_deleted_pages(self, index):
+        """Test a full sync removes pages that no longer exist upstream."""
+        first = make_page("1", "Gone", "<p>alpha</p>", "2025-01-01T00:00:00Z")
+        index.sync_space("DEV", lambda key: iter([first]))
+
+        index.sync_space("DEV", lambda key: iter([]), full=True)
+
+        assert index.search("alpha") == []
+
+    def test_metadata_listing_fetches_only_changed_bodies(self, index):
+        """Test a listing without bodies fetches a body only for pages whose version changed."""
+        pages = {
+            "1": make_page("1", "One", "<p>alpha</p>", "2025-01-01T00:00:00Z"),
+            "2": make_page("2", "Two", "<p>beta</p>", "2025-01-02T00:00:00Z"),
+        }
+        index.sync_space("DEV", lambda key: iter(pages.values()))
+        pages["2"] = make_page("2", "Two", "<p>gamma</p>", "2025-03-01T00:00:00Z", version=2)
+        pages["3"] = make_page("3", "Three", "<p>delta</p>", "2025-03-02T00:00:00Z")
+        fetched = []
+
+        def fetch(page_id):
+            fetched.append(page_id)
+            return pages[page_id]
+
+        listing = [listed(pages["3"]), listed(pages["2"]), listed(pages["1"])]
+        assert index.sync_space("DEV", lambda key: iter(listing), fetch) == 2
+        assert fetched == ["3", "2"]
+        assert [hit["id"] for hit in index.search("gamma")] == ["2"]
+
+        assert index.sync_space("DEV", lambda key: iter(listing), fetch, full=True) == 0
+        assert fetched == ["3", "2"]
+
+    def test_crawler_reconciles_deleted_pages(self, index, monkeypatch):
+        """Test incremental passes keep deleted pages until the periodic full pass drops them."""
+        pages = [make_page("2", "Two", "<p>alpha</p>", "2025-01-02T00:00:00Z"),
+                 make_page("1", "One", "<p>alpha</p>", "2025-01-01T00:00:00Z")]
+        crawled = []
+        crawler = IndexCrawler(index, ["DEV"], lambda key: iter([listed(p) for p in pages]),
+                               lambda page_id: {}, reconcile_interval=3600,
+                               crawl_pages=lambda key: crawled.append(key) or iter(pages))
+        now = [1000.0]
+        monkeypatch.setattr("confluence_index.time.monotonic", lambda: now[0])
+        crawler._reconciled_at = now[0]
+
+        crawler.sync_once()
+        assert crawled == ["DEV"]
+        assert len(index.search("alpha")) == 2
+
+        del pages[0]
+        crawler.sync_once()
+        assert len(index.search("alpha")) == 2
+
+        now[0] += 3600
+        crawler.sync_once()
+        assert crawled == ["DEV"]
+        assert crawler.last_error is None
+        assert [hit["id"] for hit in index.search("alpha")] == ["1"]
+
+    def test_search_pages_served_locally(self, index, monkeypatch):
+        """Test search_pages answers from a synced local index without calling upstream."""
+        index.sync_space("DEV", lambda key: iter([make_page("1", "Runbook", "<p>alpha</p>", "2025-01-01")]))
+        monkeypatch.setattr(confluence_mcp, "CONFLUENCE_INDEX_SPACES", ["DEV"])
+        monkeypatch.setattr(confluence_mcp, "_local_index", index)
+        monkeypatch.setattr(confluence_mcp, "CONFLUENCE_BASE_URL", "https://test.atlassian.net")
+        monkeypatch.setattr(confluence_mcp, "CONFLUENCE_USERNAME", "test@example.com")
+        monkeypatch.setattr(confluence_mcp, "CONFLUENCE_API_TOKEN", "test-token-123")
+
+        with patch('requests.Session.get') as mock_get:
+            result = confluence_mcp.search_pages.fn("alpha", space_key="DEV", lean=True)
+
+        mock_get.assert_not_called()
+        assert result["source"] == "local-index"
+        assert result["results"][0]["id"] == "1"
+
+        monkeypatch.setattr(confluence_mcp, "CONFLUENCE_INDEX_MAX_STALENESS", -1)
+        assert confluence_mcp._search_local("alpha", "DEV", 10, True) is None
@@ -20,6 +20,12 @@ class TestConfluenceMCP:
         monkeypatch.setenv("CONFLUENCE_USERNAME", "test@example.com")
         monkeypatch.setenv("CONFLUENCE_API_TOKEN", "test-token-123")
 
+    @pytest.fixture(autouse=True)
+    def reset_api_detection(self):
+        """Forget detected API versions and space ids between tests."""
+        confluence_mcp._API_VERSIONS.clear()
+        confluence_mcp._SPACE_IDS.clear()
+
     def test_get_basic_auth_header(self):
         """Test basic auth header generation."""
         header = get_basic_auth_header("user", "pass")
@@ -31,7 +37,7 @@ class TestConfluenceMCP:
         with pytest.raises(ValueError, match="Username and token are required"):
             get_basic_auth_header(None, None)
 
-    @patch('confluence_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_search_pages_success(self, mock_get, mock_env_vars):
         """Test successful Confluence page search."""
         # Mock response
@@ -51,7 +57,7 @@ class TestConfluenceMCP:
         assert result == {"results": [{"id": "123", "title": "Test Page", "type": "page"}]}
         mock_get.assert_called_once()
 
-    @patch('confluence_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_search_pages_with_space_key(self, mock_get, mock_env_vars):
         """Test Confluence page search with space key."""
         # Mock response
@@ -69,7 +75,7 @@ class TestConfluenceMCP:
         call_args = mock_get.call_args
         assert "space = DEV" in str(call_args)
 
-    @patch('confluence_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_search_pages_error(self, mock_get, mock_env_vars):
         """Test Confluence page search with error."""
         # Mock error response
@@ -85,7 +91,7 @@ class TestConfluenceMCP:
         assert "Error: 403" in result
         assert "Forbidden" in result
 
-    @patch('confluence_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_create_page_success(self, mock_post, mock_env_vars):
         """Test successful Confluence page creation."""
         # Mock response
@@ -105,7 +111,7 @@ class TestConfluenceMCP:
         assert result == {"id": "456", "title": "New Page", "type": "page"}
         mock_post.assert_called_once()
 
-    @patch('confluence_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_create_page_error(self, mock_post, mock_env_vars):
         """Test Confluence page creation with error."""
         # Mock error response
@@ -121,7 +127,7 @@ class TestConfluenceMCP:
         assert "Error: 400" in result
         assert "Invalid space key" in result
 
-    @patch('confluence_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_get_page_success(self, mock_get, mock_env_vars):
         """Test successful get Confluence page."""
         # Mock response
@@ -148,7 +154,7 @@ class TestConfluenceMCP:
         assert "body" in result
         mock_get.assert_called_once()
 
-    @patch('confluence_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_get_page_not_found(self, mock_get, mock_env_vars):
         """Test get Confluence page with not found error."""
         # Mock error response
@@ -163,3 +169,306 @@ class TestConfluenceMCP:
         # Assert
         assert "Error: 404" in result
         assert "Page not found" in result
+
+    @patch('requests.Session.get')
+    def test_search_pages_follows_next_link(self, mock_get, mock_env_vars):
+        """Test search pagination follows _links.next until exhausted."""
+        first = Mock()
+        first.status_code = 200
+        first.json.return_value = {
+            "results": [{"id": "1", "title": "One"}],
+            "size": 1,
+            "_links": {"next": "/rest/api/content/search?cursor=abc&limit=25"}
+        }
+        second = Mock()
+        second.status_code = 200
+        second.json.return_value = {"results": [{"id": "2", "title": "Two"}], "size": 1, "_links": {}}
+        mock_get.side_effect = [first, second]
+
+        # Execute
+        result = confluence_mcp.search_pages.fn("test query")
+
+        # Assert
+        assert [r["id"] for r in result["results"]] == ["1", "2"]
+        assert result["size"] == 2
+        assert "next" not in result["_links"]
+        assert mock_get.call_count == 2
+        assert mock_get.call_args_list[1][0][0].endswith("/wiki/rest/api/content/search?cursor=abc&limit=25")
+
+    @patch('requests.Session.get')
+    def test_search_pages_respects_max_results(self, mock_get, mock_env_vars):
+        """Test search stops paginating once max_results is reached."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "results": [{"id": "1"}, {"id": "2"}, {"id": "3"}],
+            "_links": {"next": "/rest/api/content/search?cursor=abc"}
+        }
+        mock_get.return_value = mock_response
+
+        # Execute
+        result = confluence_mcp.search_pages.fn("test query", max_results=2)
+
+        # Assert
+        assert [r["id"] for r in result["results"]] == ["1", "2"]
+        mock_get.assert_called_once()
+        assert mock_get.call_args[1]["params"]["limit"] == 2
+
+    @patch('requests.Session.get')
+    def test_search_pages_lean(self, mock_get, mock_env_vars):
+        """Test lean search requests only space/version and projects results."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "results": [{
+                "id": "1", "title": "One", "type": "page", "status": "current",
+                "space": {"key": "DEV", "name": "Development"},
+                "version": {"number": 4, "when": "2025-01-01"}
+            }]
+        }
+        mock_get.return_value = mock_response
+
+        # Execute
+        result = confluence_mcp.search_pages.fn("test query", lean=True)
+
+        # Assert
+        assert result["results"] == [{"id": "1", "title": "One", "space": "DEV", "version": 4}]
+        assert mock_get.call_args[1]["params"]["expand"] == "space,version"
+
+    def test_build_search_cql_escapes_quotes(self):
+        """Test CQL values are quoted rather than interpolated."""
+        cql = confluence_mcp.build_search_cql('it\'s "quoted"', space_key="my space")
+        assert cql == 'text ~ "it\'s \\"quoted\\"" and space = "my space"'
+
+    @patch('requests.Session.get')
+    def test_get_page_prefers_v2(self, mock_get, mock_env_vars):
+        """Test get_page uses the v2 endpoint and remembers the site supports it."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"id": "789", "title": "Existing Page", "spaceId": "42"}
+        mock_get.return_value = mock_response
+
+        # Execute
+        result = confluence_mcp.get_page.fn("789")
+
+        # Assert
+        assert result["id"] == "789"
+        assert "/wiki/api/v2/pages/789" in mock_get.call_args[0][0]
+        assert mock_get.call_args[1]["params"] == {"body-format": "storage"}
+        assert confluence_mcp.api_version("https://test.atlassian.net") == "v2"
+
+    @patch('requests.Session.get')
+    def test_get_page_falls_back_to_v1(self, mock_get, mock_env_vars):
+        """Test get_page falls back to v1 when the site has no v2 API."""
+        missing = Mock()
+        missing.status_code = 404
+        missing.text = "Not Found"
+        found = Mock()
+        found.status_code = 200
+        found.json.return_value = {"id": "789", "body": {"storage": {"value": "<p>x</p>"}}}
+        mock_get.side_effect = [missing, found]
+
+        # Execute
+        result = confluence_mcp.get_page.fn("789")
+
+        # Assert
+        assert result["id"] == "789"
+        assert "/wiki/rest/api/content/789" in mock_get.call_args[0][0]
+        assert confluence_mcp.api_version("https://test.atlassian.net") == "v1"
+
+    @patch('requests.Session.post')
+    @patch('requests.Session.get')
+    def test_create_page_v2_resolves_space_id(self, mock_get, mock_post, mock_env_vars):
+        """Test create_page posts to v2 with a space id once v2 is detected."""
+        confluence_mcp._API_VERSIONS["https://test.atlassian.net"] = "v2"
+        spaces = Mock()
+        spaces.status_code = 200
+        spaces.json.return_value = {"results": [{"id": 42, "key": "DEV"}]}
+        mock_get.return_value = spaces
+        created = Mock()
+        created.status_code = 200
+        created.json.return_value = {"id": "456", "title": "New Page"}
+        mock_post.return_value = created
+
+        # Execute
+        result = confluence_mcp.create_page.fn("DEV", "New Page", "<p>Content</p>")
+
+        # Assert
+        assert result == {"id": "456", "title": "New Page"}
+        assert mock_post.call_args[0][0].endswith("/wiki/api/v2/pages")
+        assert mock_post.call_args[1]["json"]["spaceId"] == "42"
+
+    @patch('requests.Session.get')
+    def test_get_page_chunk_cached_by_version(self, mock_get, mock_env_vars):
+        """Test chunked reads convert once per version and serve later chunks from cache."""
+        confluence_mcp._CHUNK_CACHE.clear()
+        meta = Mock()
+        meta.status_code = 200
+        meta.json.return_value = {"id": "789", "title": "Runbook", "version": {"number": 3}}
+        page = Mock()
+        page.status_code = 200
+        page.json.return_value = {
+            "id": "789",
+            "title": "Runbook",
+            "version": {"number": 3},
+            "body": {"storage": {"value": "<h1>A</h1><p>alpha</p><h1>B</h1><p>beta</p>"}}
+        }
+        mock_get.side_effect = [meta, page, meta]
+
+        with patch.object(confluence_mcp, "CHUNK_CHARS", 10):
+            first = confluence_mcp.get_page_chunk.fn("789")
+            second = confluence_mcp.get_page_chunk.fn("789", chunk=1)
+
+        # Assert
+        assert first["chunks"] == 2
+        assert first["content"] == "# A\n\nalpha"
+        assert second["content"] == "# B\n\nbeta"
+        assert [entry["heading"] for entry in second["toc"]] == ["A", "B"]
+        assert mock_get.call_count == 3
+
+    def test_chunk_cache_survives_concurrent_reads_and_invalidation(self, mock_env_vars, monkeypatch):
+        """Test chunk reads racing webhook invalidation and eviction neither fail nor corrupt the cache."""
+        import threading
+        confluence_mcp._CHUNK_CACHE.clear()
+        monkeypatch.setattr(confluence_mcp, "CHUNK_CACHE_SIZE", 4)
+
+        def fetch(page_id, with_body=True, **kwargs):
+            page = {"id": page_id, "title": "T", "version": {"number": 1}}
+            if with_body:
+                page["body"] = {"storage": {"value": "<p>text</p>"}}
+            return page
+
+        monkeypatch.setattr(confluence_mcp, "_fetch_page", fetch)
+        errors = []
+
+        def worker(index):
+            try:
+                for round in range(200):
+                    page_id = str((index + round) % 8)
+                    if index % 2:
+                        confluence_mcp.invalidate_page(page_id)
+                    else:
+                        assert confluence_mcp.get_page_chunk.fn(page_id)["content"] == "text"
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert len(confluence_mcp._CHUNK_CACHE) <= 4
+
+    @patch('requests.Session.get')
+    def test_get_page_chunk_out_of_range(self, mock_get, mock_env_vars):
+        """Test requesting a chunk past the end returns an error string."""
+        confluence_mcp._CHUNK_CACHE.clear()
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "id": "789", "title": "Short", "version": {"number": 1},
+            "body": {"storage": {"value": "<p>only</p>"}}
+        }
+        mock_get.return_value = mock_response
+
+        result = confluence_mcp.get_page_chunk.fn("789", chunk=5)
+
+        assert "out of range" in result
+
+    @patch('requests.Session.post')
+    def test_create_pages_validates_before_sending(self, mock_post, mock_env_vars):
+        """Test invalid items are reported without a request and valid ones keep input order."""
+        confluence_mcp._API_VERSIONS["https://test.atlassian.net"] = "v1"
+
+        def created(url, json=None, **kwargs):
+            response = Mock()
+            response.status_code = 200
+            response.json.return_value = {"id": json["title"], "title": json["title"], "version": {"number": 1}}
+            return response
+        mock_post.side_effect = created
+
+        result = confluence_mcp.create_pages.fn([
+            {"space_key": "DEV", "title": "A", "content": "<p>a</p>"},
+            {"space_key": "DEV", "title": "B", "content": "<p>b<br></p>"},
+            {"space_key": "DEV", "title": "C", "content": "<p>c</p>", "parent_id": "9"},
+            {"space_key": "DEV", "content": "<p>d</p>"},
+        ])
+
+        assert [item["status"] for item in result["results"]] == ["created", "invalid", "created", "invalid"]
+        assert [item.get("id") for item in result["results"]] == ["A", None, "C", None]
+        assert "mismatched tag" in result["results"][1]["error"]
+        assert result["results"][3]["error"] == "missing title"
+        assert result["summary"] == {"total": 4, "created": 2, "invalid": 2}
+        assert mock_post.call_count == 2
+        parents = [call[1]["json"].get("ancestors") for call in mock_post.call_args_list]
+        assert [{"id": "9"}] in parents
+
+    @patch('requests.Session.put')
+    @patch('requests.Session.get')
+    def test_update_pages_bumps_version(self, mock_get, mock_put, mock_env_vars):
+        """Test updates write the next version over v2 and keep the current title."""
+        meta = Mock()
+        meta.status_code = 200
+        meta.json.return_value = {"id": "7", "title": "Runbook", "version": {"number": 3}}
+        mock_get.return_value = meta
+        updated = Mock()
+        updated.status_code = 200
+        updated.json.return_value = {"id": "7", "title": "Runbook", "version": {"number": 4}}
+        mock_put.return_value = updated
+
+        result = confluence_mcp.update_pages.fn([{"page_id": "7", "content": "<p>new</p>"}])
+
+        assert result["results"] == [{"index": 0, "status": "updated", "id": "7", "title": "Runbook", "version": 4}]
+        assert mock_put.call_args[0][0].endswith("/wiki/api/v2/pages/7")
+        assert mock_put.call_args[1]["json"]["version"] == {"number": 4}
+        assert mock_put.call_args[1]["json"]["title"] == "Runbook"
+
+    @patch('requests.Session.put')
+    @patch('requests.Session.get')
+    def test_update_pages_version_conflicts(self, mock_get, mock_put, mock_env_vars):
+        """Test a stale expected version is a conflict, and an unpinned 409 is retried once."""
+        confluence_mcp._API_VERSIONS["https://test.atlassian.net"] = "v2"
+        versions = iter([5, 5, 6])
+
+        def meta(url, **kwargs):
+            response = Mock()
+            response.status_code = 200
+            response.json.return_value = {"id": "7", "title": "T", "version": {"number": next(versions)}}
+            return response
+        mock_get.side_effect = meta
+        clash = Mock(status_code=409, text="version conflict")
+        ok = Mock(status_code=200)
+        ok.json.return_value = {"id": "7", "title": "T", "version": {"number": 7}}
+        mock_put.side_effect = [clash, ok]
+
+        stale = confluence_mcp.update_pages.fn([{"page_id": "7", "content": "<p>x</p>", "version": 4}])
+        assert stale["results"][0]["status"] == "conflict"
+        assert mock_put.call_count == 0
+
+        retried = confluence_mcp.update_pages.fn([{"page_id": "7", "content": "<p>x</p>"}])
+        assert retried["results"][0]["status"] == "updated"
+        assert [call[1]["json"]["version"]["number"] for call in mock_put.call_args_list] == [6, 7]
+
+    @patch('requests.Session.put')
+    @patch('requests.Session.get')
+    def test_update_pages_rejects_bad_versions(self, mock_get, mock_put, mock_env_vars):
+        """Test a malformed expected version fails only its own item, before anything is sent."""
+        confluence_mcp._API_VERSIONS["https://test.atlassian.net"] = "v2"
+        meta = Mock(status_code=200)
+        meta.json.return_value = {"id": "7", "title": "T", "version": {"number": 3}}
+        mock_get.return_value = meta
+        ok = Mock(status_code=200)
+        ok.json.return_value = {"id": "7", "title": "T", "version": {"number": 4}}
+        mock_put.return_value = ok
+
+        result = confluence_mcp.update_pages.fn([
+            {"page_id": "7", "content": "<p>x</p>", "version": "abc"},
+            {"page_id": "7", "content": "<p>x</p>", "version": True},
+            {"page_id": "7", "content": "<p>x</p>", "version": "3"},
+        ])
+
+        statuses = [item["status"] for item in result["results"]]
+        assert statuses == ["invalid", "invalid", "updated"]
+        assert result["results"][0]["error"] == "version must be a positive integer"
+        assert mock_put.call_count == 1
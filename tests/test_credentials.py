@@ -0,0 +1,163 @@
+import pytest
+from unittest.mock import Mock, patch
+import json
+import os
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import credentials
+
+SITES = {
+    "sites": {
+        "acme": {
+            "jira": {"base_url": "https://acme.atlassian.net/", "username": "bot@acme.com", "api_token": "acme-token"},
+            "cal": {"api_key": "cal_live_acme"},
+            "resend": {"api_key": "re_acme"},
+        },
+        "globex": {
+            "jira": {"base_url": "https://globex.atlassian.net", "username": "bot@globex.com", "api_token": "g-token"},
+        },
+    }
+}
+
+
+class TestCredentials:
+    """Test suite for the credential provider and named sites."""
+
+    @pytest.fixture
+    def credentials_file(self, tmp_path, monkeypatch):
+        path = tmp_path / "credentials.json"
+        path.write_text(json.dumps(SITES))
+        monkeypatch.setattr(credentials, "CREDENTIALS_FILE", str(path))
+        monkeypatch.setattr(credentials, "_provider", credentials.CredentialProvider(str(path)))
+        return path
+
+    def test_basic_auth_header_is_memoized(self):
+        """Test the header for a username/token pair is computed once and reused."""
+        credentials.basic_auth_header.cache_clear()
+        first = credentials.basic_auth_header("user", "pass")
+        second = credentials.basic_auth_header("user", "pass")
+        assert first == "Basic dXNlcjpwYXNz"
+        assert second is first
+        assert credentials.basic_auth_header.cache_info().hits == 1
+
+    def test_basic_auth_header_requires_both_parts(self):
+        """Test a missing username or token is rejected."""
+        with pytest.raises(ValueError, match="Username and token are required"):
+            credentials.basic_auth_header("user", "")
+
+    def test_provider_loads_sites(self, credentials_file):
+        """Test sites load with trimmed base URLs and ready-made headers per service."""
+        provider = credentials.provider()
+        assert provider.sites() == ["acme", "globex"]
+        jira = provider.get("acme", "jira")
+        assert jira.base_url == "https://acme.atlassian.net"
+        assert jira.auth_header == credentials.basic_auth_header("bot@acme.com", "acme-token")
+        assert provider.get("acme", "cal").auth_header == "cal_live_acme"
+        assert provider.get("acme", "resend").auth_header == "Bearer re_acme"
+
+    def test_provider_unknown_site_or_service(self, credentials_file):
+        """Test unknown sites and services raise ValueError."""
+        provider = credentials.provider()
+        with pytest.raises(ValueError, match="Unknown site"):
+            provider.get("initech", "jira")
+        with pytest.raises(ValueError, match="has no cal credentials"):
+            provider.get("globex", "cal")
+
+    def test_reload_if_changed(self, credentials_file):
+        """Test a rewritten file is picked up, and an unchanged one is not re-read."""
+        provider = credentials.provider()
+        assert provider.reload_if_changed() is False
+        rotated = json.loads(json.dumps(SITES))
+        rotated["sites"]["acme"]["jira"]["api_token"] = "rotated"
+        credentials_file.write_text(json.dumps(rotated))
+        os.utime(credentials_file, ns=(0, os.stat(credentials_file).st_mtime_ns + 1_000_000))
+
+        assert provider.reload_if_changed() is True
+        assert provider.get("acme", "jira").auth_header == credentials.basic_auth_header("bot@acme.com", "rotated")
+
+    def test_reload_keeps_old_credentials_on_bad_file(self, credentials_file):
+        """Test a half-written or invalid file leaves the previous credentials in place."""
+        provider = credentials.provider()
+        credentials_file.write_text("{not json")
+        assert provider.reload() is False
+        credentials_file.write_text(json.dumps({"sites": {"acme": {"jira": {"username": "x", "api_token": "y"}}}}))
+        assert provider.reload() is False
+        assert provider.sites() == ["acme", "globex"]
+
+    def test_provider_requires_file(self, monkeypatch):
+        """Test named sites are unavailable without CREDENTIALS_FILE."""
+        monkeypatch.setattr(credentials, "CREDENTIALS_FILE", None)
+        with pytest.raises(ValueError, match="CREDENTIALS_FILE"):
+            credentials.provider()
+
+    def test_for_service_outside_a_site(self):
+        """Test the env credentials apply when no site is active."""
+        assert credentials.current_site() is None
+        assert credentials.for_service("jira") is None
+
+    @patch.dict(os.environ, {
+        "JIRA_BASE_URL": "https://test.atlassian.net",
+        "JIRA_USERNAME": "test@example.com",
+        "JIRA_API_TOKEN": "test-token-123"
+    })
+    @patch('requests.Session.get')
+    def test_use_site_routes_jira_calls(self, mock_get, credentials_file):
+        """Test a tool call inside use_site goes to the site's base URL with its header."""
+        import importlib
+        import jira_mcp
+        importlib.reload(jira_mcp)
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"key": "TEST-1"}
+        mock_get.return_value = mock_response
+
+        with credentials.use_site("acme"):
+            jira_mcp.get_issue.fn("TEST-1")
+        jira_mcp.get_issue.fn("TEST-1")
+
+        site_call, env_call = mock_get.call_args_list
+        assert site_call[0][0] == "https://acme.atlassian.net/rest/api/3/issue/TEST-1"
+        assert site_call[1]["headers"]["Authorization"] == credentials.basic_auth_header("bot@acme.com", "acme-token")
+        assert env_call[0][0] == "https://test.atlassian.net/rest/api/3/issue/TEST-1"
+        assert env_call[1]["headers"]["Authorization"] == credentials.basic_auth_header("test@example.com",
+                                                                                         "test-token-123")
+
+    @patch('requests.Session.get')
+    def test_use_site_routes_cal_calls(self, mock_get, credentials_file):
+        """Test Cal.com calls inside use_site send the site's API key."""
+        import cal_mcp
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"data": []}
+        mock_get.return_value = mock_response
+
+        with credentials.use_site("acme"):
+            cal_mcp.get_event_types.fn()
+
+        assert mock_get.call_args[1]["headers"]["Authorization"] == "cal_live_acme"
+
+    def test_reload_all_rereads_env(self, monkeypatch):
+        """Test reload_all refreshes the connectors' env credentials."""
+        import jira_mcp
+        monkeypatch.setattr(jira_mcp, "JIRA_API_TOKEN", "old-token")
+        monkeypatch.setenv("JIRA_API_TOKEN", "new-token")
+        with patch('credentials.load_dotenv'):
+            credentials.reload_all()
+        assert jira_mcp.JIRA_API_TOKEN == "new-token"
+
+    def test_gateway_rejects_unknown_site(self, credentials_file):
+        """Test the JSON runner answers 400 for a site that isn't in the credentials file."""
+        import run_jira_json
+        from starlette.testclient import TestClient
+
+        response = TestClient(run_jira_json.app).post(
+            '/mcp-json',
+            json={"tool": "get_issue", "args": {"issue_key": "TEST-1"}},
+            headers={"X-MCP-Site": "initech"}
+        )
+
+        assert response.status_code == 400
+        assert response.json() == {"error": "Unknown site: initech"}
@@ -0,0 +1,89 @@
+import pytest
+from unittest.mock import Mock, patch
+import json
+import os
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import fastjson
+import upstream
+
+
+def _response(body: bytes, content_type="application/json"):
+    response = Mock()
+    response.status_code = 200
+    response.content = body
+    response.headers = {"Content-Type": content_type}
+    return response
+
+
+class TestFastJSON:
+    """Test suite for the JSON backends and raw passthrough."""
+
+    def test_select_backends(self):
+        """Test stdlib can be forced and unknown backends are rejected."""
+        name, loads, dumps = fastjson._select("stdlib")
+        assert name == "stdlib"
+        assert loads(dumps({"a": "é", "b": [1, None]})) == {"a": "é", "b": [1, None]}
+        with pytest.raises(ValueError, match="Unknown JSON_BACKEND"):
+            fastjson._select("simdjson")
+
+    def test_invalid_json_raises_value_error(self):
+        """Test every backend reports bad input as ValueError, which the tools catch."""
+        with pytest.raises(ValueError):
+            fastjson.loads(b"{not json")
+
+    def test_encode_result_splices_raw_body(self):
+        """Test a RawJSON result is written into the envelope byte for byte."""
+        body = b'{"key": "TEST-1",  "fields": {}}'
+        assert fastjson.encode_result(fastjson.RawJSON(body)) == b'{"result":' + body + b'}'
+        assert json.loads(fastjson.encode_result({"a": 1})) == {"result": {"a": 1}}
+
+    def test_encode_result_falls_back_to_str(self):
+        """Test values the backend can't encode are sent as strings."""
+        assert json.loads(fastjson.encode_result({1, 2})) == {"result": "{1, 2}"}
+
+    def test_decode_json_reads_content_bytes(self):
+        """Test decoding goes through the backend when the body is available as bytes."""
+        response = _response(b'{"issues": []}')
+        assert upstream.decode_json(response) == {"issues": []}
+        response.json.assert_not_called()
+
+    def test_json_result_passthrough(self):
+        """Test bodies stay undecoded only inside passthrough and only for JSON content types."""
+        response = _response(b'{"key": "TEST-1"}')
+        assert upstream.json_result(response) == {"key": "TEST-1"}
+        with upstream.passthrough():
+            raw = upstream.json_result(response)
+            assert isinstance(raw, fastjson.RawJSON) and raw.body == b'{"key": "TEST-1"}'
+            assert upstream.json_result(_response(b'{}', "text/html")) == {}
+        assert upstream.as_result(raw) == {"key": "TEST-1"}
+        with upstream.passthrough():
+            assert upstream.as_result(raw) is raw
+
+    @patch.dict(os.environ, {
+        "JIRA_BASE_URL": "https://test.atlassian.net",
+        "JIRA_USERNAME": "test@example.com",
+        "JIRA_API_TOKEN": "test-token-123"
+    })
+    @patch('requests.Session.get')
+    def test_gateway_passes_upstream_body_through(self, mock_get):
+        """Test the JSON runner forwards get_issue's upstream body without decoding it."""
+        import importlib
+        import jira_mcp
+        importlib.reload(jira_mcp)
+        import run_jira_json
+        from starlette.testclient import TestClient
+        body = b'{"key":"TEST-1","fields":{"summary":"Caf\xc3\xa9"}}'
+        mock_get.return_value = _response(body)
+        client = TestClient(run_jira_json.app)
+
+        response = client.post('/mcp-json', json={"tool": "get_issue", "args": {"issue_key": "TEST-1"}})
+        assert response.content == b'{"result":' + body + b'}'
+        mock_get.return_value.json.assert_not_called()
+
+        response = client.post('/mcp-json', json={"tool": "get_issue", "args": {"issue_key": "TEST-1"},
+                                                 "raw": False})
+        assert response.json() == {"result": {"key": "TEST-1", "fields": {"summary": "Café"}}}
@@ -0,0 +1,92 @@
+import pytest
+from unittest.mock import patch
+import os
+import socket
+import sys
+import time
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+import healthcheck
+from mock_upstreams import MockUpstreamServer, UpstreamBehavior
+
+
+class TestHealthcheck:
+    """Test suite for upstream health probes."""
+
+    @pytest.fixture
+    def server(self):
+        with MockUpstreamServer(UpstreamBehavior(latency_ms=0, jitter_ms=0)) as mock:
+            yield mock
+
+    def test_probe_times_each_phase(self, server):
+        """Test a plain HTTP probe reports DNS, connect and TTFB but no TLS time."""
+        result = healthcheck.probe(f"{server.url}/rest/api/3/myself", {"Authorization": "Basic x"})
+        assert result["status"] == "ok"
+        assert result["http_status"] == 200
+        assert result["dns_ms"] is not None and result["connect_ms"] is not None and result["ttfb_ms"] is not None
+        assert result["tls_ms"] is None
+        assert result["total_ms"] >= result["ttfb_ms"]
+
+    def test_probe_rate_limited_is_degraded(self, server):
+        """Test a 429 counts as reachable but degraded."""
+        server.behavior.rate_limit_rate = 1.0
+        assert healthcheck.probe(f"{server.url}/v2/me")["status"] == "degraded"
+
+    def test_probe_connection_refused(self):
+        """Test connection failures are reported rather than raised."""
+        with socket.socket() as probe_socket:
+            probe_socket.bind(("127.0.0.1", 0))
+            port = probe_socket.getsockname()[1]
+        result = healthcheck.probe(f"http://127.0.0.1:{port}/", timeout=1)
+        assert result["status"] == "error"
+        assert "ConnectionRefused" in result["error"]
+
+    def test_check_runs_concurrently_with_deadline(self):
+        """Test slow probes become timeouts at the deadline and unconfigured services are skipped."""
+        targets = {"jira": ("http://jira.test/", {}), "cal": ("http://cal.test/", {}), "resend": None}
+
+        def fake_probe(url, headers, timeout):
+            if "cal" in url:
+                time.sleep(1)
+            return {"status": "ok"}
+
+        with patch.object(healthcheck, 'probe_targets', return_value=targets), \
+                patch.object(healthcheck, 'probe', side_effect=fake_probe):
+            start = time.perf_counter()
+            result = healthcheck.check(("jira", "cal", "resend"), deadline=0.2)
+        assert time.perf_counter() - start < 0.9
+        assert result["services"]["jira"]["status"] == "ok"
+        assert result["services"]["cal"]["status"] == "timeout"
+        assert result["services"]["resend"]["status"] == "skipped"
+        assert result["status"] == "error"
+
+    def test_gateway_healthz(self):
+        """Test /healthz maps probe results to 200/503 and supports a shallow check."""
+        from starlette.testclient import TestClient
+        import run_jira_json
+        client = TestClient(run_jira_json.app)
+
+        assert client.get('/healthz?shallow=1').json() == {"status": "ok"}
+        with patch.object(healthcheck, 'cached_check', return_value={"status": "error", "services": {}}):
+            assert client.get('/healthz').status_code == 503
+        with patch.object(healthcheck, 'cached_check', return_value={"status": "degraded", "services": {}}):
+            assert client.get('/healthz').status_code == 200
+
+    def test_unknown_services_are_rejected_up_front(self, capsys):
+        """Test unknown names are a usage error for the CLI and a start-up error for the gateway."""
+        import verify_connectors
+        assert healthcheck.validate_services(["jira", "cal"]) == ["jira", "cal"]
+        with pytest.raises(SystemExit) as exit_info:
+            verify_connectors.main(["--health", "--services", "jira,foo"])
+        assert exit_info.value.code == 2
+        assert "Unknown service: foo" in capsys.readouterr().err
+
+        import importlib
+        import run_jira_json
+        with patch.object(healthcheck, 'HEALTHZ_SERVICES', ["jria"]):
+            with pytest.raises(ValueError, match="jria"):
+                importlib.reload(run_jira_json)
+        importlib.reload(run_jira_json)
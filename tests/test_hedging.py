@@ -0,0 +1,126 @@
+import pytest
+from unittest.mock import Mock, patch
+import os
+import sys
+import time
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+
+import credentials
+import hedging
+import metrics
+import tenants
+
+
+class TestHedging:
+    """Test suite for hedged upstream reads."""
+
+    @pytest.fixture(autouse=True)
+    def enabled(self, monkeypatch):
+        monkeypatch.setattr(hedging, "HEDGE_REQUESTS", True)
+        monkeypatch.setattr(hedging, "HEDGE_MIN_SAMPLES", 0)
+        monkeypatch.setattr(hedging, "HEDGE_MIN_DELAY", 0.05)
+        hedging.reset()
+        yield
+        hedging.reset()
+
+    def _prime(self, tool, budget=True):
+        """Give a tool a latency sample, so hedging starts, and optionally a full hedge budget."""
+        metrics.HEDGED_LATENCY.observe(0.01, tool=tool)
+        if budget:
+            hedging._budget(tool)._tokens = hedging.HEDGE_BUDGET_BURST
+
+    def test_budget(self):
+        """Test a hedge becomes available once enough reads have earned it."""
+        budget = hedging.HedgeBudget(0.25, 2)
+        for _ in range(3):
+            budget.earn()
+        assert not budget.try_spend()
+        budget.earn()
+        assert budget.try_spend()
+        assert not budget.try_spend()
+
+    def test_delay_follows_recent_quantile(self, monkeypatch):
+        """Test the hedge delay is the recent p95, clamped, and absent before enough samples."""
+        monkeypatch.setattr(hedging, "HEDGE_MIN_SAMPLES", 5)
+        assert hedging.delay("delay_tool") is None
+        for value in [0.1] * 19 + [3.0]:
+            metrics.HEDGED_LATENCY.observe(value, tool="delay_tool")
+        assert hedging.delay("delay_tool") == 3.0
+        monkeypatch.setattr(hedging, "HEDGE_MAX_DELAY", 1.0)
+        assert hedging.delay("delay_tool") == 1.0
+
+    @patch('requests.Session.get')
+    def test_slow_primary_is_hedged(self, mock_get):
+        """Test a read slower than the delay is duplicated and the faster response wins."""
+        self._prime("hedge_slow")
+        slow, fast = Mock(status_code=200, headers={}), Mock(status_code=200, headers={})
+        calls = []
+
+        def get(url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                return slow
+            return fast
+        mock_get.side_effect = get
+
+        start = time.perf_counter()
+        assert hedging.request("hedge_slow", "jira", "https://test.atlassian.net/rest/api/3/issue/T-1") is fast
+        assert time.perf_counter() - start < 0.4
+        assert len(calls) == 2
+        assert metrics.HEDGES.value(tool="hedge_slow", outcome="won") == 1
+
+    @patch('requests.Session.get')
+    def test_fast_read_and_empty_budget_send_once(self, mock_get):
+        """Test fast reads aren't duplicated, and slow ones aren't either once the budget is spent."""
+        self._prime("hedge_fast", budget=False)
+        mock_get.return_value = Mock(status_code=200, headers={})
+        hedging.request("hedge_fast", "jira", "https://test.atlassian.net/rest/api/3/issue/T-1")
+        assert mock_get.call_count == 1
+
+        mock_get.side_effect = lambda url, **kwargs: (time.sleep(0.15), mock_get.return_value)[1]
+        hedging.request("hedge_fast", "jira", "https://test.atlassian.net/rest/api/3/issue/T-1")
+        assert mock_get.call_count == 2
+        assert metrics.HEDGES.value(tool="hedge_fast", outcome="over_budget") == 1
+
+    @patch('requests.Session.get')
+    def test_failed_attempt_falls_back_to_the_other(self, mock_get):
+        """Test an attempt that raises doesn't win while the other may still succeed."""
+        self._prime("hedge_error")
+        ok = Mock(status_code=200, headers={})
+        calls = []
+
+        def get(url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                time.sleep(0.15)
+                raise requests.ConnectionError("reset")
+            time.sleep(0.3)
+            return ok
+        mock_get.side_effect = get
+
+        assert hedging.request("hedge_error", "jira", "https://test.atlassian.net/rest/api/3/issue/T-1") is ok
+
+    @patch('requests.Session.get')
+    def test_attempts_keep_the_callers_site(self, mock_get):
+        """Test hedged attempts run with the caller's active site."""
+        sites = []
+        mock_get.side_effect = lambda url, **kwargs: (sites.append(credentials.current_site()),
+                                                      Mock(status_code=200, headers={}))[1]
+        self._prime("hedge_site")
+        with patch.object(tenants, "get", return_value=tenants.Tenant(tenants.DEFAULT_TENANT)):
+            with credentials.use_site("acme"):
+                hedging.request("hedge_site", "jira", "https://test.atlassian.net/rest/api/3/issue/T-1")
+        assert sites == ["acme"]
+
+    @patch('requests.Session.get')
+    def test_disabled_sends_directly(self, mock_get, monkeypatch):
+        """Test reads go straight to upstream.request when hedging is off."""
+        monkeypatch.setattr(hedging, "HEDGE_REQUESTS", False)
+        mock_get.return_value = Mock(status_code=200, headers={})
+        hedging.request("hedge_off", "jira", "https://test.atlassian.net/rest/api/3/issue/T-1")
+        assert hedging._pool is None
@@ -41,7 +41,7 @@ class TestJiraMCP:
         "JIRA_USERNAME": "test@example.com",
         "JIRA_API_TOKEN": "test-token-123"
     })
-    @patch('jira_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_search_issues_success(self, mock_get):
         """Test successful JIRA issue search."""
         # Reload module to pick up environment variables
@@ -70,7 +70,7 @@ class TestJiraMCP:
         "JIRA_USERNAME": "test@example.com",
         "JIRA_API_TOKEN": "test-token-123"
     })
-    @patch('jira_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_search_issues_error(self, mock_get):
         """Test JIRA issue search with error."""
         # Reload module to pick up environment variables
@@ -95,7 +95,7 @@ class TestJiraMCP:
         "JIRA_USERNAME": "test@example.com",
         "JIRA_API_TOKEN": "test-token-123"
     })
-    @patch('jira_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_create_issue_success(self, mock_post):
         """Test successful JIRA issue creation."""
         # Reload module to pick up environment variables
@@ -123,7 +123,7 @@ class TestJiraMCP:
         "JIRA_USERNAME": "test@example.com",
         "JIRA_API_TOKEN": "test-token-123"
     })
-    @patch('jira_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_create_issue_error(self, mock_post):
         """Test JIRA issue creation with error."""
         # Reload module to pick up environment variables
@@ -148,7 +148,7 @@ class TestJiraMCP:
         "JIRA_USERNAME": "test@example.com",
         "JIRA_API_TOKEN": "test-token-123"
     })
-    @patch('jira_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_get_issue_success(self, mock_get):
         """Test successful get JIRA issue."""
         # Reload module to pick up environment variables
@@ -180,7 +180,7 @@ class TestJiraMCP:
         "JIRA_USERNAME": "test@example.com",
         "JIRA_API_TOKEN": "test-token-123"
     })
-    @patch('jira_mcp.requests.get')
+    @patch('requests.Session.get')
     def test_get_issue_not_found(self, mock_get):
         """Test get JIRA issue with not found error."""
         # Reload module to pick up environment variables
@@ -199,3 +199,121 @@ class TestJiraMCP:
         # Assert
         assert "Error: 404" in result
         assert "Issue not found" in result
+
+
+def _fake_jira(history, comments):
+    """A requests.get stand-in serving paged changelog and comment endpoints."""
+    def get(url, params=None, **kwargs):
+        params = params or {}
+        start, size = params.get("startAt", 0), params.get("maxResults", 50)
+        response = Mock()
+        response.status_code = 200
+        if url.endswith("/changelog"):
+            values = history[start:start + size]
+            response.json.return_value = {"startAt": start, "maxResults": size, "total": len(history),
+                                          "isLast": start + size >= len(history), "values": values}
+        else:
+            ordered = sorted(comments, key=lambda c: c["created"], reverse=True)
+            response.json.return_value = {"startAt": start, "maxResults": size, "total": len(comments),
+                                          "comments": ordered[start:start + size]}
+        return response
+    return get
+
+
+def _history(index: int, day: int) -> dict:
+    return {"id": str(index), "created": f"2024-05-{day:02d}T10:00:00.000+0000",
+            "author": {"displayName": "Ada"},
+            "items": [{"field": "status", "fromString": "Open", "toString": f"Step {index}"}]}
+
+
+class TestIssueChanges:
+    """Test suite for the incremental get_issue_changes tool."""
+
+    @pytest.fixture
+    def jira(self, monkeypatch):
+        monkeypatch.setenv("JIRA_BASE_URL", "https://test.atlassian.net")
+        monkeypatch.setenv("JIRA_USERNAME", "test@example.com")
+        monkeypatch.setenv("JIRA_API_TOKEN", "test-token-123")
+        import importlib
+        importlib.reload(jira_mcp)
+        monkeypatch.setattr(jira_mcp, "CHANGES_PAGE_SIZE", 2)
+        history = [_history(i, i + 1) for i in range(5)]
+        comments = [{"id": "c1", "created": "2024-05-02T12:00:00.000+0000",
+                     "updated": "2024-05-02T12:00:00.000+0000", "author": {"displayName": "Bo"}, "body": "hi"}]
+        with patch('requests.Session.get', side_effect=_fake_jira(history, comments)) as mock_get:
+            yield history, comments, mock_get
+
+    def test_changes_since_timestamp(self, jira):
+        """Test only changelog entries and comments after the timestamp are returned."""
+        result = jira_mcp.get_issue_changes.fn("test-1", since="2024-05-03T00:00:00+00:00")
+        assert result["issue"] == "TEST-1"
+        assert [entry["id"] for entry in result["changelog"]] == ["2", "3", "4"]
+        assert result["changelog"][0]["items"] == [{"field": "status", "from": "Open", "to": "Step 2"}]
+        assert result["comments"] == []
+        assert result["truncated"] is False
+
+    def test_stored_cursor_returns_only_new_changes(self, jira):
+        """Test a repeated call picks up from the stored cursor and reads only new entries."""
+        history, comments, mock_get = jira
+        jira_mcp.get_issue_changes.fn("TEST-1")
+        assert jira_mcp.get_issue_changes.fn("TEST-1")["changelog"] == []
+
+        history.append(_history(5, 20))
+        comments.append({"id": "c2", "created": "2024-05-21T09:00:00.000+0000",
+                         "updated": "2024-05-21T09:00:00.000+0000", "author": {}, "body": "new"})
+        mock_get.reset_mock()
+        result = jira_mcp.get_issue_changes.fn("TEST-1")
+
+        assert [entry["id"] for entry in result["changelog"]] == ["5"]
+        assert [comment["id"] for comment in result["comments"]] == ["c2"]
+        changelog_calls = [c for c in mock_get.call_args_list if c[0][0].endswith("/changelog")]
+        assert changelog_calls[0][1]["params"]["startAt"] == 5
+
+    def test_explicit_cursor_and_truncation(self, jira):
+        """Test max_results cuts a cursor batch and the returned cursor resumes after it."""
+        first = jira_mcp.get_issue_changes.fn("TEST-1", since=jira_mcp.encode_cursor(None, 0), max_results=3)
+        assert [entry["id"] for entry in first["changelog"]] == ["0", "1", "2"]
+        assert first["truncated"] is True
+        rest = jira_mcp.get_issue_changes.fn("TEST-1", since=first["cursor"], max_results=3)
+        assert [entry["id"] for entry in rest["changelog"]] == ["3", "4"]
+
+    def test_cut_comments_come_in_the_next_call(self, jira):
+        """Test comments cut by max_results, and older than a returned changelog entry, aren't lost."""
+        _, comments, _ = jira
+        comments[:] = [{"id": f"c{day}", "created": f"2024-05-{day:02d}T09:00:00.000+0000",
+                        "updated": f"2024-05-{day:02d}T09:00:00.000+0000", "author": {}, "body": ""}
+                       for day in range(4, 9)]
+        first = jira_mcp.get_issue_changes.fn("TEST-1", since="2024-05-03T00:00:00+00:00", max_results=2)
+        assert [comment["id"] for comment in first["comments"]] == ["c5", "c4"]
+        assert first["changelog"][-1]["created"] > first["comments"][0]["created"]
+        assert first["truncated"] is True
+
+        second = jira_mcp.get_issue_changes.fn("TEST-1", since=first["cursor"], max_results=2)
+        assert [comment["id"] for comment in second["comments"]] == ["c7", "c6"]
+        third = jira_mcp.get_issue_changes.fn("TEST-1", max_results=2)
+        assert [comment["id"] for comment in third["comments"]] == ["c8"]
+        assert third["truncated"] is False
+
+    def test_jira_timestamp_formats(self, jira):
+        """Test Jira's +0000 and Z timestamps parse, and an entry with a bad one is kept, not fatal."""
+        assert jira_mcp._parse_time("2024-05-01T10:00:00.000+0000") == \
+            jira_mcp._parse_time("2024-05-01T10:00:00Z") == jira_mcp._parse_time("2024-05-01T10:00:00+00:00")
+        history, comments, _ = jira
+        history[4]["created"] = "yesterday"
+        comments[0]["updated"] = "2024-05-06T08:00:00.000Z"
+        result = jira_mcp.get_issue_changes.fn("TEST-1", since="2024-05-03T00:00:00.000+0000")
+        assert [entry["id"] for entry in result["changelog"]] == ["2", "3", "4"]
+        assert [comment["id"] for comment in result["comments"]] == ["c1"]
+        assert jira_mcp.decode_cursor(result["cursor"])[0] == "2024-05-06T08:00:00+00:00"
+
+    def test_invalid_since(self, jira):
+        """Test a timestamp without an offset or a garbage cursor is rejected."""
+        with pytest.raises(ValueError, match="since must be"):
+            jira_mcp.get_issue_changes.fn("TEST-1", since="2024-05-03")
+
+    def test_upstream_error_is_returned(self, jira):
+        """Test an upstream failure comes back as the usual error string."""
+        _, _, mock_get = jira
+        mock_get.side_effect = None
+        mock_get.return_value = Mock(status_code=404, text="Issue does not exist")
+        assert jira_mcp.get_issue_changes.fn("TEST-9") == "Error: 404 - Issue does not exist"
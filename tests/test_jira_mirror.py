@@ -0,0 +1,138 @@
+import pytest
+import os
+import sys
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import jira_mcp
+from jira_mirror import JiraMirror, MirrorSyncer, UnsupportedQuery, parse_jql
+
+
+def make_issue(key, status="Open", assignee=None, updated="2025-01-01T10:00:00.000+0000", summary="Issue"):
+    return {
+        "key": key,
+        "fields": {
+            "summary": summary,
+            "status": {"name": status},
+            "assignee": {"accountId": assignee, "displayName": assignee.title()} if assignee else None,
+            "updated": updated,
+            "created": updated,
+            "description": {"type": "doc", "content": [{"type": "paragraph", "content": [
+                {"type": "text", "text": f"details for {summary}"}
+            ]}]}
+        }
+    }
+
+
+class TestJiraMirror:
+    """Test suite for the local Jira issue mirror."""
+
+    @pytest.fixture
+    def mirror(self):
+        store = JiraMirror(":memory:")
+        store.sync_project("TEST", lambda jql, fields: iter([
+            make_issue("TEST-1", status="Open", assignee="alice", updated="2025-01-01T10:00:00.000+0000",
+                       summary="Login page broken"),
+            make_issue("TEST-2", status="In Progress", assignee="bob", updated="2025-01-03T10:00:00.000+0000",
+                       summary="Slow search"),
+            make_issue("TEST-10", status="Done", updated="2025-01-02T10:00:00.000+0000", summary="Login audit"),
+        ]))
+        yield store
+        store.close()
+
+    def keys(self, mirror, jql):
+        clauses, order_by = parse_jql(jql)
+        return [issue["key"] for issue in mirror.query(clauses, order_by)["issues"]]
+
+    def test_query_supported_subset(self, mirror):
+        """Test project, status, assignee, updated and text clauses run locally."""
+        assert self.keys(mirror, 'project = TEST AND status = "in progress"') == ["TEST-2"]
+        assert self.keys(mirror, "project = TEST AND assignee = Alice") == ["TEST-1"]
+        assert self.keys(mirror, "project = TEST AND assignee is EMPTY") == ["TEST-10"]
+        assert self.keys(mirror, 'project = TEST AND updated >= "2025-01-02" ORDER BY key ASC') == ["TEST-2", "TEST-10"]
+        assert self.keys(mirror, 'project = TEST AND text ~ "login" ORDER BY updated DESC') == ["TEST-10", "TEST-1"]
+        assert self.keys(mirror, "project = TEST AND status not in (Done, Open)") == ["TEST-2"]
+
+    def test_unsupported_jql_is_rejected(self):
+        """Test OR, functions and unknown fields are left for upstream."""
+        for jql in ("project = TEST OR project = X", "assignee = currentUser()", "labels = foo"):
+            with pytest.raises(UnsupportedQuery):
+                parse_jql(jql)
+
+    def test_unknown_operators_are_rejected(self):
+        """Test characters the tokenizer doesn't know, such as the ! of !~, reject the query instead of vanishing."""
+        for jql in ('text !~ "foo" AND project = TEST', "project = TEST AND status ! Done",
+                    'project = TEST AND text ~ "unterminated', "project = TEST; status = Done"):
+            with pytest.raises(UnsupportedQuery):
+                parse_jql(jql)
+
+    def test_incremental_sync_uses_watermark(self, mirror):
+        """Test later syncs ask only for issues updated since the watermark."""
+        seen = []
+        mirror.sync_project("TEST", lambda jql, fields: seen.append(jql) or iter([]))
+
+        # Without the account's timezone the query starts early enough for any UTC offset
+        assert seen == ['project = "TEST" AND updated >= "2025-01-02 19:59" ORDER BY updated ASC']
+        assert mirror.watermark("TEST") == "2025-01-03T10:00:00"
+
+    def test_dates_use_account_timezone(self, mirror):
+        """Test the watermark and JQL dates are read in the account's timezone, as Jira does."""
+        mirror.timezone = ZoneInfo("America/Los_Angeles")
+        seen = []
+        mirror.sync_project("TEST", lambda jql, fields: seen.append(jql) or iter([]))
+        assert seen == ['project = "TEST" AND updated >= "2025-01-03 01:59" ORDER BY updated ASC']
+        # 2025-01-02 18:00 in Los Angeles is 2025-01-03 02:00 UTC: after TEST-10, before TEST-2
+        assert self.keys(mirror, 'project = TEST AND updated >= "2025-01-02 18:00"') == ["TEST-2"]
+
+    def test_reconcile_drops_deleted_and_moved_issues(self, mirror):
+        """Test reconciliation removes issues no longer listed in the project."""
+        assert mirror.reconcile_project("TEST", lambda jql, fields: iter([{"key": "TEST-1"}, {"key": "TEST-10"}])) == 1
+        assert mirror.get_issue("TEST-2") is None
+        assert self.keys(mirror, 'project = TEST AND text ~ "search"') == []
+        assert mirror.get_issue("TEST-1") is not None
+
+    def test_syncer_reconciles_and_learns_timezone(self, mirror):
+        """Test the syncer looks up the timezone and reconciles on its first pass only."""
+        calls = []
+
+        def search(jql, fields):
+            calls.append(fields)
+            return iter([{"key": "TEST-1"}] if fields == ["id"] else [])
+
+        syncer = MirrorSyncer(mirror, ["TEST"], search, reconcile_interval=3600,
+                              account_timezone=lambda: ZoneInfo("Europe/Berlin"))
+        syncer.sync_once()
+        syncer.sync_once()
+        assert mirror.timezone == ZoneInfo("Europe/Berlin")
+        assert calls.count(["id"]) == 1
+        assert mirror.get_issue("TEST-10") is None
+
+    @patch.dict(os.environ, {
+        "JIRA_BASE_URL": "https://test.atlassian.net",
+        "JIRA_USERNAME": "test@example.com",
+        "JIRA_API_TOKEN": "test-token-123"
+    })
+    def test_tools_use_fresh_mirror(self, mirror, monkeypatch):
+        """Test search_issues and get_issue answer from a fresh mirror and go upstream otherwise."""
+        import importlib
+        importlib.reload(jira_mcp)
+        monkeypatch.setattr(jira_mcp, "JIRA_MIRROR_PROJECTS", ["TEST"])
+        monkeypatch.setattr(jira_mcp, "_mirror", mirror)
+
+        with patch('requests.Session.post') as mock_post, patch('requests.Session.get') as mock_get:
+            result = jira_mcp.search_issues.fn("project = TEST AND status = Done")
+            issue = jira_mcp.get_issue.fn("TEST-2")
+            mock_post.assert_not_called()
+            mock_get.assert_not_called()
+
+        assert result["source"] == "local-mirror"
+        assert [i["key"] for i in result["issues"]] == ["TEST-10"]
+        assert issue["key"] == "TEST-2"
+
+        assert jira_mcp._search_mirror('text !~ "login" AND project = TEST') is None
+
+        monkeypatch.setattr(jira_mcp, "JIRA_MIRROR_MAX_STALENESS", -1)
+        assert jira_mcp._search_mirror("project = TEST") is None
@@ -0,0 +1,77 @@
+import pytest
+import json
+import os
+import socket
+import subprocess
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import launcher
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class TestLauncher:
+    """Test suite for the warm fork-server launcher."""
+
+    def test_socket_path_tracks_configuration(self, tmp_path):
+        """Test connector configuration, but not unrelated variables, selects a different fork server."""
+        base = {"JIRA_BASE_URL": "https://a.atlassian.net", "HOME": "/home/a"}
+        path = launcher.socket_path(("jira",), base, str(tmp_path))
+        assert launcher.socket_path(("jira",), dict(base, HOME="/home/b"), str(tmp_path)) == path
+        assert launcher.socket_path(("jira",), dict(base, JIRA_BASE_URL="https://b.atlassian.net"),
+                                    str(tmp_path)) != path
+        assert launcher.socket_path(("jira", "cal"), base, str(tmp_path)) != path
+        for name in ("MAX_RESULT_BYTES", "JSON_BACKEND", "COMPRESS_MIN_BYTES", "SCHEDULER_WORKERS", "ADMIN_TOKEN"):
+            assert launcher.socket_path(("jira",), dict(base, **{name: "1"}), str(tmp_path)) != path
+
+    def test_socket_path_tracks_dotenv(self, tmp_path):
+        """Test editing the .env the connectors load at import selects a different fork server."""
+        path = launcher.socket_path(("jira",), {}, str(tmp_path))
+        (tmp_path / ".env").write_text("JIRA_BASE_URL=https://a.atlassian.net\n")
+        edited = launcher.socket_path(("jira",), {}, str(tmp_path))
+        assert edited != path
+        assert launcher.socket_path(("jira",), {}, str(tmp_path)) == edited
+        (tmp_path / ".env").write_text("JIRA_BASE_URL=https://b.atlassian.net\n")
+        assert launcher.socket_path(("jira",), {}, str(tmp_path)) != edited
+
+    @pytest.mark.skipif(not hasattr(socket, "SO_PEERCRED"), reason="needs SO_PEERCRED")
+    def test_sockets_of_other_users_are_refused(self, tmp_path, monkeypatch):
+        """Test the launcher won't send its environment to a socket another user listens on."""
+        left, right = socket.socketpair(socket.AF_UNIX)
+        with left, right:
+            assert launcher._peer_uid(left) == os.getuid()
+            assert launcher._same_user(left)
+        path = str(tmp_path / "squatted.sock")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+        listener.listen(1)
+        with listener:
+            monkeypatch.setattr(launcher, "_peer_uid", lambda sock: os.getuid() + 1)
+            with pytest.raises(PermissionError):
+                launcher._connect(path)
+
+    @pytest.mark.skipif(not hasattr(socket, "send_fds"), reason="needs socket.send_fds")
+    def test_session_runs_in_forked_child(self, tmp_path):
+        """Test a launched session answers initialize over the launcher's own stdio and reports its exit code."""
+        env = dict(os.environ, XDG_RUNTIME_DIR=str(tmp_path), RESEND_API_KEY="re_test")
+        command = [sys.executable, "launcher.py", "resend"]
+        initialize = {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "test", "version": "1"}}}
+        try:
+            for _ in range(2):
+                process = subprocess.Popen(command, cwd=ROOT, env=env, stdin=subprocess.PIPE,
+                                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                process.stdin.write((json.dumps(initialize) + "\n").encode())
+                process.stdin.flush()
+                response = json.loads(process.stdout.readline())
+                process.stdin.close()
+                assert response["result"]["serverInfo"]["name"] == "Resend MCP Server"
+                assert process.wait(timeout=30) == 0
+            sockets = list(tmp_path.glob("mcp-launcher-*.sock"))
+            assert len(sockets) == 1
+            assert sockets[0].stat().st_mode & 0o777 == 0o600
+        finally:
+            subprocess.run([sys.executable, "launcher.py", "--stop"], cwd=ROOT, env=env, timeout=30)
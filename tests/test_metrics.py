@@ -0,0 +1,99 @@
+import pytest
+from unittest.mock import Mock, patch
+import os
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metrics
+import upstream
+
+
+class TestMetrics:
+    """Test suite for metrics collection and exposition."""
+
+    def test_counter_render(self):
+        """Test counters render with escaped labels."""
+        counter = metrics.Counter("test_total", "A test counter", ("name",))
+        counter.inc(name='a"b')
+        counter.inc(2, name='a"b')
+        assert counter.render() == [
+            "# HELP test_total A test counter",
+            "# TYPE test_total counter",
+            'test_total{name="a\\"b"} 3',
+        ]
+
+    def test_histogram_buckets_and_quantiles(self):
+        """Test histogram buckets are cumulative and quantiles come from recent observations."""
+        histogram = metrics.Histogram("test_seconds", "A test histogram", ("tool",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 2.0):
+            histogram.observe(value, tool="t")
+        lines = histogram.render()
+        assert 'test_seconds_bucket{tool="t",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{tool="t",le="1"} 3' in lines
+        assert 'test_seconds_bucket{tool="t",le="+Inf"} 4' in lines
+        assert 'test_seconds_count{tool="t"} 4' in lines
+        assert histogram.quantile(0.5, tool="t") == 0.5
+        assert histogram.quantile(0.99, tool="t") == 2.0
+        assert 'test_seconds_recent{tool="t",quantile="0.95"} 2' in lines
+
+    def test_instrument_tool_outcomes(self):
+        """Test tool wrappers classify error strings and exceptions."""
+        @metrics.instrument_tool("testconn")
+        def flaky(value):
+            if value == "raise":
+                raise ValueError("boom")
+            return value
+
+        flaky({"ok": True})
+        flaky("Error: 500 - oops")
+        with pytest.raises(ValueError):
+            flaky("raise")
+
+        assert metrics.TOOL_CALLS.value(connector="testconn", tool="flaky", outcome="ok") == 1
+        assert metrics.TOOL_CALLS.value(connector="testconn", tool="flaky", outcome="error") == 1
+        assert metrics.TOOL_CALLS.value(connector="testconn", tool="flaky", outcome="exception") == 1
+        assert metrics.TOOL_IN_FLIGHT.value(connector="testconn", tool="flaky") == 0
+        assert metrics.TOOL_LATENCY.count(connector="testconn", tool="flaky") == 3
+
+    @patch('requests.Session.get')
+    def test_upstream_request_records_status(self, mock_get):
+        """Test upstream requests are counted by status code."""
+        mock_response = Mock()
+        mock_response.status_code = 429
+        mock_get.return_value = mock_response
+        before = metrics.UPSTREAM_REQUESTS.value(service="testsvc", method="GET", status="429")
+
+        response = upstream.request("testsvc", "GET", "https://example.invalid", timeout=1)
+
+        assert response is mock_response
+        assert metrics.UPSTREAM_REQUESTS.value(service="testsvc", method="GET", status="429") == before + 1
+
+    def test_metrics_endpoint(self):
+        """Test the JSON runner serves the Prometheus exposition."""
+        from starlette.testclient import TestClient
+        import run_jira_json
+
+        response = TestClient(run_jira_json.app).get('/metrics')
+
+        assert response.status_code == 200
+        assert "# TYPE mcp_tool_calls_total counter" in response.text
+        assert "mcp_cache_hits_total" in response.text
+
+    def test_stdio_listener_ignores_query_strings(self):
+        """Test the stdio servers' listener serves /metrics with a query string and 404s other paths."""
+        import urllib.error
+        import urllib.request
+        server = metrics.start_http_server(0)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urllib.request.urlopen(f"{base}/metrics?x=1") as response:
+                assert response.status == 200
+                assert b"# TYPE mcp_tool_calls_total counter" in response.read()
+            with pytest.raises(urllib.error.HTTPError) as missing:
+                urllib.request.urlopen(f"{base}/metricsx")
+            assert missing.value.code == 404
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,138 @@
+import pytest
+import os
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.testclient import TestClient
+
+import metrics
+import profiling
+
+
+@metrics.instrument_tool("test")
+def _big_tool(size=200_000):
+    kept = [bytearray(1000) for _ in range(size // 1000)]
+    return {"items": len(kept), "text": "y" * 5000}
+
+
+class TestProfiling:
+    """Test suite for per-tool memory profiling."""
+
+    @pytest.fixture(autouse=True)
+    def profiling_off(self):
+        profiling.stop()
+        profiling.reset()
+        yield
+        profiling.stop()
+        profiling.reset()
+
+    def test_off_by_default(self):
+        """Test tool calls aren't measured while profiling is off."""
+        assert profiling.begin() is None
+        _big_tool()
+        assert profiling.report()["tools"] == []
+        assert "top" not in profiling.report()
+
+    def test_attributes_peak_and_result_size_to_the_tool(self):
+        """Test a profiled call records its peak memory and result size per tool."""
+        assert profiling.start()
+        assert not profiling.start()
+        _big_tool()
+        _big_tool(size=10_000)
+        report = profiling.report(limit=5)
+        tool = report["tools"][0]
+        assert (tool["connector"], tool["tool"], tool["calls"]) == ("test", "_big_tool", 2)
+        assert tool["peak_bytes_max"] >= 200_000
+        assert tool["overlapped_calls"] == 0
+        assert tool["result_bytes_max"] == len('{"items":200,"text":""}') + 5000
+        assert metrics.TOOL_MEMORY_PEAK.count(connector="test", tool="_big_tool") >= 2
+        assert report["enabled"] and report["traced_bytes"] > 0
+        assert 0 < len(report["top"]) <= 5
+        assert all("file" in site and "size_bytes" in site for site in report["top"])
+
+    def test_overlapping_calls_are_flagged(self):
+        """Test calls that ran at the same time as another are counted as overlapped."""
+        profiling.start()
+        first = profiling.begin()
+        second = profiling.begin()
+        profiling.finish(second, "test", "inner", "ok")
+        profiling.finish(first, "test", "outer", None)
+        tools = {tool["tool"]: tool for tool in profiling.report()["tools"]}
+        assert tools["inner"]["overlapped_calls"] == 1
+        assert tools["outer"]["overlapped_calls"] == 1
+        assert tools["outer"]["result_bytes_max"] == 0
+
+    def test_growth_since_reset(self):
+        """Test the report lists allocation sites that grew since profiling started or was reset."""
+        profiling.start()
+        retained = [bytearray(50_000) for _ in range(20)]
+        growth = profiling.report(group_by="filename")["growth"]
+        assert any(site["file"] == __file__ and site["size_diff_bytes"] >= 1_000_000 for site in growth)
+        profiling.reset()
+        growth = profiling.report(group_by="filename")["growth"]
+        assert not any(site["file"] == __file__ and site["size_diff_bytes"] >= 1_000_000 for site in growth)
+        del retained
+
+    def test_stop_discards_calls_in_progress(self):
+        """Test a call that was running when profiling stopped isn't recorded."""
+        profiling.start()
+        call = profiling.begin()
+        profiling.stop()
+        assert profiling.finish(call, "test", "t", "ok") is None
+        with pytest.raises(ValueError):
+            profiling.report(group_by="function")
+        with pytest.raises(ValueError):
+            profiling.control("pause")
+
+    def test_admin_endpoint(self, monkeypatch):
+        """Test the JSON runner's /debug/memory needs the admin token and controls profiling."""
+        import run_jira_json
+        client = TestClient(run_jira_json.app)
+        monkeypatch.setattr(profiling, "ADMIN_TOKEN", "")
+        assert client.get('/debug/memory').status_code == 403
+
+        monkeypatch.setattr(profiling, "ADMIN_TOKEN", "secret")
+        assert client.get('/debug/memory', headers={"Authorization": "Bearer wrong"}).status_code == 401
+        auth = {"Authorization": "Bearer secret"}
+        response = client.post('/debug/memory', json={"action": "start", "frames": 2}, headers=auth)
+        assert response.json() == {"enabled": True, "changed": True}
+
+        _big_tool()
+        report = client.get('/debug/memory?limit=3&group_by=traceback', headers=auth).json()
+        assert report["frames"] == 2
+        assert report["tools"][0]["tool"] == "_big_tool"
+        assert len(report["top"]) <= 3
+        assert client.get('/debug/memory?group_by=nope', headers=auth).status_code == 400
+
+        response = client.post('/debug/memory', json={"action": "stop"}, headers=auth)
+        assert response.json() == {"enabled": False, "changed": True}
+
+    def test_metrics_listener_checks_admin_token(self, monkeypatch):
+        """Test the stdio servers' /debug/memory applies the same token and local-only checks."""
+        import urllib.error
+        import urllib.request
+        server = metrics.start_http_server(0)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            monkeypatch.setattr(profiling, "ADMIN_TOKEN", "secret")
+            with pytest.raises(urllib.error.HTTPError) as denied:
+                urllib.request.urlopen(urllib.request.Request(f"{base}/debug/memory?action=start", method="POST"))
+            assert denied.value.code == 401
+            assert not profiling.enabled()
+            with urllib.request.urlopen(f"{base}/metrics") as response:
+                assert response.status == 200
+
+            request = urllib.request.Request(f"{base}/debug/memory?action=start", method="POST",
+                                             headers={"Authorization": "Bearer secret"})
+            with urllib.request.urlopen(request) as response:
+                assert response.status == 200
+            assert profiling.enabled()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        monkeypatch.setattr(profiling, "ADMIN_TOKEN", "")
+        assert profiling.admin_denied("", "127.0.0.1") is None
+        assert profiling.admin_denied("", "10.0.0.5")[0] == 403
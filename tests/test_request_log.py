@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import Mock, patch
+import io
+import json
+import os
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metrics
+import request_log
+import upstream
+from cache import TTLCache
+
+
+class TestRequestLog:
+    """Test suite for structured tool call logging."""
+
+    @pytest.fixture
+    def log_lines(self):
+        stream = io.StringIO()
+        request_log.configure(level="INFO", fmt="json", stream=stream, path=None)
+
+        def lines():
+            # Stopping the listener writes out everything queued so far
+            request_log.shutdown()
+            return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+        yield lines
+        request_log.configure()
+
+    @patch('requests.Session.get')
+    def test_one_line_per_tool_call(self, mock_get, log_lines):
+        """Test a tool call logs its duration, upstream status, byte counts and cache activity."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response._content = b'{"key": "TEST-1"}'
+        mock_response.request.body = b'{"jql": "x"}'
+        mock_get.return_value = mock_response
+        cache = TTLCache("test-log", ttl=60)
+
+        @metrics.instrument_tool("testconn")
+        def lookup():
+            cache.get("missing")
+            return upstream.request("testconn", "GET", "https://example.test/issue").status_code
+
+        lookup()
+        lookup_line, = log_lines()
+        assert lookup_line["msg"] == "tool_call"
+        assert lookup_line["level"] == "info"
+        assert lookup_line["tool"] == "lookup"
+        assert lookup_line["outcome"] == "ok"
+        assert lookup_line["upstream_status"] == 200
+        assert lookup_line["bytes_in"] == 17
+        assert lookup_line["bytes_out"] == 12
+        assert lookup_line["cache_misses"] == 1
+        assert lookup_line["duration_ms"] >= 0
+
+    def test_errors_logged_despite_sampling(self, log_lines):
+        """Test sampling drops successful calls but always keeps errors."""
+        @metrics.instrument_tool("testconn")
+        def sampled(value):
+            return value
+
+        with patch.object(request_log, 'LOG_SAMPLE_RATE', 0.0):
+            sampled({"ok": True})
+            sampled("Error: 500 - oops")
+        entries = log_lines()
+        assert [entry["outcome"] for entry in entries] == ["error"]
+        assert entries[0]["level"] == "warning"
+
+    def test_disabled_level_skips_collection(self):
+        """Test nothing is collected when INFO logging is off."""
+        request_log.configure(level="WARNING", stream=io.StringIO(), path=None)
+        try:
+            assert request_log.start_call() == (None, None)
+            request_log.record_cache(True)
+        finally:
+            request_log.configure()
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test a full queue drops records rather than blocking the caller."""
+        import queue
+        handler = request_log._DroppingQueueHandler(queue.Queue(maxsize=1))
+        record = request_log.logger.makeRecord("connectors", 20, __file__, 1, "line %s", (1,), None)
+        handler.emit(record)
+        handler.emit(record)
+        assert handler.dropped == 1
+        assert handler.queue.get_nowait().msg == "line 1"
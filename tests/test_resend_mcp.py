@@ -17,7 +17,7 @@ class TestResendMCP:
         """Set up mock environment variables."""
         monkeypatch.setenv("RESEND_API_KEY", "re_test_key_123")
 
-    @patch('resend_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_send_email_success(self, mock_post, mock_env_vars):
         """Test successful email send."""
         # Mock response
@@ -43,7 +43,7 @@ class TestResendMCP:
         assert result["to"] == ["test@example.com"]
         mock_post.assert_called_once()
 
-    @patch('resend_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_send_email_custom_from(self, mock_post, mock_env_vars):
         """Test email send with custom from address."""
         # Mock response
@@ -71,7 +71,7 @@ class TestResendMCP:
         call_args = mock_post.call_args
         assert call_args.kwargs["json"]["from"] == "custom@example.com"
 
-    @patch('resend_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_send_email_error_unauthorized(self, mock_post, mock_env_vars):
         """Test email send with unauthorized error."""
         # Mock error response
@@ -91,7 +91,7 @@ class TestResendMCP:
         assert "Error: 401" in result
         assert "Invalid API key" in result
 
-    @patch('resend_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_send_email_error_rate_limit(self, mock_post, mock_env_vars):
         """Test email send with rate limit error."""
         # Mock error response
@@ -111,7 +111,7 @@ class TestResendMCP:
         assert "Error: 429" in result
         assert "Rate limit exceeded" in result
 
-    @patch('resend_mcp.requests.post')
+    @patch('requests.Session.post')
     def test_send_email_error_bad_request(self, mock_post, mock_env_vars):
         """Test email send with bad request error."""
         # Mock error response
@@ -0,0 +1,108 @@
+import pytest
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import credentials
+import scheduler
+
+
+class TestScheduler:
+    """Test suite for the gateway's priority scheduler."""
+
+    def test_parse_lanes(self):
+        """Test the lane spec parses weights and concurrency limits."""
+        assert scheduler.parse_lanes("interactive=8:16, bulk=1") == {"interactive": (8.0, 16), "bulk": (1.0, 0)}
+        with pytest.raises(ValueError, match="Invalid lane"):
+            scheduler.parse_lanes("bulk=0:4")
+
+    def test_lane_for(self):
+        """Test tools map to their lane unless the caller asks for one."""
+        assert scheduler.lane_for("get_issue") == "interactive"
+        assert scheduler.lane_for("search_issues") == "default"
+        assert scheduler.lane_for("get_issue", "bulk") == "bulk"
+
+    def test_weighted_fair_order(self):
+        """Test queued interactive calls overtake a backlog of bulk calls."""
+        pool = scheduler.Scheduler({"default": (1, 0), "interactive": (4, 0), "bulk": (1, 0)}, workers=1)
+        gate = threading.Event()
+        order = []
+        blocker = pool.submit("default", gate.wait, 5)
+        futures = [pool.submit("bulk", order.append, f"bulk-{i}") for i in range(8)]
+        futures += [pool.submit("interactive", order.append, f"interactive-{i}") for i in range(4)]
+        gate.set()
+        for future in [blocker] + futures:
+            future.result(timeout=5)
+
+        assert order[:4] == [f"interactive-{i}" for i in range(4)]
+        assert order[4:] == [f"bulk-{i}" for i in range(8)]
+
+    def test_busy_lanes_share_by_weight(self):
+        """Test two backlogged lanes are served in proportion to their weights."""
+        pool = scheduler.Scheduler({"default": (3, 0), "bulk": (1, 0)}, workers=1)
+        gate = threading.Event()
+        order = []
+        blocker = pool.submit("default", gate.wait, 5)
+        futures = [pool.submit("bulk", order.append, "bulk") for _ in range(8)]
+        futures += [pool.submit("default", order.append, "default") for _ in range(8)]
+        gate.set()
+        for future in [blocker] + futures:
+            future.result(timeout=5)
+
+        assert order[:8].count("default") == 6
+
+    def test_lane_concurrency_limit(self):
+        """Test a lane at its limit queues its own calls but not other lanes' calls."""
+        pool = scheduler.Scheduler({"default": (1, 0), "bulk": (1, 1)}, workers=4)
+        gate = threading.Event()
+        running = []
+        lock = threading.Lock()
+
+        def bulk_call():
+            with lock:
+                running.append(1)
+            gate.wait(5)
+
+        bulk = [pool.submit("bulk", bulk_call) for _ in range(3)]
+        time.sleep(0.1)
+        assert len(running) == 1
+        assert pool.snapshot()["bulk"] == {"queued": 2, "running": 1}
+        assert pool.submit("default", lambda: "fast").result(timeout=2) == "fast"
+        gate.set()
+        for future in bulk:
+            future.result(timeout=5)
+        assert len(running) == 3
+
+    def test_calls_run_in_callers_context(self):
+        """Test the active site and other contextvars carry over to the worker thread."""
+        pool = scheduler.Scheduler({"default": (1, 0)}, workers=1)
+        with credentials.use_site("acme"):
+            future = pool.submit("default", credentials.current_site)
+        assert future.result(timeout=2) == "acme"
+
+    def test_exceptions_reach_the_caller(self):
+        """Test an exception raised by a call is set on its future; unknown lanes use the default."""
+        pool = scheduler.Scheduler({"default": (1, 0)}, workers=1)
+        future = pool.submit("no-such-lane", int, "not a number")
+        with pytest.raises(ValueError):
+            future.result(timeout=2)
+
+    def test_calls_past_their_deadline_are_dropped(self):
+        """Test a call still queued when its deadline passes is never run."""
+        pool = scheduler.Scheduler({"default": (1, 0)}, workers=1)
+        gate = threading.Event()
+        ran = []
+        blocker = pool.submit("default", gate.wait, 5)
+        late = pool.submit_before(time.monotonic() + 0.05, "default", ran.append, "late")
+        on_time = pool.submit_before(time.monotonic() + 5, "default", ran.append, "on time")
+        time.sleep(0.1)
+        gate.set()
+        with pytest.raises(scheduler.DeadlineExceeded):
+            late.result(timeout=2)
+        on_time.result(timeout=2)
+        blocker.result(timeout=2)
+        assert ran == ["on time"]
@@ -0,0 +1,122 @@
+import pytest
+from unittest.mock import patch
+import os
+import sys
+import time
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cache
+import fastjson
+import snapshots
+from cache import TTLCache
+
+
+class TestSnapshots:
+    """Test suite for cache snapshots across restarts."""
+
+    @pytest.fixture(autouse=True)
+    def no_restorer(self):
+        yield
+        snapshots.stop()
+        cache.set_restorer(None)
+
+    def test_round_trip_restores_lazily(self, tmp_path):
+        """Test entries saved by one cache are served by a fresh one after its first use."""
+        path = str(tmp_path / "caches.db")
+        old = TTLCache("snap_issues", 60)
+        old._restored = True
+        old.set(("https://x.atlassian.net", "T-1"), {"key": "T-1", "fields": {"n": 1}})
+        old.set(("https://x.atlassian.net", "T-2"), fastjson.RawJSON(b'{"key":"T-2"}'))
+        snapshot = snapshots.Snapshot(path)
+        assert snapshot.save() >= 2
+        assert len(snapshot.load("snap_issues")) == 2
+        snapshot.close()
+
+        new = TTLCache("snap_issues", 60)
+        with patch.object(cache, "_restorer", snapshots.Snapshot(path).load):
+            assert len(new) == 0
+            assert new.get(("https://x.atlassian.net", "T-1")) == {"key": "T-1", "fields": {"n": 1}}
+        raw = new.get(("https://x.atlassian.net", "T-2"))
+        assert isinstance(raw, fastjson.RawJSON) and raw.body == b'{"key":"T-2"}'
+
+    def test_expiry_is_kept(self, tmp_path):
+        """Test restored entries keep their remaining lifetime and expired ones are dropped."""
+        snapshot = snapshots.Snapshot(str(tmp_path / "caches.db"))
+        old = TTLCache("snap_expiry", 60)
+        old._restored = True
+        old.set("fresh", 1)
+        old.set("stale", 2)
+        old._entries["stale"] = (time.monotonic() - 1, 2)
+        snapshot.save()
+        assert [key for key, _, _ in snapshot.load("snap_expiry")] == ["fresh"]
+
+        # A shorter TTL in the new process caps how long a restored entry lives
+        new = TTLCache("snap_expiry", 0.05)
+        with patch.object(cache, "_restorer", snapshot.load):
+            assert new.get("fresh") == 1
+        time.sleep(0.1)
+        assert new.get("fresh") is None
+
+    def test_live_entries_win_and_untouched_caches_are_kept(self, tmp_path):
+        """Test restoring doesn't replace newer entries, and saving keeps rows of caches not yet used."""
+        snapshot = snapshots.Snapshot(str(tmp_path / "caches.db"))
+        old = TTLCache("snap_unused", 60)
+        old._restored = True
+        old.set("a", "saved")
+        snapshot.save()
+        del old
+
+        new = TTLCache("snap_unused", 60)
+        with patch.object(cache, "_restorer", snapshot.load):
+            snapshot.save()
+            assert [key for key, _, _ in snapshot.load("snap_unused")] == ["a"]
+            new.set("a", "live")
+            assert new.get("a") == "live"
+
+    def test_processes_sharing_a_file_keep_each_others_entries(self, tmp_path):
+        """Test a save from one process doesn't wipe entries another process saved to the same file."""
+        path = str(tmp_path / "caches.db")
+        first, second = snapshots.Snapshot(path), snapshots.Snapshot(path)
+        one = TTLCache("snap_shared", 60)
+        one._restored = True
+        one.set("a", 1)
+        one.set("b", 1)
+        first.save()
+        one.clear()
+        one.set("b", 2)
+        one.set("c", 2)
+        second.save()
+        assert [(key, value) for key, value, _ in first.load("snap_shared")] == [("a", 1), ("b", 2), ("c", 2)]
+        first.close()
+        second.close()
+
+    def test_states_and_unencodable_values(self, tmp_path):
+        """Test registered state dicts are saved and refilled, and odd values are skipped."""
+        snapshot = snapshots.Snapshot(str(tmp_path / "caches.db"))
+        versions = cache.register_state("snap_versions", {"https://x.atlassian.net": "v2"})
+        odd = TTLCache("snap_odd", 60)
+        odd._restored = True
+        odd.set("set", {1, 2})
+        odd.set("ok", [1, 2])
+        snapshot.save()
+        assert [key for key, _, _ in snapshot.load("snap_odd")] == ["ok"]
+
+        versions.clear()
+        assert snapshot.restore_states() >= 1
+        assert versions == {"https://x.atlassian.net": "v2"}
+
+    def test_start_and_stop(self, tmp_path):
+        """Test start installs the restorer once and stop writes a final snapshot."""
+        path = str(tmp_path / "caches.db")
+        assert snapshots.start(path="") is None
+        started = snapshots.start(path=path, interval=0)
+        assert snapshots.start(path=path, interval=0) is started
+        assert cache._restorer == started.load
+        live = TTLCache("snap_final", 60)
+        live.get("warm-up")
+        live.set("k", "v")
+        snapshots.stop()
+        assert cache._restorer is None
+        assert [value for _, value, _ in snapshots.Snapshot(path).load("snap_final")] == ["v"]
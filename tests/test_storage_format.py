@@ -0,0 +1,54 @@
+import os
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from storage_format import chunk_storage, convert_storage, validate_storage
+
+
+class TestStorageFormat:
+    """Test suite for Confluence storage format conversion."""
+
+    def test_convert_markdown(self):
+        """Test headings, emphasis, links and lists convert to markdown."""
+        lines, headings = convert_storage(
+            '<h2>Setup</h2><p>Run <strong>this</strong> &amp; <a href="http://x">that</a></p>'
+            '<ul><li>one</li><li>two</li></ul>'
+        )
+        assert lines == ["## Setup", "Run **this** & [that](http://x)", "- one", "- two"]
+        assert headings == [(0, 2, "Setup")]
+
+    def test_convert_text_skips_macro_parameters(self):
+        """Test plain text mode keeps code bodies but drops macro parameters."""
+        lines, _ = convert_storage(
+            '<ac:structured-macro ac:name="code"><ac:parameter ac:name="language">py</ac:parameter>'
+            '<ac:plain-text-body><![CDATA[print(1)]]></ac:plain-text-body></ac:structured-macro>',
+            markdown=False
+        )
+        assert lines == ["print(1)"]
+
+    def test_chunks_align_to_headings(self):
+        """Test sections start new chunks once the size limit is reached."""
+        body = "".join(f"<h1>Part {n}</h1><p>{'x' * 30}</p>" for n in range(3))
+        result = chunk_storage(body, max_chars=50)
+        assert len(result["chunks"]) == 3
+        assert all(chunk.startswith("# Part") for chunk in result["chunks"])
+        assert [entry["chunk"] for entry in result["toc"]] == [0, 1, 2]
+
+    def test_empty_body_has_one_chunk(self):
+        """Test an empty page still yields a single empty chunk."""
+        assert chunk_storage("") == {"chunks": [""], "toc": []}
+
+    def test_validate_accepts_storage_markup(self):
+        """Test well-formed storage with macros, CDATA and HTML entities is valid."""
+        assert validate_storage(
+            '<p>a&nbsp;b &amp; c<br/></p><ac:structured-macro ac:name="code">'
+            '<ac:plain-text-body><![CDATA[x < y]]></ac:plain-text-body></ac:structured-macro>'
+        ) == []
+
+    def test_validate_reports_position(self):
+        """Test unclosed tags, unknown entities and nameless macros are reported with their line."""
+        assert validate_storage("<p>one</p>\n<p>two<br></p>") == ["line 2, column 13: mismatched tag"]
+        assert "undefined entity" in validate_storage("<p>&bogus;</p>")[0]
+        assert validate_storage("<ac:structured-macro/>") == ["line 1: ac:structured-macro without ac:name"]
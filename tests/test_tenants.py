@@ -0,0 +1,150 @@
+import pytest
+from unittest.mock import Mock, patch
+import json
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import credentials
+import metrics
+import tenants
+import upstream
+
+SITES = {
+    "sites": {
+        "noisy": {
+            "jira": {"base_url": "https://noisy.atlassian.net", "username": "bot@noisy.com", "api_token": "n"},
+            "limits": {"max_concurrency": 1, "max_calls": 1},
+        },
+        "quiet": {
+            "jira": {"base_url": "https://quiet.atlassian.net", "username": "bot@quiet.com", "api_token": "q"},
+        },
+    }
+}
+
+
+class TestTenants:
+    """Test suite for per-tenant connection pools and quotas."""
+
+    @pytest.fixture(autouse=True)
+    def sites(self, tmp_path, monkeypatch):
+        path = tmp_path / "credentials.json"
+        path.write_text(json.dumps(SITES))
+        monkeypatch.setattr(credentials, "CREDENTIALS_FILE", str(path))
+        monkeypatch.setattr(credentials, "_provider", credentials.CredentialProvider(str(path)))
+        tenants.reset()
+        yield path
+        tenants.reset()
+
+    def test_rate_limiter_spends_burst_then_waits(self):
+        """Test the token bucket allows a burst, then one request per 1/rate seconds."""
+        limiter = tenants.RateLimiter(rate=20, burst=2)
+        assert limiter.acquire(0) and limiter.acquire(0)
+        assert not limiter.acquire(0)
+        start = time.monotonic()
+        assert limiter.acquire(1)
+        assert time.monotonic() - start >= 0.04
+
+    def test_site_limits_override_defaults(self):
+        """Test a site's limits entry sets its quotas; other sites get the env defaults."""
+        noisy, quiet = tenants.get("noisy"), tenants.get("quiet")
+        assert (noisy.max_concurrency, noisy.max_calls) == (1, 1)
+        assert (quiet.max_concurrency, quiet.max_calls) == (0, 0)
+        assert tenants.get("noisy") is noisy
+
+    def test_tenant_rebuilt_when_limits_change(self, sites):
+        """Test new limits from a reloaded credentials file take effect."""
+        before = tenants.get("noisy")
+        changed = json.loads(json.dumps(SITES))
+        changed["sites"]["noisy"]["limits"]["max_concurrency"] = 3
+        sites.write_text(json.dumps(changed))
+        credentials.provider().reload()
+        assert tenants.get("noisy") is not before
+        assert tenants.get("noisy").max_concurrency == 3
+
+    def test_sessions_are_per_tenant(self):
+        """Test every tenant, the .env one included, gets its own session, created once under races."""
+        noisy, quiet = tenants.get("noisy"), tenants.get("quiet")
+        assert tenants.sender(noisy) is noisy.session()
+        assert noisy.session() is not quiet.session()
+        default = tenants.get()
+        assert tenants.sender(default) is default.session() is not noisy.session()
+
+        fresh = tenants.Tenant("racy")
+        barrier = threading.Barrier(8)
+        seen = []
+
+        def first_call():
+            barrier.wait()
+            seen.append(fresh.session())
+
+        threads = [threading.Thread(target=first_call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len({id(session) for session in seen}) == 1
+
+    def test_saturated_tenant_does_not_block_others(self):
+        """Test a tenant at its concurrency limit queues only its own requests."""
+        release = threading.Event()
+        entered = threading.Event()
+
+        def slow_get(url, **kwargs):
+            entered.set()
+            release.wait(5)
+            return Mock(status_code=200, content=b"{}")
+
+        def noisy_call():
+            with credentials.use_site("noisy"):
+                upstream.request("jira", "GET", "https://noisy.atlassian.net/rest/api/3/search")
+
+        with patch('requests.Session.get', side_effect=slow_get):
+            worker = threading.Thread(target=noisy_call)
+            worker.start()
+            assert entered.wait(5)
+            try:
+                with credentials.use_site("noisy"):
+                    with pytest.raises(tenants.QuotaExceeded):
+                        with tenants.get().upstream_slot(timeout=0.05):
+                            pass
+                with credentials.use_site("quiet"):
+                    with tenants.get().upstream_slot(timeout=0.05):
+                        pass
+            finally:
+                release.set()
+                worker.join(5)
+        assert 'mcp_tenant_throttled_total{tenant="noisy",reason="concurrency"}' in metrics.render()
+
+    @patch('requests.Session.get')
+    def test_quota_error_is_reported_by_tool(self, mock_get, monkeypatch):
+        """Test a request refused by a quota comes back from the tool as an error string."""
+        import jira_mcp
+        monkeypatch.setattr(tenants, "TENANT_QUEUE_TIMEOUT", 0.01)
+        with credentials.use_site("noisy"):
+            with tenants.get().upstream_slot():
+                result = jira_mcp.get_issue.fn("TEST-1")
+        assert result.startswith("Request exception when fetching issue TEST-1")
+        mock_get.assert_not_called()
+
+    def test_gateway_limits_calls_per_tenant(self):
+        """Test the JSON runner answers 429 when a tenant already has max_calls calls running."""
+        import run_jira_json
+        from starlette.testclient import TestClient
+        tenant = tenants.get("noisy")
+        assert tenant.try_start_call()
+        try:
+            response = TestClient(run_jira_json.app).post(
+                '/mcp-json',
+                json={"tool": "get_issue", "args": {"issue_key": "TEST-1"}},
+                headers={"X-MCP-Site": "noisy"}
+            )
+        finally:
+            tenant.finish_call()
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
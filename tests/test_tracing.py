@@ -0,0 +1,106 @@
+import pytest
+from unittest.mock import Mock, patch
+import os
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tracing
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+    def shutdown(self):
+        pass
+
+
+class TestTracing:
+    """Test suite for span tracing."""
+
+    @pytest.fixture
+    def exporter(self):
+        collecting = CollectingExporter()
+        tracing.set_exporter(collecting, batch=False)
+        yield collecting
+        tracing.set_exporter(None)
+
+    def test_disabled_spans_are_noops(self):
+        """Test spans record nothing when no exporter is installed."""
+        with tracing.span("work") as current:
+            current.set_attribute("a", 1)
+        assert current.traceparent() is None
+        assert tracing.current_span() is None
+
+    def test_nested_spans_share_trace(self, exporter):
+        """Test child spans inherit the trace id and point at their parent."""
+        with tracing.span("outer") as outer:
+            with tracing.span("inner", key="value"):
+                pass
+        inner_span, outer_span = exporter.spans
+        assert inner_span.trace_id == outer_span.trace_id
+        assert inner_span.parent_span_id == outer.span_id
+        assert inner_span.attributes == {"key": "value"}
+        assert outer_span.parent_span_id is None
+
+    def test_exception_marks_span_error(self, exporter):
+        """Test an exception escaping a span marks it as an error."""
+        with pytest.raises(RuntimeError):
+            with tracing.span("failing"):
+                raise RuntimeError("boom")
+        assert exporter.spans[0].status == "error"
+        assert "boom" in exporter.spans[0].attributes["error.message"]
+
+    def test_parse_traceparent(self):
+        """Test W3C traceparent parsing rejects malformed and all-zero ids."""
+        parent = tracing.parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+        assert (parent.trace_id, parent.span_id) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+        assert tracing.parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+        assert tracing.parse_traceparent("garbage") is None
+
+    def test_otlp_payload(self, exporter):
+        """Test spans convert to OTLP/JSON with typed attributes."""
+        with tracing.span("call", kind="client", count=3, ok=True):
+            pass
+        payload = tracing.OTLPExporter("http://collector:4318").payload(exporter.spans)
+        span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        assert span["kind"] == 3
+        assert {"key": "count", "value": {"intValue": "3"}} in span["attributes"]
+        assert {"key": "ok", "value": {"boolValue": True}} in span["attributes"]
+
+    @patch.dict(os.environ, {
+        "JIRA_BASE_URL": "https://test.atlassian.net",
+        "JIRA_USERNAME": "test@example.com",
+        "JIRA_API_TOKEN": "test-token-123"
+    })
+    @patch('requests.Session.get')
+    def test_gateway_propagates_traceparent(self, mock_get, exporter):
+        """Test the JSON runner continues the caller's trace through tool and upstream spans."""
+        import importlib
+        import jira_mcp
+        importlib.reload(jira_mcp)
+        import run_jira_json
+        importlib.reload(run_jira_json)
+        from starlette.testclient import TestClient
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"key": "TEST-1"}
+        mock_get.return_value = mock_response
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+        response = TestClient(run_jira_json.app).post(
+            '/mcp-json',
+            json={"tool": "get_issue", "args": {"issue_key": "TEST-1"}},
+            headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"}
+        )
+
+        assert response.json() == {"result": {"key": "TEST-1"}}
+        assert response.headers["traceparent"].startswith(f"00-{trace_id}-")
+        names = [span.name for span in exporter.spans]
+        assert {"HTTP GET", "json.decode", "tool get_issue", "serialize", "POST /mcp-json"} <= set(names)
+        assert all(span.trace_id == trace_id for span in exporter.spans)
@@ -0,0 +1,188 @@
+from unittest.mock import Mock, patch
+import gzip
+import os
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.testclient import TestClient
+
+import fastjson
+import metrics
+import transfer
+import upstream
+
+
+def _app():
+    app = Starlette()
+
+    @app.route('/big')
+    async def big(request):
+        return PlainTextResponse("x" * 5000, media_type="application/json")
+
+    @app.route('/small')
+    async def small(request):
+        return PlainTextResponse("{}", media_type="application/json")
+
+    @app.route('/events')
+    async def events(request):
+        async def stream():
+            for index in range(3):
+                yield f"data: {index}\n\n" * 200
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.route('/chunks')
+    async def chunks(request):
+        async def stream():
+            for index in range(3):
+                yield ("chunk %d " % index) * 300
+        return StreamingResponse(stream(), media_type="application/json")
+
+    app.add_middleware(transfer.CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+class TestTransfer:
+    """Test suite for response compression and result size limits."""
+
+    def test_choose_encoding(self):
+        """Test Accept-Encoding negotiation honours q-values and wildcards."""
+        assert transfer.choose_encoding("gzip, deflate") == "gzip"
+        assert transfer.choose_encoding("br;q=1.0, gzip;q=0.5") == "gzip"
+        assert transfer.choose_encoding("*") == transfer._ENCODINGS[0]
+        assert transfer.choose_encoding("gzip;q=0, identity") is None
+        assert transfer.choose_encoding(None) is None
+
+    def test_compresses_large_responses(self):
+        """Test responses above the threshold are gzipped with matching headers."""
+        response = _app().get('/big', headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.text == "x" * 5000
+        assert int(response.headers["content-length"]) < 200
+
+    def test_leaves_small_and_unaccepted_responses(self):
+        """Test small responses, and clients that don't accept gzip, get plain bodies."""
+        client = _app()
+        assert "content-encoding" not in client.get('/small', headers={"Accept-Encoding": "gzip"}).headers
+        assert "content-encoding" not in client.get('/big', headers={"Accept-Encoding": "identity"}).headers
+
+    def test_skips_event_streams(self):
+        """Test SSE responses are never compressed, so events arrive as they are sent."""
+        response = _app().get('/events', headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.text.startswith("data: 0")
+
+    def test_streams_compressed_chunks(self):
+        """Test streamed bodies are compressed incrementally into one valid gzip stream."""
+        client = _app()
+        with client.stream('GET', '/chunks', headers={"Accept-Encoding": "gzip"}) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            assert "content-length" not in response.headers
+            raw = b"".join(response.iter_raw())
+        assert gzip.decompress(raw).decode() == "".join(("chunk %d " % i) * 300 for i in range(3))
+
+    def test_limit_result_cuts_lists_with_marker(self):
+        """Test oversized search results keep their leading items and say what was cut."""
+        result = {"issues": [{"key": f"T-{i}", "body": "x" * 500} for i in range(200)], "total": 200}
+        limited = transfer.limit_result(result, 10000)
+        assert len(fastjson.dumps(limited)) <= 10000
+        assert limited["issues"] == result["issues"][:len(limited["issues"])]
+        assert limited["total"] == 200
+        assert limited["_truncated"]["cut"] == {
+            "issues": {"kept_items": len(limited["issues"]), "total_items": 200}
+        }
+
+    def test_limit_result_cuts_nested_strings(self):
+        """Test a huge page body is shortened in place."""
+        page = {"id": "1", "body": {"storage": {"value": "<p>" + "y" * 50000 + "</p>"}}}
+        limited = transfer.limit_result(page, 4000)
+        assert len(fastjson.dumps(limited)) <= 4000
+        assert limited["id"] == "1"
+        assert "body.storage.value" in limited["_truncated"]["cut"]
+
+    def test_limit_result_text_and_small_results(self):
+        """Test text results get a trailing note and results under the limit are untouched."""
+        text = transfer.limit_result("é" * 5000, 1000)
+        assert len(text.encode()) <= 1000
+        assert text.endswith("[truncated: 10000 bytes, limit 1000]")
+        small = {"key": "T-1"}
+        assert transfer.limit_result(small, 1000) is small
+        assert transfer.limit_result(small, 0) is small
+
+    def test_limit_result_decodes_oversized_raw_json(self):
+        """Test a passed-through body over the limit is decoded and truncated."""
+        raw = fastjson.RawJSON(fastjson.dumps({"results": list(range(5000))}))
+        limited = transfer.limit_result(raw, 2000)
+        assert isinstance(limited, dict) and "_truncated" in limited
+
+    def test_instrumented_tools_are_limited(self, monkeypatch):
+        """Test tool results pass through the size limit and are counted when cut."""
+        monkeypatch.setattr(transfer, "MAX_RESULT_BYTES", 1000)
+
+        @metrics.instrument_tool("test")
+        def big_tool():
+            return {"items": list(range(1000))}
+
+        result = big_tool()
+        assert "_truncated" in result
+        assert 'mcp_tool_results_truncated_total{connector="test",tool="big_tool"}' in metrics.render()
+
+    def test_deferred_limit_is_applied_at_encoding(self, monkeypatch):
+        """Test a caller that encodes the result gets it uncut from the tool and limited by encode_limited."""
+        monkeypatch.setattr(transfer, "MAX_RESULT_BYTES", 1000)
+
+        @metrics.instrument_tool("test")
+        def big_tool():
+            return {"items": list(range(1000))}
+
+        with transfer.defer_limit():
+            result = big_tool()
+        assert "_truncated" not in result
+        body, truncated = transfer.encode_limited(result)
+        assert truncated and len(body) <= 1000 + len('{"result":}')
+        assert "_truncated" in fastjson.loads(body)["result"]
+        small = {"key": "T-1"}
+        assert transfer.encode_limited(small) == (fastjson.encode_result(small), False)
+
+    def test_shrink_measures_each_member_once(self, monkeypatch):
+        """Test cutting a wide object measures each member a bounded number of times, not once per key."""
+        result = {f"field{i}": "x" * 200 for i in range(300)}
+        calls = []
+        measure = transfer._encoded_size
+        monkeypatch.setattr(transfer, "_encoded_size", lambda value: calls.append(1) or measure(value))
+        limited = transfer.limit_result(result, 20000)
+        members = {key: value for key, value in limited.items() if key != "_truncated"}
+        assert len(fastjson.dumps(members)) <= 20000 - transfer._MARKER_BYTES
+        assert len(calls) < 20 * len(result)  # once per key per key would be 90000
+
+    def test_gateway_limits_encoded_results(self, monkeypatch):
+        """Test the JSON runner cuts oversized results when it encodes them."""
+        import jira_mcp
+        import run_jira_json
+        monkeypatch.setattr(transfer, "MAX_RESULT_BYTES", 2000)
+        monkeypatch.setattr(jira_mcp, "JIRA_BASE_URL", "https://test.atlassian.net")
+        monkeypatch.setattr(jira_mcp, "_search_mirror", lambda jql: {"issues": [{"key": f"T-{i}"} for i in range(500)]})
+        response = TestClient(run_jira_json.app).post('/mcp-json', json={"tool": "search_issues", "args": {"jql": "x"}})
+        assert len(response.content) <= 2000 + len('{"result":}')
+        assert response.json()["result"]["_truncated"]["cut"]["issues"]["total_items"] == 500
+
+    @patch('requests.Session.get')
+    def test_upstream_accepts_compression(self, mock_get):
+        """Test upstream requests advertise compressed encodings without dropping caller headers."""
+        mock_get.return_value = Mock(status_code=200, headers={"Content-Encoding": "gzip"})
+        upstream.request("jira", "GET", "https://test.atlassian.net/rest/api/3/myself",
+                         headers={"Authorization": "Basic x"})
+        headers = mock_get.call_args[1]["headers"]
+        assert headers["Authorization"] == "Basic x"
+        assert "gzip" in headers["Accept-Encoding"]
+        assert 'mcp_upstream_compressed_responses_total{service="jira",encoding="gzip"}' in metrics.render()
+
+    def test_gateway_compresses_results(self):
+        """Test the JSON runner compresses large responses."""
+        import run_jira_json
+        response = TestClient(run_jira_json.app).get('/metrics', headers={"Accept-Encoding": "gzip"})
+        assert response.headers.get("content-encoding") == "gzip"
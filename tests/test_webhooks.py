@@ -0,0 +1,110 @@
+import pytest
+import hashlib
+import hmac
+import json
+import os
+import sys
+
+# Add parent directory to path to import mcp modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+import cal_mcp
+import confluence_mcp
+import jira_mcp
+import webhooks
+from cache import TTLCache
+
+
+def sign(secret, body):
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class TestWebhooks:
+    """Test suite for webhook-driven cache invalidation."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setitem(webhooks.WEBHOOK_SECRETS, "jira", "jira-secret")
+        monkeypatch.setitem(webhooks.WEBHOOK_SECRETS, "cal", "cal-secret")
+        monkeypatch.setitem(webhooks.WEBHOOK_SECRETS, "confluence", None)
+        app = Starlette()
+        app.add_route('/webhooks/{source}', webhooks.handle_webhook, methods=['POST'])
+        return TestClient(app)
+
+    def test_verify_signature(self):
+        """Test sha256= prefixed and bare signatures are accepted, wrong ones rejected."""
+        body = b'{"a": 1}'
+        assert webhooks.verify_signature("s", body, "sha256=" + sign("s", body))
+        assert webhooks.verify_signature("s", body, sign("s", body))
+        assert not webhooks.verify_signature("s", body, sign("other", body))
+        assert not webhooks.verify_signature("s", body, None)
+
+    def test_rejects_bad_signature_and_unconfigured_source(self, client):
+        """Test unsigned requests and sources without a secret are refused."""
+        assert client.post('/webhooks/jira', content=b'{}', headers={"X-Hub-Signature": "sha256=bad"}).status_code == 401
+        assert client.post('/webhooks/confluence', content=b'{}').status_code == 403
+        assert client.post('/webhooks/unknown', content=b'{}').status_code == 404
+
+    def test_jira_issue_updated_invalidates_cache(self, client, monkeypatch):
+        """Test an issue_updated event drops the cached issue."""
+        cache = TTLCache("jira_issues", ttl=3600)
+        cache.set(("https://test.atlassian.net", "TEST-1"), {"key": "TEST-1"})
+        cache.set(("https://test.atlassian.net", "TEST-2"), {"key": "TEST-2"})
+        monkeypatch.setattr(jira_mcp, "ISSUE_CACHE", cache)
+        body = json.dumps({"webhookEvent": "jira:issue_updated", "issue": {"key": "TEST-1", "fields": {}}}).encode()
+
+        response = client.post('/webhooks/jira', content=body, headers={"X-Hub-Signature": "sha256=" + sign("jira-secret", body)})
+
+        assert response.status_code == 200
+        assert response.json()["cache_dropped"] == 1
+        assert cache.get(("https://test.atlassian.net", "TEST-1")) is None
+        assert cache.get(("https://test.atlassian.net", "TEST-2")) == {"key": "TEST-2"}
+
+    def test_cal_booking_created_invalidates_availability(self, client, monkeypatch):
+        """Test BOOKING_CREATED drops cached availability for that event type only."""
+        cache = TTLCache("cal_availability", ttl=3600)
+        cache.set((1, "2025-01-01", "2025-01-07"), {"slots": []})
+        cache.set((2, "2025-01-01", "2025-01-07"), {"slots": []})
+        monkeypatch.setattr(cal_mcp, "AVAILABILITY_CACHE", cache)
+        body = json.dumps({"triggerEvent": "BOOKING_CREATED", "payload": {"eventTypeId": 1}}).encode()
+
+        response = client.post('/webhooks/cal', content=body, headers={"X-Cal-Signature-256": sign("cal-secret", body)})
+
+        assert response.json()["cache_dropped"] == 1
+        assert len(cache) == 1
+
+    def test_malformed_payloads_are_rejected(self, client):
+        """Test signed bodies that aren't the expected shape get a 400 instead of a server error."""
+        def post(source, payload, header, secret):
+            body = json.dumps(payload).encode()
+            return client.post(f'/webhooks/{source}', content=body, headers={header: sign(secret, body)})
+
+        for payload in ([1, 2], "text", None):
+            response = post("jira", payload, "X-Hub-Signature", "jira-secret")
+            assert response.status_code == 400
+            assert response.json() == {"error": "Body must be a JSON object"}
+        assert post("jira", {"issue": ["TEST-1"]}, "X-Hub-Signature", "jira-secret").status_code == 400
+        for event_type_id in ("abc", True, {"id": 1}):
+            payload = {"triggerEvent": "BOOKING_CREATED", "payload": {"eventTypeId": event_type_id}}
+            response = post("cal", payload, "X-Cal-Signature-256", "cal-secret")
+            assert response.status_code == 400
+            assert response.json() == {"error": "eventTypeId must be an integer"}
+        assert post("cal", {"triggerEvent": "BOOKING_CREATED", "payload": "x"},
+                    "X-Cal-Signature-256", "cal-secret").status_code == 400
+
+    def test_confluence_page_updated_invalidates_page(self, monkeypatch):
+        """Test page events drop cached reads and converted chunks for the page."""
+        cache = TTLCache("confluence_pages", ttl=3600)
+        cache.set(("https://test.atlassian.net", "789"), {"id": "789"})
+        monkeypatch.setattr(confluence_mcp, "PAGE_CACHE", cache)
+        confluence_mcp._CHUNK_CACHE[("https://test.atlassian.net", "789", 3, "markdown", 8000)] = {}
+
+        summary, task = webhooks.apply_confluence_event({"page": {"id": 789, "spaceKey": "DEV"}}, "page_updated")
+
+        assert summary["applied"] is True
+        assert task is None
+        assert len(cache) == 0
+        assert not confluence_mcp._CHUNK_CACHE
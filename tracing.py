@@ -0,0 +1,326 @@
+import contextvars
+import json
+import os
+import queue
+import re
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Exporter selected at startup: none, console, file or otlp (see configure_from_env)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://127.0.0.1:4318")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "mcp-connectors")
+# Finished spans are batched and exported off the request path
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 2.0
+MAX_QUEUE = 10000
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation in a trace, using OpenTelemetry's field names and id formats."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns",
+                 "attributes", "status", "kind")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: str | None, kind: str = "internal",
+                 attributes: dict | None = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status = "unset"
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status = "error"
+        self.attributes["error.message"] = message
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+class _RemoteParent:
+    """Stands in for a span started by another process, taken from a traceparent header."""
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+
+class _NoopSpan:
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_error(self, message):
+        pass
+
+    def traceparent(self):
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class ConsoleExporter:
+    """Write finished spans to stderr as JSON lines."""
+
+    def export(self, spans: list[Span]):
+        for span in spans:
+            print(json.dumps(span.to_dict(), default=str), file=sys.stderr)
+
+    def shutdown(self):
+        pass
+
+
+class FileExporter:
+    """Append finished spans to a JSON lines file, for offline analysis."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list[Span]):
+        with open(self.path, "a", encoding="utf-8") as handle:
+            for span in spans:
+                handle.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def shutdown(self):
+        pass
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPExporter:
+    """POST spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding."""
+
+    _KINDS = {"internal": 1, "server": 2, "client": 3}
+
+    def __init__(self, endpoint: str, service_name: str = SERVICE_NAME):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+
+    def payload(self, spans: list[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "mcp-connectors"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_span_id or "",
+                    "name": span.name,
+                    "kind": self._KINDS.get(span.kind, 1),
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                    "status": {"code": 2 if span.status == "error" else 0},
+                } for span in spans]
+            }]
+        }]}
+
+    def export(self, spans: list[Span]):
+        # Imported here so processes that never export over OTLP don't pay for requests
+        import requests
+
+        requests.post(self.url, json=self.payload(spans), timeout=5)
+
+    def shutdown(self):
+        pass
+
+
+class _BatchProcessor:
+    """Queue finished spans and hand them to the exporter in batches from a daemon thread."""
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=MAX_QUEUE)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first=None) -> list:
+        batch = [first] if first is not None else []
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, batch):
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch)
+        except Exception as exc:
+            print(f"Trace export failed: {exc}", file=sys.stderr)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            self._export(self._drain(first))
+
+    def flush(self):
+        while not self._queue.empty():
+            self._export(self._drain())
+
+
+class _SimpleProcessor:
+    """Export each span as soon as it ends, on the calling thread."""
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+
+    def on_end(self, span: Span):
+        self.exporter.export([span])
+
+    def flush(self):
+        pass
+
+
+_processor = None
+
+
+def set_exporter(exporter, batch: bool = True):
+    """Install an exporter (any object with export(spans) and shutdown()); None disables tracing.
+
+    With batch=False spans are exported synchronously, which is only meant for tests and debugging.
+    """
+    global _processor
+    previous = _processor
+    if exporter is None:
+        _processor = None
+    else:
+        _processor = _BatchProcessor(exporter) if batch else _SimpleProcessor(exporter)
+    if previous is not None:
+        previous.flush()
+        previous.exporter.shutdown()
+
+
+def enabled() -> bool:
+    return _processor is not None
+
+
+def flush():
+    if _processor is not None:
+        _processor.flush()
+
+
+def configure_from_env():
+    """Install the exporter named by TRACING_EXPORTER."""
+    if TRACING_EXPORTER == "console":
+        set_exporter(ConsoleExporter())
+    elif TRACING_EXPORTER == "file":
+        set_exporter(FileExporter(TRACING_FILE))
+    elif TRACING_EXPORTER == "otlp":
+        set_exporter(OTLPExporter(OTLP_ENDPOINT))
+
+
+def parse_traceparent(header: str | None):
+    """Return a remote parent from a W3C traceparent header, or None if it is missing or invalid."""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return _RemoteParent(match.group(1), match.group(2))
+
+
+def current_span():
+    """Return the active span, or None outside of any span."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", parent=None, **attributes):
+    """Time a block as a child of the current span (or of `parent`, e.g. a remote traceparent).
+
+    When tracing is disabled this yields a shared no-op span and records nothing.
+    """
+    if _processor is None:
+        yield _NOOP_SPAN
+        return
+    parent = parent or _current_span.get()
+    current = Span(
+        name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        parent_span_id=parent.span_id if parent else None,
+        kind=kind,
+        attributes=attributes
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.set_error(f"{type(exc).__name__}: {exc}")
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        processor = _processor
+        if processor is not None:
+            processor.on_end(current)
+
+
+def _restart_after_fork():
+    """The export thread doesn't survive fork (see launcher.py); give the child its own."""
+    global _processor
+    if isinstance(_processor, _BatchProcessor):
+        _processor = _BatchProcessor(_processor.exporter)
+
+
+configure_from_env()
+os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,269 @@
+import contextvars
+import gzip
+import os
+import zlib
+from contextlib import contextmanager
+
+import requests
+from dotenv import load_dotenv
+
+import fastjson
+
+load_dotenv()
+
+# Responses smaller than this are sent uncompressed; compressing them costs more than it saves
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_ZSTD_LEVEL = int(os.getenv("COMPRESS_ZSTD_LEVEL", "3"))
+# Tool results larger than this (as JSON) are cut down with a truncation marker; 0 disables the limit
+MAX_RESULT_BYTES = int(os.getenv("MAX_RESULT_BYTES", str(4 * 1024 * 1024)))
+
+# What upstream requests accept: gzip and deflate, plus br/zstd when urllib3 can decode them
+UPSTREAM_ACCEPT_ENCODING = requests.utils.DEFAULT_ACCEPT_ENCODING
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Preference order when the client accepts several with the same q-value
+_ENCODINGS = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+# Reserved for the truncation marker itself
+_MARKER_BYTES = 256
+# Bytes encode_result adds around a result: {"result": and }
+_ENVELOPE_BYTES = len(b'{"result":}')
+
+_limit_deferred: contextvars.ContextVar = contextvars.ContextVar("limit_deferred", default=False)
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """Pick the best encoding we support from an Accept-Encoding header, honouring q-values."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[name.strip().lower()] = quality
+    candidates = [(weights.get(name, weights.get("*", 0.0)), -index, name) for index, name in enumerate(_ENCODINGS)]
+    quality, _, name = max(candidates)
+    return name if quality > 0 else None
+
+
+class _Compressor:
+    """Incremental compressor; `compress(chunk, final)` returns the bytes ready to send."""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self._zstd = zstandard.ZstdCompressor(level=COMPRESS_ZSTD_LEVEL).compressobj()
+        else:
+            self._zstd = None
+            self._gzip = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes, final: bool) -> bytes:
+        if self._zstd is not None:
+            data = self._zstd.compress(chunk)
+            return data + self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH if final else
+                                           zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        data = self._gzip.compress(chunk)
+        return data + self._gzip.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with zstd (when `zstandard` is installed) or gzip.
+
+    Responses below `minimum_size`, already encoded, or server-sent event streams (which must
+    reach the client event by event) are passed through unchanged. Streamed bodies are compressed
+    chunk by chunk and flushed after each one.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = dict(scope.get("headers") or []).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compressor is None:
+                headers = {k.lower(): v for k, v in start.get("headers", [])}
+                content_type = headers.get(b"content-type", b"")
+                if (headers.get(b"content-encoding") or content_type.startswith(b"text/event-stream")
+                        or (not more and len(body) < self.minimum_size)):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                start["headers"] = [(k, v) for k, v in start.get("headers", [])
+                                    if k.lower() not in (b"content-length", b"content-encoding")]
+                start["headers"] += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+                data = compressor.compress(body, final=not more)
+                if not more:
+                    start["headers"].append((b"content-length", str(len(data)).encode()))
+                await send(start)
+                await send({"type": "http.response.body", "body": data, "more_body": more})
+                return
+            await send({"type": "http.response.body", "body": compressor.compress(body, final=not more),
+                        "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    """Inverse of the middleware's encodings, for tests and clients without automatic decoding."""
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+# Result size limits
+
+def result_size(result) -> int:
+    """Size of a tool result as sent to the client: its JSON encoding, or the text itself."""
+    if isinstance(result, fastjson.RawJSON):
+        return len(result.body)
+    if isinstance(result, str):
+        return len(result.encode("utf-8"))
+    try:
+        return len(fastjson.dumps(result))
+    except TypeError:
+        return len(str(result).encode("utf-8"))
+
+
+def _fit_prefix(length: int, size_of, budget: int) -> int:
+    """Largest k in [0, length] with size_of(k) <= budget (size_of grows with k)."""
+    low, high = 0, length
+    while low < high:
+        middle = (low + high + 1) // 2
+        if size_of(middle) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _encoded_size(value) -> int:
+    try:
+        return len(fastjson.dumps(value))
+    except TypeError:
+        return len(fastjson.dumps(str(value)))
+
+
+def _shrink(value, budget: int, path: str, cut: dict):
+    """Return `value` reduced to at most `budget` bytes of JSON, recording what was cut in `cut`."""
+    if _encoded_size(value) <= budget:
+        return value
+    if isinstance(value, list):
+        keep = _fit_prefix(len(value), lambda k: _encoded_size(value[:k]), budget)
+        cut[path or "$"] = {"kept_items": keep, "total_items": len(value)}
+        return value[:keep]
+    if isinstance(value, str):
+        keep = _fit_prefix(len(value), lambda k: _encoded_size(value[:k]), budget)
+        cut[path or "$"] = {"kept_chars": keep, "total_chars": len(value)}
+        return value[:keep]
+    if isinstance(value, dict):
+        value = dict(value)
+        # Shrink the biggest members first until the whole object fits; replacing a member changes
+        # the object's size by exactly the change in the member's, so each is measured once
+        total = _encoded_size(value)
+        sizes = {key: _encoded_size(member) for key, member in value.items()}
+        for key in sorted(sizes, key=sizes.get, reverse=True):
+            excess = total - budget
+            if excess <= 0:
+                break
+            value[key] = _shrink(value[key], max(0, sizes[key] - excess), f"{path}.{key}" if path else str(key), cut)
+            total += _encoded_size(value[key]) - sizes[key]
+        return value
+    return value
+
+
+def limit_result(result, max_bytes: int | None = None, size: int | None = None):
+    """Cut a result larger than `max_bytes` (default MAX_RESULT_BYTES) down to fit, with a marker.
+
+    Long lists keep their leading items and long strings their beginning. Objects get a
+    `_truncated` entry saying what was cut; text gets a trailing note instead. `size` is the
+    result's size when the caller already knows it.
+    """
+    max_bytes = MAX_RESULT_BYTES if max_bytes is None else max_bytes
+    if not max_bytes:
+        return result
+    size = result_size(result) if size is None else size
+    if size <= max_bytes:
+        return result
+    if isinstance(result, fastjson.RawJSON):
+        result = result.value()
+    budget = max(0, max_bytes - _MARKER_BYTES)
+    if isinstance(result, str):
+        note = f"\n[truncated: {size} bytes, limit {max_bytes}]"
+        return result.encode("utf-8")[:max(0, max_bytes - len(note))].decode("utf-8", "ignore") + note
+    cut = {}
+    if not isinstance(result, dict):
+        result = {"items": result}
+    shrunk = _shrink(result, budget, "", cut)
+    shrunk["_truncated"] = {"original_bytes": size, "limit_bytes": max_bytes, "cut": cut}
+    return shrunk
+
+
+@contextmanager
+def defer_limit():
+    """Within this block, instrumented tools leave MAX_RESULT_BYTES to the caller.
+
+    For callers that encode the result themselves and apply the limit then (see encode_limited),
+    so results aren't encoded once just to be measured.
+    """
+    token = _limit_deferred.set(True)
+    try:
+        yield
+    finally:
+        _limit_deferred.reset(token)
+
+
+def limit_deferred() -> bool:
+    return _limit_deferred.get()
+
+
+def encode_limited(result, max_bytes: int | None = None) -> tuple[bytes, bool]:
+    """fastjson.encode_result with MAX_RESULT_BYTES applied; returns the body and whether it was cut.
+
+    Results are encoded once; only one over the limit is cut down and encoded again.
+    """
+    max_bytes = MAX_RESULT_BYTES if max_bytes is None else max_bytes
+    body = fastjson.encode_result(result)
+    size = len(body) - _ENVELOPE_BYTES
+    if not max_bytes or size <= max_bytes:
+        return body, False
+    # Text is measured unquoted, as limit_result does
+    limited = limit_result(result, max_bytes, None if isinstance(result, str) else size)
+    if limited is result:
+        return body, False
+    return fastjson.encode_result(limited), True
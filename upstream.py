@@ -0,0 +1,105 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import fastjson
+import adaptive
+import metrics
+import request_log
+import tenants
+import tracing
+import transfer
+
+_passthrough: contextvars.ContextVar = contextvars.ContextVar("json_passthrough", default=False)
+
+
+def request(service: str, method: str, url: str, **kwargs):
+    """Send an HTTP request to an upstream API and record it in the upstream metrics.
+
+    `service` names the upstream (jira, confluence, cal, resend) for metric labels. The call
+    goes through the tenant's own keep-alive session after waiting for its quotas (see
+    tenants.py), then for a slot under the host's adaptive concurrency limit (see adaptive.py).
+    Compressed responses are always accepted. The status and body sizes are added to the
+    calling tool's log line. Exceptions propagate unchanged.
+    """
+    method = method.upper()
+    kwargs["headers"] = {"Accept-Encoding": transfer.UPSTREAM_ACCEPT_ENCODING, **(kwargs.get("headers") or {})}
+    tenant = tenants.get()
+    send = getattr(tenants.sender(tenant), method.lower())
+    limiter = adaptive.for_url(url)
+    with tenant.upstream_slot():
+        if limiter is None:
+            return _send(service, method, send, url, **kwargs)
+        with limiter.slot(route=adaptive.route(method, url)) as outcome:
+            response = _send(service, method, send, url, **kwargs)
+            outcome.record(response.status_code)
+            return response
+
+
+def _send(service: str, method: str, send, url: str, **kwargs):
+    metrics.UPSTREAM_IN_FLIGHT.inc(service=service)
+    start = time.perf_counter()
+    status = "exception"
+    try:
+        # Query strings can carry JQL/CQL text, so spans only record the path
+        parts = urlsplit(url)
+        with tracing.span(f"HTTP {method}", kind="client", service=service, **{
+            "http.method": method, "http.url": f"{parts.scheme}://{parts.netloc}{parts.path}"
+        }) as current:
+            response = send(url, **kwargs)
+            status = str(response.status_code)
+            current.set_attribute("http.status_code", response.status_code)
+        encoding = getattr(response, "headers", {}).get("Content-Encoding")
+        if isinstance(encoding, str):
+            metrics.UPSTREAM_ENCODED.inc(service=service, encoding=encoding.lower())
+        request_log.record_upstream(response.status_code, *request_log.response_sizes(response))
+        return response
+    except Exception:
+        request_log.record_upstream("exception")
+        raise
+    finally:
+        metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - start, service=service, method=method)
+        metrics.UPSTREAM_REQUESTS.inc(service=service, method=method, status=status)
+        metrics.UPSTREAM_IN_FLIGHT.dec(service=service)
+
+
+def record_retry(service: str, reason: str):
+    """Count a request that is being repeated against a fallback endpoint."""
+    metrics.UPSTREAM_RETRIES.inc(service=service, reason=reason)
+
+
+def decode_json(response):
+    """Decode a response body as JSON with the fastjson backend; raises ValueError like `response.json()`."""
+    with tracing.span("json.decode", backend=fastjson.BACKEND):
+        content = getattr(response, "content", None)
+        if isinstance(content, bytes) and content:
+            return fastjson.loads(content)
+        return response.json()
+
+
+@contextmanager
+def passthrough(enabled: bool = True):
+    """Within this block, `json_result` hands back upstream JSON bodies undecoded (see fastjson.RawJSON)."""
+    token = _passthrough.set(enabled)
+    try:
+        yield
+    finally:
+        _passthrough.reset(token)
+
+
+def json_result(response):
+    """Decode a body a tool returns unchanged, or wrap it as RawJSON when passthrough is on."""
+    content = getattr(response, "content", None)
+    content_type = getattr(response, "headers", {}).get("Content-Type")
+    if _passthrough.get() and isinstance(content, bytes) and content and isinstance(content_type, str) \
+            and "json" in content_type:
+        return fastjson.RawJSON(content)
+    return decode_json(response)
+
+
+def as_result(value):
+    """Adapt a cached result to the caller: RawJSON is decoded unless passthrough is on."""
+    if isinstance(value, fastjson.RawJSON) and not _passthrough.get():
+        return value.value()
+    return value
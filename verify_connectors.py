@@ -1,8 +1,12 @@
 import os
+import sys
 import json
+import time
+import argparse
 import textwrap
 import inspect
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -88,23 +92,64 @@ def verify_resend(send_email=False):
     except Exception as e:
         return False, str(e)
 
-def main():
-    print('\nVERIFY MCP CONNECTORS\n')
-    results = {}
-    ok, msg = verify_jira()
-    results['jira'] = (ok, msg)
-    ok, msg = verify_confluence()
-    results['confluence'] = (ok, msg)
-    ok, msg = verify_cal()
-    results['cal'] = (ok, msg)
-    # Resend skipped by default
-    ok, msg = verify_resend(send_email=False)
-    results['resend'] = (ok, msg)
+def _timed(verify, *args):
+    start = time.perf_counter()
+    ok, msg = verify(*args)
+    return ok, msg, round((time.perf_counter() - start) * 1000, 1)
 
-    print('\nRESULTS:')
-    for k, (ok, msg) in results.items():
-        state = 'SKIPPED' if ok is None else ('OK' if ok else 'ERROR')
-        print(f"- {k.upper():10} {state}\n  {textwrap.indent(str(msg), '  ')}\n")
+def run_health(as_json=False, services=None):
+    """Probe the APIs concurrently with short deadlines; returns a process exit code."""
+    import healthcheck
+    result = healthcheck.check(services or healthcheck.SERVICES)
+    if as_json:
+        print(json.dumps(result, indent=2))
+    else:
+        print('\nHEALTH CHECK\n')
+        for name, r in result['services'].items():
+            timings = ' '.join(f"{k[:-3]}={r[k]}ms" for k in ('dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms', 'total_ms')
+                               if r.get(k) is not None)
+            detail = r.get('error') or f"HTTP {r.get('http_status')}"
+            print(f"- {name.upper():10} {r['status'].upper():9} {timings}\n    {detail}")
+        print(f"\nOVERALL: {result['status'].upper()}")
+    return 0 if result['status'] in ('ok', 'degraded') else 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verify the MCP connectors against their live APIs.')
+    parser.add_argument('--health', action='store_true',
+                        help='Only probe API reachability (DNS/connect/TLS/TTFB), concurrently and with short deadlines')
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON results')
+    parser.add_argument('--services', help='Comma-separated services for --health (default: all)')
+    args = parser.parse_args(argv)
+    if args.health:
+        import healthcheck
+        services = None
+        if args.services:
+            try:
+                services = healthcheck.validate_services(s.strip() for s in args.services.split(',') if s.strip())
+            except ValueError as e:
+                parser.error(str(e))
+        return run_health(args.json, services)
+
+    if not args.json:
+        print('\nVERIFY MCP CONNECTORS\n')
+    checks = {'jira': (verify_jira,), 'confluence': (verify_confluence,), 'cal': (verify_cal,),
+              # Resend skipped by default
+              'resend': (verify_resend, False)}
+    # The checks are independent, so the slowest API bounds the run instead of the sum of all four
+    with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+        futures = {name: pool.submit(_timed, *check) for name, check in checks.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    if args.json:
+        print(json.dumps({name: {'status': 'skipped' if ok is None else ('ok' if ok else 'error'),
+                                 'elapsed_ms': elapsed, 'detail': msg}
+                          for name, (ok, msg, elapsed) in results.items()}, indent=2))
+    else:
+        print('\nRESULTS:')
+        for k, (ok, msg, elapsed) in results.items():
+            state = 'SKIPPED' if ok is None else ('OK' if ok else 'ERROR')
+            print(f"- {k.upper():10} {state} ({elapsed} ms)\n  {textwrap.indent(str(msg), '  ')}\n")
+    return 1 if any(ok is False for ok, _, _ in results.values()) else 0
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
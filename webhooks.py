@@ -0,0 +1,165 @@
+import hashlib
+import hmac
+import os
+
+from dotenv import load_dotenv
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+import fastjson
+
+load_dotenv()
+
+# Shared secrets configured on the Jira, Confluence and Cal.com webhook registrations
+WEBHOOK_SECRETS = {
+    "jira": os.getenv("JIRA_WEBHOOK_SECRET"),
+    "confluence": os.getenv("CONFLUENCE_WEBHOOK_SECRET"),
+    "cal": os.getenv("CAL_WEBHOOK_SECRET"),
+}
+
+# Jira and Confluence send "sha256=<hex>"; Cal.com sends the bare hex digest
+SIGNATURE_HEADERS = {
+    "jira": "X-Hub-Signature",
+    "confluence": "X-Hub-Signature",
+    "cal": "X-Cal-Signature-256",
+}
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    """Check an HMAC-SHA256 signature of the raw request body in constant time."""
+    if not secret or not signature:
+        return False
+    if signature.startswith("sha256="):
+        signature = signature[len("sha256="):]
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+def _object(payload: dict, name: str) -> dict:
+    """The JSON object under `name`, {} when absent; ValueError if the sender put something else there."""
+    value = payload.get(name) or {}
+    if not isinstance(value, dict):
+        raise ValueError(f"{name} must be an object")
+    return value
+
+
+def apply_jira_event(payload: dict) -> dict:
+    """Invalidate this process's issue cache and patch the local mirror from an issue event."""
+    import jira_mcp
+
+    event = payload.get("webhookEvent", "")
+    issue = _object(payload, "issue")
+    key = (issue.get("key") or "").upper()
+    if not key:
+        return {"event": event, "applied": False}
+
+    dropped = jira_mcp.ISSUE_CACHE.invalidate_matching(lambda cache_key: cache_key[1] == key)
+    mirrored = False
+    project = key.rpartition("-")[0]
+    if project in jira_mcp.JIRA_MIRROR_PROJECTS:
+        mirror = jira_mcp.local_mirror(start_syncer=False)
+        if mirror is not None:
+            if event == "jira:issue_deleted":
+                mirror.delete_issue(key)
+            elif issue.get("fields"):
+                mirror.upsert_issue(issue)
+            mirrored = True
+    return {"event": event, "applied": True, "key": key, "cache_dropped": dropped, "mirror_updated": mirrored}
+
+
+def _refresh_indexed_page(page_id: str, space_key: str):
+    """Re-fetch a page and re-index it; runs after the webhook response has been sent."""
+    import confluence_mcp
+
+    index = confluence_mcp.local_index(start_crawler=False)
+    if index is None:
+        return
+    page = confluence_mcp._fetch_page(page_id)
+    if not isinstance(page, str):
+        index.upsert_page(space_key, page)
+
+
+def apply_confluence_event(payload: dict, event: str | None = None):
+    """Invalidate this process's page caches and update the local index from a page event.
+
+    Returns (summary, background task or None); re-indexing needs a page fetch, so it runs in
+    the background instead of holding up the webhook response.
+    """
+    import confluence_mcp
+
+    event = event or payload.get("event") or payload.get("webhookEvent") or ""
+    page = _object(payload, "page")
+    page_id = str(page.get("id") or "")
+    if not page_id:
+        return {"event": event, "applied": False}, None
+
+    confluence_mcp.invalidate_page(page_id)
+    task = None
+    space_key = page.get("spaceKey")
+    if space_key in confluence_mcp.CONFLUENCE_INDEX_SPACES:
+        if event in ("page_removed", "page_trashed"):
+            index = confluence_mcp.local_index(start_crawler=False)
+            if index is not None:
+                index.delete_page(page_id)
+        else:
+            task = BackgroundTask(_refresh_indexed_page, page_id, space_key)
+    return {"event": event, "applied": True, "page_id": page_id, "reindex": task is not None}, task
+
+
+def apply_cal_event(payload: dict) -> dict:
+    """Drop this process's cached availability for the event type a booking changed."""
+    import cal_mcp
+
+    event = payload.get("triggerEvent", "")
+    booking = _object(payload, "payload")
+    event_type_id = booking.get("eventTypeId")
+    if event not in ("BOOKING_CREATED", "BOOKING_RESCHEDULED", "BOOKING_CANCELLED") or event_type_id is None:
+        return {"event": event, "applied": False}
+    if isinstance(event_type_id, bool) or not isinstance(event_type_id, (int, str)):
+        raise ValueError("eventTypeId must be an integer")
+    try:
+        event_type = int(event_type_id)
+    except ValueError:
+        raise ValueError("eventTypeId must be an integer") from None
+    dropped = cal_mcp.AVAILABILITY_CACHE.invalidate_matching(lambda key: key[0] == event_type)
+    return {"event": event, "applied": True, "event_type_id": event_type_id, "cache_dropped": dropped}
+
+
+async def handle_webhook(request: Request):
+    """Verify and apply a webhook from Jira, Confluence or Cal.com.
+
+    The source is the last path segment, e.g. POST /webhooks/jira. Requests are rejected
+    unless the source has a secret configured and the body signature matches it.
+    """
+    source = request.path_params.get("source")
+    if source not in WEBHOOK_SECRETS:
+        return JSONResponse({"error": f"Unknown webhook source: {source}"}, status_code=404)
+    secret = WEBHOOK_SECRETS[source]
+    if not secret:
+        return JSONResponse({"error": f"Webhook secret for {source} is not configured"}, status_code=403)
+
+    body = await request.body()
+    if not verify_signature(secret, body, request.headers.get(SIGNATURE_HEADERS[source])):
+        return JSONResponse({"error": "Invalid signature"}, status_code=401)
+    try:
+        payload = fastjson.loads(body)
+    except ValueError:
+        return JSONResponse({"error": "Body is not valid JSON"}, status_code=400)
+    if not isinstance(payload, dict):
+        return JSONResponse({"error": "Body must be a JSON object"}, status_code=400)
+
+    # The mirror and index writes are blocking SQLite calls, so they run off the event loop
+    task = None
+    try:
+        if source == "jira":
+            summary = await run_in_threadpool(apply_jira_event, payload)
+        elif source == "confluence":
+            summary, task = await run_in_threadpool(apply_confluence_event, payload,
+                                                    request.query_params.get("event"))
+        else:
+            summary = apply_cal_event(payload)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse(summary, background=task)